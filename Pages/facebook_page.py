@@ -1,3 +1,4 @@
+from auto_utilities.locator_utility import Locator
 from auto_utilities.ui_utilities import UIWaits, UIActions, BrowserActions
 
 
@@ -6,15 +7,18 @@ class FacebookPage:
 
     # Buttons
 
-    submit_button = 'button[value="1"]'
+    submit_button = Locator('button[value="1"]')
 
     # Text Fields
 
-    username_text_field = '#email'
-    password_text_field = '#pass'
+    username_text_field = Locator('#email')
+    password_text_field = Locator('#pass')
 
     # Text
-    error_text = 'div._9ay7'
+    error_text = Locator('div._9ay7')
+
+    # Containers
+    home_feed = Locator('div[role="feed"]')
 
     # Methods
 
@@ -27,6 +31,12 @@ class FacebookPage:
     def enter_password(cls, value: str, index: int = 0):
         UIActions.enter_text(cls.password_text_field, value, index)
 
+    @classmethod
+    def fill(cls, username: str = None, password: str = None):
+        # Fills the given login fields in a single command
+        fields = {cls.username_text_field: username, cls.password_text_field: password}
+        UIActions.fill_form({locator: value for locator, value in fields.items() if value is not None})
+
     # Clicks
 
     @classmethod
@@ -43,4 +53,5 @@ class FacebookPage:
 
     @classmethod
     def wait_for_facebook_page_to_load(cls):
-        UIWaits.wait_until_visible(cls.error_text, timeout=30)
+        # Returns the condition that fired: the login error or the home feed
+        return UIWaits.any_of(UIWaits.visible(cls.error_text), UIWaits.visible(cls.home_feed), timeout=30)
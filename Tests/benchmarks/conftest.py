@@ -0,0 +1,102 @@
+import json
+import time
+
+import pytest
+
+from auto_utilities.stub_webdriver import LATENCY_PROFILES, StubElement, StubWebDriverServer
+from auto_utilities.ui_utilities import UIActions
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+benchmark_results_key = pytest.StashKey[list]()
+
+BENCHMARK_URL = 'https://stub.example/form'
+BENCHMARK_ROUNDS = 3
+
+
+def show_error(page):
+    page['div.error'] = [StubElement(text='Wrong password')]
+
+
+def dismiss_toast(page):
+    page.pop('#toast', None)
+
+
+BENCHMARK_PAGES = {
+    '*': {
+        '#email': [StubElement('input', value='user@example.com')],
+        '#pass': [StubElement('input')],
+        '#country': [StubElement('select', options=['Spain', 'Portugal', 'France'])],
+        '#terms': [StubElement('input', attributes={'type': 'checkbox'})],
+        'button[type="submit"]': [StubElement('button', text='Log in', on_click=show_error)],
+        'li.item': [StubElement('li', text=f'Item {number}', attributes={'data-id': str(number)},
+                                css={'color': 'rgba(0, 0, 0, 1)'}) for number in range(5)],
+        '#spinner': [StubElement(visible=False)],
+        'Forgot': [StubElement('a', text='Forgot password?')],
+        '#delete': [StubElement('button', text='Delete account', alert='Delete the account?')],
+        '#frame': [StubElement('iframe')],
+        '#menu': [StubElement('button', text='Sort by')],
+        '#menu li': [StubElement('li', text=order) for order in ('Newest', 'Oldest', 'Price')],
+        '#toast': [StubElement(text='Saved')],
+        '#dismiss': [StubElement('button', text='Dismiss', on_click=dismiss_toast)],
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def driver_init():
+    # Benchmarks run against the local stub WebDriver and do not lease a browser
+    yield
+
+
+@pytest.fixture(scope='module', params=sorted(LATENCY_PROFILES, key=LATENCY_PROFILES.get))
+def stub_server(request):
+    with StubWebDriverServer(BENCHMARK_PAGES, latency=request.param) as server:
+        CustomWebDriverManager.launch_driver(remote_host=server.host)
+        yield server
+        CustomWebDriverManager.terminate_driver()
+
+
+@pytest.fixture
+def measure(request, stub_server):
+    '''
+    Runs an action once to warm up, then BENCHMARK_ROUNDS times, recording round trips and wall time per call;
+    `setup` runs before every call and is not measured
+    '''
+    CustomWebDriverManager.active_driver.get(BENCHMARK_URL)
+    UIActions.reset_resolution_stats()
+
+    def run(action, setup=None, rounds: int = BENCHMARK_ROUNDS):
+        if setup:
+            setup()
+        action()
+        timings = []
+        round_trips = 0
+        for _ in range(rounds):
+            if setup:
+                setup()
+            sent = stub_server.command_count
+            started = time.perf_counter()
+            action()
+            timings.append(time.perf_counter() - started)
+            round_trips += stub_server.command_count - sent
+        result = {'benchmark': request.node.callspec.id, 'latency_seconds': stub_server.latency,
+                  'round_trips': round_trips / rounds, 'min_ms': min(timings) * 1000,
+                  'mean_ms': sum(timings) / rounds * 1000}
+        request.config.stash.setdefault(benchmark_results_key, []).append(result)
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(benchmark_results_key, None)
+    if not results:
+        return
+    terminalreporter.write_sep('-', 'ui utilities benchmarks')
+    for result in results:
+        terminalreporter.write_line(f"{result['benchmark']:<60} {result['round_trips']:>5.1f} round trips "
+                                    f"{result['mean_ms']:>9.2f} ms mean {result['min_ms']:>9.2f} ms min")
+    report_path = config.getoption('--benchmark-report')
+    if report_path:
+        with open(report_path, 'w') as report_file:
+            json.dump(results, report_file, indent=2)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+import pytest
+
+from auto_utilities.ui_utilities import BrowserActions, UIActions, UIWaits
+
+pytestmark = [pytest.mark.benchmark]
+
+SCREENSHOT_PATH = os.path.join(tempfile.gettempdir(), 'ui_utilities_benchmark')
+
+
+def open_alert():
+    UIActions.click_element('#delete')
+
+
+def open_window():
+    BrowserActions.active_driver.switch_to.new_window('tab')
+
+
+def go_back():
+    BrowserActions.navigate_to_url('https://stub.example/next')
+    BrowserActions.navigate_back()
+
+
+# Method under test, the number of WebDriver commands it may send (a higher count is a round-trip regression) and an
+# optional setup run before every call and not measured. Every public UIActions, UIWaits and BrowserActions method
+# needs an entry, named after it or prefixed with its name for variants.
+BENCHMARKS = {
+    'capture_console_browser_errors': (lambda: UIActions.capture_console_browser_errors('SEVERE'), 1),
+    'clear_input': (lambda: UIActions.clear_input('#pass'), 2),
+    'click_element': (lambda: UIActions.click_element('button[type="submit"]'), 2),
+    'click_partial_link': (lambda: UIActions.click_partial_link('Forgot'), 2),
+    'perform_mouse_click': (lambda: UIActions.perform_mouse_click('click', '#terms'), 6),
+    'delete_input': (lambda: UIActions.delete_input('#email'), 3),
+    'capture_element_screenshot': (lambda: UIActions.capture_element_screenshot('#email'), 2),
+    'enter_text': (lambda: UIActions.enter_text('#pass', 'secret'), 4),
+    'fill_form': (lambda: UIActions.fill_form({'#email': 'user@example.com', '#pass': 'secret',
+                                               '#country': 'France', '#terms': True}), 1),
+    'pipeline': (lambda: UIActions.pipeline().type('#email', 'user').click('#terms').perform(), 2),
+    'type_at_offset': (lambda: UIActions.type_at_offset('user', 10, 10), 2),
+    'run_script': (lambda: UIActions.run_script('return document.title;'), 1),
+    'run_script_on_element': (lambda: UIActions.run_script('arguments[0].focus();', '#email'), 2),
+    'get_element_attribute': (lambda: UIActions.get_element_attribute('li.item', 'data-id'), 2),
+    'get_element_location': (lambda: UIActions.get_element_location('#email'), 2),
+    'get_css_property_all': (lambda: UIActions.get_css_property('li.item', 'color', all_elements=True), 1),
+    'read_elements': (lambda: UIActions.read_elements(['li.item', '#email'], text=True, attributes=['value']), 1),
+    'get_resolution_stats': (lambda: UIActions.get_resolution_stats(), 0),
+    'reset_resolution_stats': (lambda: UIActions.reset_resolution_stats(), 0),
+    'count_elements': (lambda: UIActions.count_elements('li.item'), 1),
+    'get_selected_option_text': (lambda: UIActions.get_selected_option_text('#country'), 6),
+    'get_element_text': (lambda: UIActions.get_element_text('li.item'), 2),
+    'get_element_text_all': (lambda: UIActions.get_element_text('li.item', all_elements=True), 1),
+    'is_element_displayed': (lambda: UIActions.is_element_displayed('#email'), 2),
+    'is_partial_link_displayed': (lambda: UIActions.is_partial_link_displayed('Forgot'), 2),
+    'is_element_selected': (lambda: UIActions.is_element_selected('#terms'), 2),
+    'move_mouse': (lambda: UIActions.move_mouse('#email'), 3),
+    'execute_keyboard_shortcut': (lambda: UIActions.execute_keyboard_shortcut('a', 'control'), 2),
+    'scroll_to_view': (lambda: UIActions.scroll_to_view('li.item', index=4), 1),
+    'select_option_by_text': (lambda: UIActions.select_option_by_text('#country', 'Portugal'), 5),
+    'select_option_matching_text': (lambda: UIActions.select_option_matching_text('#menu', ' li', 'Price'), 7),
+    'is_element_enabled': (lambda: UIActions.is_element_enabled('#email'), 2),
+    'is_element_focused': (lambda: UIActions.is_element_focused('#email'), 2),
+    'wait_until_alert_present': (lambda: UIWaits.wait_until_alert_present(), 1, open_alert),
+    'wait_until_visible': (lambda: UIWaits.wait_until_visible('#email'), 1),
+    'wait_until_clickable': (lambda: UIWaits.wait_until_clickable('#email'), 1),
+    'wait_until_stale': (lambda: UIWaits.wait_until_stale('#toast'), 1, lambda: UIActions.click_element('#dismiss')),
+    'wait_until_invisible': (lambda: UIWaits.wait_until_invisible('#spinner'), 1),
+    'wait_until_text_present': (lambda: UIWaits.wait_until_text_present('li.item', 'Item'), 1),
+    'wait_until_value_present': (lambda: UIWaits.wait_until_value_present('#email', '@'), 1),
+    # Condition builders send nothing; the composite waits send one script call for all their conditions
+    'present': (lambda: UIWaits.present('#email'), 0),
+    'visible': (lambda: UIWaits.visible('#email'), 0),
+    'clickable': (lambda: UIWaits.clickable('#email'), 0),
+    'invisible': (lambda: UIWaits.invisible('#spinner'), 0),
+    'stale': (lambda: UIWaits.stale('#toast'), 0),
+    'text_present': (lambda: UIWaits.text_present('li.item', 'Item'), 0),
+    'value_present': (lambda: UIWaits.value_present('#email', '@'), 0),
+    'any_of': (lambda: UIWaits.any_of(UIWaits.visible('div.error'), UIWaits.visible('#email')), 1),
+    'all_of': (lambda: UIWaits.all_of(UIWaits.visible('#email'), UIWaits.invisible('#spinner')), 1),
+    'none_of': (lambda: UIWaits.none_of(UIWaits.visible('div.error'), UIWaits.visible('#spinner')), 1),
+    'accept_browser_alert': (lambda: BrowserActions.accept_browser_alert(), 2, open_alert),
+    'get_alert_message': (lambda: BrowserActions.get_alert_message(), 2, open_alert),
+    'close_window': (lambda: BrowserActions.close_window(), 1, open_window),
+    'dismiss_browser_alert': (lambda: BrowserActions.dismiss_browser_alert(), 2, open_alert),
+    'switch_to_frame': (lambda: BrowserActions.switch_to_frame('#frame'), 2),
+    'switch_to_default_content': (lambda: BrowserActions.switch_to_default_content(), 1),
+    'retrieve_all_cookies': (lambda: BrowserActions.retrieve_all_cookies(), 1),
+    'retrieve_cookie': (lambda: BrowserActions.retrieve_cookie('session'), 1,
+                        lambda: BrowserActions.active_driver.add_cookie({'name': 'session', 'value': 'token'})),
+    'get_current_url': (lambda: BrowserActions.get_current_url(), 1),
+    'get_all_window_handles': (lambda: BrowserActions.get_all_window_handles(), 1),
+    'navigate_to_url': (lambda: BrowserActions.navigate_to_url('https://stub.example/form'), 1),
+    'is_alert_present': (lambda: BrowserActions.is_alert_present(), 1, open_alert),
+    'refresh_page': (lambda: BrowserActions.refresh_page(), 1),
+    'set_window_size': (lambda: BrowserActions.set_window_size(1280, 720), 1),
+    'save_screenshot': (lambda: BrowserActions.save_screenshot(SCREENSHOT_PATH), 1),
+    'switch_to_window_by_index': (lambda: BrowserActions.switch_to_window_by_index(0), 2),
+    'navigate_back': (lambda: BrowserActions.navigate_back(), 1,
+                      lambda: BrowserActions.navigate_to_url('https://stub.example/next')),
+    'navigate_forward': (lambda: BrowserActions.navigate_forward(), 1, go_back),
+}
+
+
+def test_every_public_method_has_a_benchmark():
+    public = {name for cls in (UIActions, UIWaits, BrowserActions) for name, member in vars(cls).items()
+              if not name.startswith('_') and isinstance(member, (classmethod, staticmethod))}
+
+    missing = {name for name in public
+               if not any(benchmark == name or benchmark.startswith(f'{name}_') for benchmark in BENCHMARKS)}
+
+    assert not missing, f'Public methods without a round-trip benchmark: {sorted(missing)}'
+
+
+@pytest.mark.parametrize('name', list(BENCHMARKS))
+def test_round_trips(name, measure):
+    action, budget, *setup = BENCHMARKS[name]
+
+    result = measure(action, *setup)
+
+    assert result['round_trips'] <= budget, f'{name} sent {result["round_trips"]} commands (budget {budget})'
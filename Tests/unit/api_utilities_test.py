@@ -0,0 +1,285 @@
+import hashlib
+import io
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from auto_utilities.api_utilities import ApiClient
+from auto_utilities.response_cache import ResponseCache
+from auto_utilities.transfer_streams import MultipartStream
+
+EXPORT_BLOCK = bytes(range(256)) * 256
+
+pytestmark = [pytest.mark.unit]
+
+
+VARY_HEADERS = {'/greeting': 'X-Locale', '/live': '*'}
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    '''
+    Keep-alive JSON endpoint echoing the method and path; `/flaky` fails twice with 503 before succeeding, `/config`
+    answers conditional requests matching its ETag with 304, `/exports/<size>` streams a body of `size` bytes and
+    `/uploads` keeps the (possibly chunked) request body, `/slow/...` answers after 0.2 seconds, `/greeting` varies on
+    X-Locale, `/live` on everything (Vary: *) and `/moved` redirects to `/config`; Authorization and X-Locale headers
+    are echoed back
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def handle_request(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append((self.command, self.path))
+            flaky_failure = self.path == '/flaky' and server.requests.count((self.command, self.path)) <= 2
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = self.read_chunked_body()
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+
+        if self.path.startswith('/slow/'):
+            time.sleep(0.2)
+        if self.path.startswith('/exports/'):
+            size = int(self.path.rsplit('/', 1)[1])
+            self.send_response(200)
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            for offset in range(0, size, len(EXPORT_BLOCK)):
+                self.wfile.write(EXPORT_BLOCK[:size - offset])
+            return
+        if self.path == '/uploads':
+            server.uploads.append((dict(self.headers), body))
+
+        if self.path == '/moved':
+            self.send_response(302)
+            self.send_header('Location', '/config')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/config' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        status = 503 if flaky_failure else 200
+        echo = {'method': self.command, 'path': self.path, 'body': body.decode(errors='replace')}
+        if self.headers.get('Authorization'):
+            echo['authorization'] = self.headers['Authorization']
+        if self.headers.get('X-Locale'):
+            echo['locale'] = self.headers['X-Locale']
+        data = json.dumps(echo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if self.path == '/config':
+            self.send_header('ETag', '"v1"')
+        if self.path in VARY_HEADERS:
+            self.send_header('Vary', VARY_HEADERS[self.path])
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_chunked_body(self):
+        body = b''
+        size = int(self.rfile.readline().split(b';')[0], 16)
+        while size:
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            size = int(self.rfile.readline().split(b';')[0], 16)
+        self.rfile.readline()
+        return body
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.requests = []
+    server.uploads = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings = (ApiClient.pool_connections, ApiClient.pool_maxsize, ApiClient.retry_policy)
+    ApiClient.close_sessions()
+
+    yield server, f'http://127.0.0.1:{server.server_address[1]}'
+
+    ApiClient.pool_connections, ApiClient.pool_maxsize, ApiClient.retry_policy = settings
+    ApiClient.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_to_one_host_reuse_keep_alive_connections(stub_api):
+    server, base_url = stub_api
+
+    responses = [ApiClient.get_resource(f'{base_url}/items/{number}') for number in range(20)]
+    responses.append(ApiClient.post_resource(f'{base_url}/items', payload='{"name": "new"}'))
+
+    assert [response.json()['path'] for response in responses[:3]] == ['/items/0', '/items/1', '/items/2']
+    assert responses[-1].json() == {'method': 'POST', 'path': '/items', 'body': '{"name": "new"}'}
+    assert len(server.connections) == 1
+
+
+def test_retryable_statuses_are_retried_once_retries_are_enabled(stub_api):
+    server, base_url = stub_api
+
+    first = ApiClient.get_resource(f'{base_url}/flaky')
+    ApiClient.configure_sessions(retries=2, backoff_factor=0)
+    response = ApiClient.get_resource(f'{base_url}/flaky')
+
+    assert first.status_code == 503
+    assert response.status_code == 200
+    assert server.requests.count(('GET', '/flaky')) == 3
+
+
+def test_batch_results_keep_input_order_and_capture_errors(stub_api):
+    server, base_url = stub_api
+    specs = [{'method': 'GET', 'url': f'{base_url}/items/{number}'} for number in range(30)]
+    specs.append({'method': 'POST', 'url': f'{base_url}/items', 'payload': 'created'})
+    specs.append({'method': 'TRACE', 'url': f'{base_url}/items'})
+
+    results = ApiClient.send_batch(specs, max_workers=8, per_host_limit=4)
+
+    assert [result.index for result in results] == list(range(len(specs)))
+    assert [result.response.json()['path'] for result in results[:30]] == [f'/items/{n}' for n in range(30)]
+    assert results[30].response.json()['body'] == 'created'
+    assert isinstance(results[31].error, ValueError) and not results[31].ok
+    assert len(server.connections) <= 4
+
+
+def test_batches_throttle_each_host_without_stalling_the_others(stub_api):
+    server, base_url = stub_api
+    other_host_url = base_url.replace('127.0.0.1', 'localhost')
+    specs = [{'method': 'GET', 'url': f'{base_url}/slow/{number}'} for number in range(4)]
+    specs.append({'method': 'GET', 'url': f'{other_host_url}/items/1'})
+
+    started = time.perf_counter()
+    results = ApiClient.stream_batch(specs, max_workers=2, per_host_limit=1)
+    first = next(results)
+    first_seconds = time.perf_counter() - started
+    remaining = list(results)
+
+    assert first.index == 4 and first.ok and first_seconds < 0.15
+    assert sorted(result.index for result in remaining) == [0, 1, 2, 3]
+    assert time.perf_counter() - started >= 0.8
+
+
+@pytest.mark.parametrize('backend', ['memory', 'disk'])
+def test_cached_gets_are_revalidated_and_invalidated_by_writes(stub_api, backend, tmp_path):
+    server, base_url = stub_api
+    ResponseCache.enable(ttl=60, disk_path=str(tmp_path / 'cache.sqlite') if backend == 'disk' else None)
+    ResponseCache.reset_stats()
+    try:
+        first = ApiClient.get_resource(f'{base_url}/config')
+        cached = ApiClient.get_resource(f'{base_url}/config')
+        ResponseCache.ttl = 0
+        revalidated = ApiClient.get_resource(f'{base_url}/config')
+        ResponseCache.ttl = 60
+        ApiClient.put_resource(f'{base_url}/config', payload='{}')
+        refetched = ApiClient.get_resource(f'{base_url}/config')
+        other_user = ApiClient.get_resource(f'{base_url}/config', auth_type='basic',
+                                            credentials={'username': 'other', 'password': 'secret'})
+    finally:
+        ResponseCache.disable()
+
+    assert first.json() == cached.json() == revalidated.json() == refetched.json()
+    assert revalidated.status_code == other_user.status_code == 200
+    assert server.requests.count(('GET', '/config')) == 4
+    assert ResponseCache.get_stats() == {'misses': 3, 'hits': 1, 'revalidations': 1, 'stores': 4,
+                                         'invalidations': 1}
+
+
+def test_cached_gets_are_not_shared_across_credential_headers(stub_api):
+    server, base_url = stub_api
+    ResponseCache.enable(ttl=60)
+    try:
+        responses = [ApiClient.get_resource(f'{base_url}/profile', headers={'Authorization': f'Bearer {user}'})
+                     for user in ('alice', 'bob', 'alice', 'bob')]
+        anonymous = ApiClient.get_resource(f'{base_url}/profile')
+    finally:
+        ResponseCache.disable()
+
+    assert [response.json().get('authorization') for response in responses + [anonymous]] == [
+        'Bearer alice', 'Bearer bob', 'Bearer alice', 'Bearer bob', None]
+    assert server.requests.count(('GET', '/profile')) == 3
+    assert b''.join(responses[2].iter_content(8)) == responses[0].content
+    assert responses[2].request.headers['Authorization'] == 'Bearer alice'
+
+
+def test_cached_gets_match_the_vary_header_and_redirect_mode_of_their_response(stub_api):
+    server, base_url = stub_api
+    ResponseCache.enable(ttl=60)
+    try:
+        greetings = [ApiClient.get_resource(f'{base_url}/greeting', headers={'X-Locale': locale})
+                     for locale in ('fr', 'de', 'fr', 'de')]
+        live = [ApiClient.get_resource(f'{base_url}/live') for _ in range(2)]
+        followed = ApiClient.get_resource(f'{base_url}/moved')
+        not_followed = ApiClient.get_resource(f'{base_url}/moved', follow_redirects=False)
+    finally:
+        ResponseCache.disable()
+
+    assert [response.json()['locale'] for response in greetings] == ['fr', 'de', 'fr', 'de']
+    assert server.requests.count(('GET', '/greeting')) == 2
+    assert server.requests.count(('GET', '/live')) == len(live)
+    assert (followed.status_code, not_followed.status_code) == (200, 302)
+
+
+def test_downloads_are_streamed_in_bounded_chunks_and_checksummed(stub_api, tmp_path):
+    server, base_url = stub_api
+    size = 5 * len(EXPORT_BLOCK) + 123
+    expected = (EXPORT_BLOCK * 6)[:size]
+    progress = []
+
+    with ApiClient.stream_resource(f'{base_url}/exports/{size}', chunk_size=16 * 1024) as download:
+        chunk_sizes = [len(chunk) for chunk in download]
+    result = ApiClient.download_resource(f'{base_url}/exports/{size}', tmp_path / 'export.bin',
+                                         progress=lambda done, total: progress.append((done, total)))
+
+    assert max(chunk_sizes) <= 16 * 1024 and sum(chunk_sizes) == size
+    assert download.checksum == result.checksum == hashlib.sha256(expected).hexdigest()
+    assert (tmp_path / 'export.bin').read_bytes() == expected
+    assert result.bytes == size and result.response.status_code == 200
+    assert progress[-1] == (size, size)
+
+
+def test_uploads_stream_files_generators_and_multipart_bodies(stub_api, tmp_path):
+    server, base_url = stub_api
+    export = tmp_path / 'orders.csv'
+    export.write_bytes(EXPORT_BLOCK * 3)
+
+    from_file = ApiClient.upload_resource(f'{base_url}/uploads', str(export), chunk_size=4096)
+    from_generator = ApiClient.upload_resource(f'{base_url}/uploads', (f'row {n}\n'.encode() for n in range(1000)),
+                                               method='POST')
+    multipart = ApiClient.upload_resource(f'{base_url}/uploads', MultipartStream(
+        {'description': 'nightly export', 'file': ('orders.csv', io.BytesIO(EXPORT_BLOCK), 'text/csv')}),
+        method='POST')
+
+    (file_headers, file_body), (generator_headers, generator_body), (multipart_headers, multipart_body) = \
+        server.uploads
+    assert file_body == EXPORT_BLOCK * 3 and file_headers['Content-Length'] == str(len(file_body))
+    assert generator_headers['Transfer-Encoding'] == 'chunked'
+    assert generator_body == b''.join(f'row {n}\n'.encode() for n in range(1000))
+    assert (from_file.bytes, from_generator.bytes, multipart.bytes) == (
+        len(file_body), len(generator_body), len(multipart_body))
+    assert multipart_headers['Content-Length'] == str(len(multipart_body))
+
+    message = BytesParser().parsebytes(
+        f"Content-Type: {multipart_headers['Content-Type']}\r\n\r\n".encode() + multipart_body)
+    parts = {part.get_param('name', header='Content-Disposition'): part for part in message.get_payload()}
+    assert parts['description'].get_payload() == 'nightly export'
+    assert parts['file'].get_filename() == 'orders.csv'
+    assert parts['file'].get_payload(decode=True) == EXPORT_BLOCK
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+
+from auto_utilities.async_ui_utilities import (AsyncBrowserActions, AsyncUIActions, AsyncUIWaits,
+                                               AsyncWebDriverManager, ELEMENT_KEY, send_w3c_command)
+from auto_utilities.stub_webdriver import StubElement, StubWebDriverServer
+
+pytestmark = [pytest.mark.unit]
+
+SESSIONS = 25
+STUB_PAGES = {
+    '*': {
+        '#name': [StubElement('input', rect={'x': 10.4, 'y': 20.6, 'width': 100, 'height': 20})],
+        '#choice': [StubElement('select', options=['A', 'B'])],
+    },
+}
+BROWSER_LOGS = [{'level': 'SEVERE', 'message': 'app.js 1:1 Uncaught TypeError'}, {'level': 'INFO', 'message': 'ok'}]
+
+
+def test_concurrent_sessions_share_one_event_loop():
+    async def scenario(host):
+        async def user_flow(number):
+            await AsyncWebDriverManager.launch_driver(remote_host=host)
+            await AsyncBrowserActions.navigate_to_url(f'https://example.com/{number}')
+            await AsyncUIActions.enter_text('#name', f'user {number}', click_first=False, clear_first=False)
+            value = await AsyncUIActions.get_element_attribute('#name', 'value')
+            url = await AsyncBrowserActions.get_current_url()
+            await AsyncWebDriverManager.terminate_driver()
+            return value, url
+
+        try:
+            return await asyncio.gather(*(user_flow(number) for number in range(SESSIONS)))
+        finally:
+            await AsyncWebDriverManager.close_http_client()
+
+    with StubWebDriverServer(STUB_PAGES, latency=0.01) as server:
+        results = asyncio.run(scenario(server.host))
+        open_sessions = dict(server.sessions)
+
+    assert results == [(f'user {number}', f'https://example.com/{number}') for number in range(SESSIONS)]
+    assert open_sessions == {}
+
+
+def test_waits_poll_without_blocking_other_sessions():
+    async def scenario(host):
+        async def wait_for_missing_element():
+            await AsyncWebDriverManager.launch_driver(remote_host=host)
+            try:
+                with pytest.raises(TimeoutException):
+                    await AsyncUIWaits.wait_until_visible('#missing', timeout=0.5, poll_frequency=0.1)
+            finally:
+                await AsyncWebDriverManager.terminate_driver()
+
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*(wait_for_missing_element() for _ in range(SESSIONS)))
+        finally:
+            await AsyncWebDriverManager.close_http_client()
+        return time.monotonic() - started
+
+    with StubWebDriverServer(STUB_PAGES, latency=0.01) as server:
+        elapsed = asyncio.run(scenario(server.host))
+
+    assert elapsed < SESSIONS * 0.5 / 2
+
+
+def test_actions_and_element_helpers_send_w3c_payloads():
+    async def scenario(server):
+        driver = await AsyncWebDriverManager.launch_driver(remote_host=server.host)
+        try:
+            await AsyncBrowserActions.navigate_to_url('https://stub.example/form')
+            await AsyncUIActions.perform_mouse_click('double_click', '#name', x_offset=5, reset_position=False)
+            await AsyncUIActions.execute_keyboard_shortcut('a', modifier_key='control')
+            await AsyncUIActions.select_option_by_text('#choice', 'B')
+            with pytest.raises(NoSuchElementException, match='visible text: C'):
+                await AsyncUIActions.select_option_by_text('#choice', 'C')
+            with pytest.raises(ValueError):
+                await AsyncUIActions.perform_mouse_click('triple_click')
+            await AsyncUIActions.click_element('#name')
+            return (await AsyncUIActions.get_element_location('#name'),
+                    await AsyncUIActions.is_element_focused('#name'),
+                    await AsyncUIActions.get_selected_option_text('#choice'),
+                    await AsyncUIActions.capture_console_browser_errors('SEVERE', display_err=True),
+                    server.sessions[driver.session_id]['actions'])
+        finally:
+            await AsyncWebDriverManager.terminate_driver()
+            await AsyncWebDriverManager.close_http_client()
+
+    with StubWebDriverServer(STUB_PAGES, browser_logs=BROWSER_LOGS) as server:
+        location, focused, selected, errors, actions = asyncio.run(scenario(server))
+
+    assert location == {'x': 10, 'y': 21} and focused
+    assert selected == 'B'
+    assert errors == ['app.js 1:1 Uncaught TypeError']
+    move, clicks, release, shortcut, _ = actions
+    assert list(move[0]['actions'][0]['origin']) == [ELEMENT_KEY] and move[0]['actions'][0]['x'] == 5
+    assert [action['type'] for action in clicks[0]['actions']] == ['pointerDown', 'pointerUp'] * 2
+    assert release is None
+    assert [(action['type'], action['value']) for action in shortcut[0]['actions']] == [
+        ('keyDown', '\ue009'), ('keyDown', 'a'), ('keyUp', 'a'), ('keyUp', '\ue009')]
+
+
+def test_commands_fail_on_non_json_answers_and_time_out(monkeypatch):
+    async def handle(request):
+        if request.path == '/slow':
+            await asyncio.sleep(1)
+        return web.Response(text='<html>502 Bad Gateway</html>', status=502, content_type='text/html')
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_route('*', '/{path:.*}', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+        http_client = AsyncWebDriverManager.get_http_client()
+        try:
+            with pytest.raises(WebDriverException, match=r'Invalid WebDriver response .*\(502 Bad Gateway\)'):
+                await send_w3c_command(http_client, 'GET', f'{url}/status')
+            with pytest.raises(TimeoutException, match='within 0.2 seconds'):
+                await send_w3c_command(http_client, 'GET', f'{url}/slow')
+        finally:
+            await AsyncWebDriverManager.close_http_client()
+            await runner.cleanup()
+
+    monkeypatch.setattr(AsyncWebDriverManager, 'command_timeout', 0.2)
+    asyncio.run(scenario())
@@ -0,0 +1,165 @@
+import os
+import threading
+
+import pytest
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from auto_utilities import browser_pool as browser_pool_module
+from auto_utilities.browser_pool import BrowserPool
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+pytestmark = [pytest.mark.unit]
+
+
+class FakeDriver:
+    '''
+    Records the commands BrowserPool sends; `crashed` makes every command fail like a dead browser
+    '''
+
+    def __init__(self):
+        self.crashed = False
+        self.quit_called = False
+        self.commands = []
+        self.switch_to = self
+
+    @property
+    def window_handles(self):
+        if self.crashed:
+            raise WebDriverException('browser crashed')
+        return ['main']
+
+    def window(self, handle):
+        self.commands.append(('window', handle))
+
+    def execute_script(self, script):
+        self.commands.append(('script', script))
+        return 'https://www.facebook.com'
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+    def delete_all_cookies(self):
+        self.commands.append(('delete_all_cookies',))
+
+    def get(self, url):
+        self.commands.append(('get', url))
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    '''
+    Replaces browser launches with FakeDrivers; set `fail` to make every further launch raise, or `max_drivers` to make
+    launches raise once that many drivers were created
+    '''
+    state = {'drivers': [], 'fail': False, 'max_drivers': None, 'attempts': 0}
+    lock = threading.Lock()
+
+    def create_driver(*args):
+        with lock:
+            state['attempts'] += 1
+            if state['fail'] or len(state['drivers']) == state['max_drivers']:
+                raise WebDriverException('chromedriver did not start')
+            driver = FakeDriver()
+            state['drivers'].append(driver)
+            return driver
+
+    monkeypatch.setattr(CustomWebDriverManager, 'create_driver', create_driver)
+    monkeypatch.setattr(browser_pool_module, 'RELAUNCH_BACKOFF', 0)
+    return state
+
+
+def test_reset_clears_cookies_of_every_site_and_storage_of_the_current_origin(launches):
+    pool = BrowserPool(size=1)
+    pool.start()
+    try:
+        driver = pool.lease()
+        pool.release(driver)
+    finally:
+        pool.close()
+
+    assert ('Network.clearBrowserCookies', {}) in driver.commands
+    assert ('Storage.clearDataForOrigin', {'origin': 'https://www.facebook.com', 'storageTypes': 'all'}) \
+        in driver.commands
+    assert driver.commands[-1] == ('get', 'about:blank')
+
+
+def test_failed_relaunches_are_retried_then_reported_by_lease(launches):
+    pool = BrowserPool(size=1)
+    pool.start()
+    try:
+        driver = pool.lease()
+        driver.crashed = True
+        launches['fail'] = True
+        pool.release(driver)
+        with pytest.raises(WebDriverException, match='All 1 browsers .* chromedriver did not start'):
+            pool.lease(timeout=30)
+    finally:
+        pool.close()
+
+    stats = pool.get_stats()
+    assert launches['attempts'] == 1 + browser_pool_module.MAX_RELAUNCH_ATTEMPTS
+    assert stats['crashed'] == 1 and stats['lost_slots'] == 1
+    assert stats['launch_failures'] == browser_pool_module.MAX_RELAUNCH_ATTEMPTS
+
+
+def test_drivers_launched_before_a_failed_start_are_quit(launches):
+    launches['max_drivers'] = 2
+    pool = BrowserPool(size=3)
+
+    with pytest.raises(WebDriverException, match='chromedriver did not start'):
+        pool.start()
+
+    assert len(launches['drivers']) == 2 and all(driver.quit_called for driver in launches['drivers'])
+    assert not os.path.exists(pool.download_root)
+
+
+def test_drivers_whose_downloads_cannot_be_removed_are_replaced(launches, monkeypatch):
+    pool = BrowserPool(size=1)
+    pool.start()
+    try:
+        driver = pool.lease()
+        with open(os.path.join(pool.get_download_path(driver), 'report.pdf'), 'w'):
+            pass
+
+        def remove(path):
+            raise PermissionError(f'file in use: {path}')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(os, 'remove', remove)
+            pool.release(driver)
+        replacement = pool.lease(timeout=5)
+    finally:
+        pool.close()
+
+    assert replacement is not driver and driver.quit_called
+    assert pool.get_stats()['crashed'] == 1
+
+
+def test_profile_copies_are_removed_with_recycled_and_closed_drivers(monkeypatch, tmp_path):
+    seed = tmp_path / 'seed'
+    seed.mkdir()
+    (seed / 'Preferences').write_text('{}')
+    monkeypatch.setitem(CustomWebDriverManager.performance_profiles, 'seeded', {'user_data_seed': str(seed)})
+    copies = []
+
+    def remote(command_executor, options):
+        copies.append(next(argument.split('=', 1)[1] for argument in options.arguments
+                           if argument.startswith('--user-data-dir=')))
+        return FakeDriver()
+
+    monkeypatch.setattr(webdriver, 'Remote', remote)
+    pool = BrowserPool(size=1, remote_host='grid', profile='seeded', max_uses=1)
+    pool.start()
+    try:
+        pool.release(pool.lease())
+        pool.lease(timeout=5)
+        recycled_copy_exists = os.path.exists(copies[0])
+    finally:
+        pool.close()
+
+    assert len(copies) == 2 and not recycled_copy_exists
+    assert not any(os.path.exists(os.path.dirname(copy)) for copy in copies)
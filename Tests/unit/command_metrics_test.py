@@ -0,0 +1,76 @@
+import pytest
+
+from auto_utilities.command_metrics import CommandRecorder, ELEMENT_KEY
+
+pytestmark = [pytest.mark.unit]
+
+
+class StubCommandExecutor:
+    '''
+    Answers findElement with a fixed element reference and every other command with an empty value
+    '''
+
+    def execute(self, command, params):
+        if command == 'findElement':
+            return {'value': {ELEMENT_KEY: 'element-1'}}
+        return {'value': None}
+
+
+class StubDriver:
+    def __init__(self):
+        self.command_executor = StubCommandExecutor()
+
+
+@pytest.fixture
+def recorder():
+    CommandRecorder.reset()
+    yield CommandRecorder
+    CommandRecorder.reset()
+
+
+def test_commands_are_attributed_to_test_phase_and_locator(recorder):
+    driver = recorder.instrument(StubDriver())
+    recorder.instrument(driver)
+    recorder.start_test('login')
+
+    executor = driver.command_executor
+    executor.execute('get', {'url': 'https://example.com'})
+    executor.execute('findElement', {'using': 'css selector', 'value': '#email'})
+    executor.execute('clickElement', {'id': 'element-1'})
+    executor.execute('w3cExecuteScriptAsync', {'script': '/* auto_utilities:wait */', 'args': [
+        [['#feed', 'css selector', 0, 'visible', None]], 1000]})
+    with recorder.phase('wait'):
+        executor.execute('findElements', {'using': 'css selector', 'value': '#error'})
+
+    summary = recorder.summarize_test('login')
+    report = recorder.build_report()
+
+    assert summary['commands'] == 5
+    assert {phase: totals['commands'] for phase, totals in summary['phases'].items()} == {
+        'navigation': 1, 'action': 2, 'wait': 2}
+    assert [record['locator'] for record in recorder.records] == [None, '#email', '#email', '#feed', '#error']
+    assert report['commands']['findElement']['count'] == 1
+    assert {entry['locator']: entry['commands'] for entry in report['slowest_locators']}['#email'] == 2
+
+
+def test_report_summarizes_every_test_like_summarize_test(recorder):
+    executor = recorder.instrument(StubDriver()).command_executor
+    for name in ['search', 'login', 'search']:
+        recorder.start_test(name)
+        executor.execute('get', {'url': 'https://example.com'})
+        executor.execute('findElement', {'using': 'css selector', 'value': '#email'})
+
+    report = recorder.build_report()
+
+    assert list(report['tests']) == ['search', 'login']
+    assert report['tests'] == {name: recorder.summarize_test(name) for name in ['search', 'login']}
+    assert report['tests']['search']['commands'] == 4
+
+
+def test_uninstrumented_driver_is_not_recorded(recorder):
+    driver = recorder.instrument(StubDriver())
+    recorder.uninstrument(driver)
+
+    driver.command_executor.execute('get', {'url': 'https://example.com'})
+
+    assert recorder.records == []
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def driver_init():
+    # Unit tests run against local stub servers and do not lease a browser
+    yield
@@ -0,0 +1,610 @@
+import gc
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    import psycopg
+    from auto_utilities import db_utilities
+    from auto_utilities.db_utilities import (BulkLoadResult, DatabaseHelper, PoolClosed, PoolTimeout,
+                                             SqlServerConnectionPool)
+except ImportError as e:
+    # cx_Oracle, pyodbc (with an ODBC driver manager), psycopg and pymysql-pool must all be importable
+    pytest.skip(f"Database drivers are not installed: {e}", allow_module_level=True)
+
+pytestmark = [pytest.mark.unit]
+
+
+class FakeCopy:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.rows = []
+        self.chunks = []
+
+    def __enter__(self):
+        self.cursor.copies.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+class FakeCursor:
+    '''
+    Cursor serving `rows` through fetchmany and recording executemany batches and COPYs; the fetch or batch numbered
+    `fail_at` raises `error`, and `batch_errors` maps batch numbers to the (offset, message) of their rejected rows
+    '''
+
+    def __init__(self, rows=(), error=None, fail_at=None, batch_errors=None):
+        self.rows = list(rows)
+        self.error = error
+        self.fail_at = fail_at
+        self.batch_errors = batch_errors or {}
+        self.calls = 0
+        self.batches = []
+        self.options = {}
+        self.copies = []
+        self.rowcount = -1
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def execute(self, query, *params):
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchmany(self, size):
+        self._call()
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def executemany(self, query, batch, **options):
+        self._call()
+        self.batches.append(list(batch))
+        self.options = options
+
+    def getbatcherrors(self):
+        return [SimpleNamespace(offset=offset, message=message)
+                for offset, message in self.batch_errors.get(len(self.batches), [])]
+
+    def copy(self, statement):
+        return FakeCopy(self)
+
+    def close(self):
+        self.closed = True
+
+    def _call(self):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise self.error
+
+
+class FakeOdbcConnection:
+    '''
+    pyodbc connection answering the health check unless `broken` is set; it is its own cursor unless `fake_cursor` is
+    set
+    '''
+
+    fake_cursor = None
+
+    def __init__(self, number):
+        self.number = number
+        self.broken = False
+        self.closed = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        if self.broken:
+            raise db_utilities.pyodbc.Error('08S01', 'Communication link failure')
+        return self.fake_cursor or self
+
+    def execute(self, query, *params):
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def odbc(monkeypatch):
+    '''
+    Replaces pyodbc.connect with FakeOdbcConnections; connections listed in `fail_at` fail to open
+    '''
+    state = {'connections': [], 'fail_at': set()}
+
+    def connect(connection_string):
+        number = len(state['connections']) + 1
+        if number in state['fail_at']:
+            state['fail_at'].discard(number)
+            raise db_utilities.pyodbc.Error('08001', 'Login timeout expired')
+        conn = FakeOdbcConnection(number)
+        state['connections'].append(conn)
+        return conn
+
+    monkeypatch.setattr(db_utilities.pyodbc, 'connect', connect)
+    return state
+
+
+def test_sql_server_pool_reuses_the_most_recently_returned_connection(odbc):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=1, max_size=3)
+
+    first, second = pool.getconn(), pool.getconn()
+    pool.putconn(first)
+    pool.putconn(second)
+    with pool.connection() as reused:
+        pass
+
+    assert reused is second and reused.rollbacks == 2
+    assert (pool.size, pool.idle, pool.created) == (2, 2, 2)
+
+
+def test_sql_server_pool_times_out_when_exhausted_and_wakes_on_return(odbc):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1, timeout=30)
+    held = pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout, match='after 0.1 seconds'):
+        pool.getconn(timeout=0.1)
+    assert 0.1 <= time.monotonic() - started < 1
+
+    threading.Timer(0.1, pool.putconn, [held]).start()
+    assert pool.getconn(timeout=5) is held
+
+
+def test_sql_server_pool_replaces_connections_failing_the_health_check(odbc):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=2, max_size=2)
+    for conn in odbc['connections']:
+        conn.broken = True
+
+    conn = pool.getconn()
+
+    assert conn.number == 3 and not conn.broken
+    assert all(broken.closed for broken in odbc['connections'][:2])
+    assert (pool.size, pool.created, pool.destroyed) == (1, 3, 2)
+
+
+def test_sql_server_pool_closes_connections_idle_above_min_size(odbc):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=1, max_size=3, max_idle=0.05)
+    leased = [pool.getconn() for _ in range(3)]
+    for conn in leased:
+        pool.putconn(conn)
+
+    time.sleep(0.1)
+    conn = pool.getconn()
+
+    assert conn is leased[-1]
+    assert [expired.closed for expired in leased] == [True, True, False]
+    assert (pool.size, pool.destroyed) == (1, 2)
+
+
+def test_sql_server_pool_cleans_up_failed_setup_and_rejects_use_after_close(odbc):
+    odbc['fail_at'] = {3}
+    with pytest.raises(db_utilities.pyodbc.Error):
+        SqlServerConnectionPool('DSN=qa', min_size=3, max_size=3)
+    assert all(conn.closed for conn in odbc['connections'])
+
+    pool = SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1)
+    held = pool.getconn()
+    waiter = threading.Timer(0.1, pool.close)
+    waiter.start()
+    started = time.monotonic()
+    with pytest.raises(PoolClosed):
+        pool.getconn(timeout=30)
+    assert time.monotonic() - started < 5
+    with pytest.raises(PoolClosed):
+        pool.getconn()
+    pool.putconn(held)
+
+    assert held.closed and pool.size == 0
+
+
+class FakeMySQLConnection:
+    '''
+    pymysqlpool connection carrying the attributes its pool tracks; close() returns it to the pool
+    '''
+
+    fake_cursor = None
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._create_ts = int(time.time())
+        self._returned = False
+        self.server_status = 0
+        self.begins = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, *cursor_class):
+        return self.fake_cursor or FakeCursor()
+
+    def begin(self):
+        self.begins += 1
+        self.server_status |= db_utilities.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def commit(self):
+        self.commits += 1
+        self.server_status &= ~db_utilities.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status &= ~db_utilities.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def close(self):
+        self._pool._put_connection(self)
+
+
+class FakeMySQLPool(db_utilities.ConnectionPool):
+    def _create_connection(self):
+        self._created_num.append(1)
+        conn = FakeMySQLConnection(self)
+        self.__dict__.setdefault('connections', []).append(conn)
+        return conn
+
+
+class FakeOracleError:
+    code = db_utilities.ORACLE_POOL_TIMEOUT_CODE
+    message = 'ORA-24457: OCISessionGet() could not find a free session in the specified timeout period'
+
+
+class FakeOracleConnection:
+    fake_cursor = None
+    outputtypehandler = None
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.fake_cursor or FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeSessionPool(db_utilities.SessionPool):
+    '''
+    Session pool holding `sessions` sessions; acquire waits up to wait_timeout (ms) like a TIMEDWAIT cx_Oracle pool
+    '''
+
+    wait_timeout = 30000
+    opened = busy = 0
+
+    def __init__(self, sessions):
+        self.opened = sessions
+        self.free = threading.Semaphore(sessions)
+        self.waits = []
+        self.connections = []
+
+    def acquire(self):
+        self.waits.append(self.wait_timeout)
+        if not self.free.acquire(timeout=self.wait_timeout / 1000):
+            raise db_utilities.cx_Oracle.DatabaseError(FakeOracleError())
+        self.busy += 1
+        self.connections.append(FakeOracleConnection())
+        return self.connections[-1]
+
+    def release(self, conn):
+        self.busy -= 1
+        self.free.release()
+
+
+class FakePostgresConnection:
+    fake_cursor = None
+    autocommit = False
+    closed = False
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, name=None, withhold=False):
+        return self.fake_cursor or FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePostgresPool(db_utilities.PstgConnectionPool):
+    '''
+    psycopg pool lending a single FakePostgresConnection
+    '''
+
+    def __init__(self):
+        self.conn = FakePostgresConnection()
+        self.connections = [self.conn]
+        self.leased = False
+
+    def getconn(self, timeout=None):
+        self.leased = True
+        return self.conn
+
+    def putconn(self, conn):
+        self.leased = False
+
+    def get_stats(self):
+        return {'pool_size': 1, 'pool_available': 0 if self.leased else 1}
+
+
+@pytest.fixture
+def pool_metrics():
+    DatabaseHelper.reset_pool_metrics()
+    yield
+    DatabaseHelper.reset_pool_metrics()
+
+
+def test_lease_records_checkouts_and_translates_driver_timeouts(odbc, pool_metrics):
+    pools = {'sql_server': SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1),
+             'mysql': FakeMySQLPool(size=1, maxsize=1),
+             'oracle': FakeSessionPool(sessions=1)}
+
+    for name, pool in pools.items():
+        with DatabaseHelper.lease(pool) as conn:
+            with pytest.raises(PoolTimeout):
+                with DatabaseHelper.lease(pool, timeout=0.1):
+                    pass
+        with DatabaseHelper.lease(pool, timeout=1) as reused:
+            assert reused is conn or name == 'oracle'
+
+        metrics = DatabaseHelper.get_pool_metrics(pool)
+        assert (metrics['checkouts'], metrics['timeouts']) == (2, 1), name
+        assert (metrics['size'], metrics['in_use'], metrics['idle']) == (1, 0, 1), name
+        assert 90 <= metrics['wait_ms_max'] < 1000, name
+
+    default_wait, short_wait, long_wait = pools['oracle'].waits
+    assert default_wait == pools['oracle'].wait_timeout == 30000
+    assert 90 <= short_wait <= 100 and 900 <= long_wait <= 1000
+
+
+def test_pool_metrics_are_dropped_with_their_pool(odbc, pool_metrics):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1)
+    with DatabaseHelper.lease(pool):
+        pass
+    assert DatabaseHelper.get_pool_metrics(pool)['checkouts'] == 1
+
+    del pool
+    gc.collect()
+    replacement = SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1)
+
+    assert len(DatabaseHelper._pool_metrics) == 0
+    assert DatabaseHelper.get_pool_metrics(replacement)['checkouts'] == 0
+
+
+def test_unsupported_result_formats_are_rejected_before_checkout(odbc, pool_metrics):
+    pool = SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1)
+
+    for run_query in (DatabaseHelper.run_postgres_query, DatabaseHelper.run_mysql_query):
+        with pytest.raises(ValueError, match='Unsupported result format: csv'):
+            run_query('SELECT 1', pool, result_format='csv')
+    with pytest.raises(ValueError, match='Unsupported result format: csv'):
+        DatabaseHelper.run_sql_server_query('SELECT 1', pool=pool, result_format='csv')
+
+    assert DatabaseHelper.get_pool_metrics(pool)['checkouts'] == 0
+
+
+def test_mysql_checkouts_grow_the_pool_up_to_maxsize_without_waiting(pool_metrics):
+    pool = FakeMySQLPool(size=1, maxsize=3)
+    pool.checkout_timeout = 3
+
+    started = time.monotonic()
+    with DatabaseHelper.lease(pool), DatabaseHelper.lease(pool), DatabaseHelper.lease(pool):
+        opened = time.monotonic() - started
+        with pytest.raises(PoolTimeout, match='after 0.2 seconds'):
+            with DatabaseHelper.lease(pool, timeout=0.2):
+                pass
+
+    metrics = DatabaseHelper.get_pool_metrics(pool)
+    assert opened < 0.5 and metrics['wait_ms_max'] < 500
+    assert (metrics['checkouts'], metrics['timeouts'], metrics['size'], metrics['idle']) == (3, 1, 3, 3)
+
+
+def test_mysql_checkin_rolls_back_open_transactions(pool_metrics):
+    pool = FakeMySQLPool(size=1, maxsize=1)
+
+    with pytest.raises(TypeError):
+        with DatabaseHelper.lease(pool) as conn:
+            conn.begin()
+            raise TypeError('malformed row')
+    with DatabaseHelper.lease(pool) as reused:
+        pass
+
+    assert reused is conn and conn.rollbacks == 1 and not conn.server_status
+
+
+BACKENDS = {
+    'mysql': (lambda: FakeMySQLPool(size=1, maxsize=1), FakeMySQLConnection,
+              lambda message: db_utilities.Error(message)),
+    'oracle': (lambda: FakeSessionPool(sessions=1), FakeOracleConnection,
+               lambda message: db_utilities.cx_Oracle.Error(message)),
+    'sql_server': (lambda: SqlServerConnectionPool('DSN=qa', min_size=0, max_size=1), FakeOdbcConnection,
+                   lambda message: db_utilities.pyodbc.Error('HY000', message)),
+    'postgres': (FakePostgresPool, FakePostgresConnection, lambda message: psycopg.OperationalError(message)),
+}
+STREAM_QUERIES = {'mysql': DatabaseHelper.stream_mysql_query, 'oracle': DatabaseHelper.stream_oracle_query,
+                  'sql_server': DatabaseHelper.stream_sql_server_query,
+                  'postgres': DatabaseHelper.stream_postgres_query}
+BULK_LOADS = {'mysql': DatabaseHelper.run_mysql_bulk, 'oracle': DatabaseHelper.run_oracle_bulk,
+              'sql_server': DatabaseHelper.run_sql_server_bulk, 'postgres': DatabaseHelper.run_postgres_bulk}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request, odbc, pool_metrics, monkeypatch):
+    '''
+    Pool of each backend whose connections hand out the cursor given to `use_cursor`, and the connections it opened
+    '''
+    make_pool, connection_class, make_error = BACKENDS[request.param]
+    pool = make_pool()
+
+    def use_cursor(cursor):
+        monkeypatch.setattr(connection_class, 'fake_cursor', cursor)
+
+    def connections():
+        return odbc['connections'] if request.param == 'sql_server' else pool.connections
+
+    return {'name': request.param, 'pool': pool, 'use_cursor': use_cursor, 'connections': connections,
+            'make_error': make_error}
+
+
+@pytest.fixture
+def streaming(backend):
+    '''
+    Function opening a stream on the backend's pool whose connection hands out the given cursor
+    '''
+    def open_stream(cursor, **options):
+        backend['use_cursor'](cursor)
+        return STREAM_QUERIES[backend['name']]('SELECT id FROM orders', pool=backend['pool'], batch_size=2, **options)
+
+    return backend['pool'], open_stream, backend['make_error']
+
+
+def test_streams_keep_the_connection_leased_until_they_are_exhausted(streaming):
+    pool, open_stream, make_error = streaming
+    cursor = FakeCursor(rows=[(number,) for number in range(5)])
+
+    rows = open_stream(cursor)
+    first = next(rows)
+    leased = DatabaseHelper.get_pool_metrics(pool)['in_use']
+    rest = list(rows)
+
+    assert [first] + rest == [(number,) for number in range(5)]
+    assert leased == 1 and DatabaseHelper.get_pool_metrics(pool)['in_use'] == 0
+    assert cursor.calls == 4 and cursor.closed
+
+
+def test_streams_return_the_connection_when_closed_early_or_failing(streaming):
+    pool, open_stream, make_error = streaming
+    cursor = FakeCursor(rows=[(number,) for number in range(5)])
+
+    batches = open_stream(cursor, as_batches=True)
+    assert next(batches) == [(0,), (1,)]
+    batches.close()
+    assert DatabaseHelper.get_pool_metrics(pool)['in_use'] == 0 and cursor.closed and cursor.calls == 1
+
+    error = make_error('connection lost')
+    failing = FakeCursor(rows=[(number,) for number in range(5)], error=error, fail_at=2)
+    with pytest.raises(type(error), match='connection lost'):
+        list(open_stream(failing))
+
+    metrics = DatabaseHelper.get_pool_metrics(pool)
+    assert (metrics['checkouts'], metrics['in_use']) == (2, 0) and failing.closed
+
+
+def test_bulk_loads_send_batches_and_commit_every_n_batches(backend):
+    cursor = FakeCursor()
+    backend['use_cursor'](cursor)
+
+    result = BULK_LOADS[backend['name']](query='INSERT INTO orders VALUES (?, ?)',
+                                         rows=((number, 'new') for number in range(5)), pool=backend['pool'],
+                                         batch_size=2, commit_every=2)
+
+    conn, = backend['connections']()
+    assert cursor.batches == [[(0, 'new'), (1, 'new')], [(2, 'new'), (3, 'new')], [(4, 'new')]]
+    assert (result.rows, result.batches, result.errors) == (5, 3, [])
+    assert conn.commits == 2 and getattr(conn, 'begins', 2) == 2
+    assert cursor.closed and DatabaseHelper.get_pool_metrics(backend['pool'])['in_use'] == 0
+
+
+def test_bulk_loads_roll_back_and_return_the_connection_on_errors(backend):
+    cursor = FakeCursor(error=backend['make_error']('duplicate key'), fail_at=2)
+    backend['use_cursor'](cursor)
+
+    result = BULK_LOADS[backend['name']](query='INSERT INTO orders VALUES (?, ?)',
+                                         rows=((number, 'new') for number in range(5)), pool=backend['pool'],
+                                         batch_size=2, commit_every=2)
+
+    conn, = backend['connections']()
+    assert result is None and len(cursor.batches) == 1
+    assert conn.commits == 0 and conn.rollbacks >= 1
+    assert DatabaseHelper.get_pool_metrics(backend['pool'])['in_use'] == 0
+
+
+@pytest.mark.parametrize('commit_every, commits, begins', [(0, 1, 1), (1, 6, 5), (2, 3, 3), (10, 1, 1)])
+def test_batches_are_committed_every_n_batches_and_once_at_the_end(commit_every, commits, begins):
+    conn = FakeMySQLConnection(pool=None)
+    sent = []
+
+    result = DatabaseHelper._execute_batches(conn, range(5), 1, commit_every, sent.append, begin=conn.begin)
+
+    assert sent == [[number] for number in range(5)]
+    assert (conn.commits, conn.begins, result.batches) == (commits, begins, 5)
+
+
+def test_oracle_batch_errors_are_reported_by_row_of_the_whole_load(pool_metrics, monkeypatch):
+    pool = FakeSessionPool(sessions=1)
+    cursor = FakeCursor(batch_errors={2: [(0, 'ORA-00001: unique constraint violated')],
+                                      3: [(1, 'ORA-01400: cannot insert NULL')]})
+    monkeypatch.setattr(FakeOracleConnection, 'fake_cursor', cursor)
+
+    result = DatabaseHelper.run_oracle_bulk('INSERT INTO orders VALUES (:1)', [(number,) for number in range(6)],
+                                            pool, batch_size=2)
+    without_batch_errors = DatabaseHelper.run_oracle_bulk('INSERT INTO orders VALUES (:1)', [(1,)], pool,
+                                                          batch_errors=False)
+
+    assert result.errors == [(2, 'ORA-00001: unique constraint violated'), (5, 'ORA-01400: cannot insert NULL')]
+    assert without_batch_errors.errors == [] and cursor.options == {'batcherrors': False}
+
+
+def test_rows_per_second_divides_rows_by_the_load_time():
+    assert BulkLoadResult(rows=500, batches=1, seconds=2.0, errors=[]).rows_per_second == 250
+    assert BulkLoadResult(rows=0, batches=0, seconds=0, errors=[]).rows_per_second == 0.0
+
+
+def test_postgres_rows_are_copied_one_copy_per_batch(pool_metrics, monkeypatch):
+    pool = FakePostgresPool()
+    cursor = FakeCursor()
+    monkeypatch.setattr(FakePostgresConnection, 'fake_cursor', cursor)
+
+    result = DatabaseHelper.copy_postgres_rows('qa.orders', ['id', 'status'], ((number, 'new') for number in range(5)),
+                                               pool, batch_size=2, commit_every=2)
+
+    assert [copy.rows for copy in cursor.copies] == [[(0, 'new'), (1, 'new')], [(2, 'new'), (3, 'new')], [(4, 'new')]]
+    assert (result.rows, result.batches, pool.conn.commits, pool.leased) == (5, 3, 2, False)
+
+
+@pytest.mark.parametrize('text_mode', [True, False])
+def test_postgres_csv_is_copied_in_chunks_until_the_end_of_the_file(pool_metrics, monkeypatch, tmp_path, text_mode):
+    content = 'id,status\n1,new\n2,shipped\n'
+    csv_path = tmp_path / 'orders.csv'
+    csv_path.write_text(content)
+    pool = FakePostgresPool()
+    cursor = FakeCursor()
+    cursor.rowcount = 2
+    monkeypatch.setattr(FakePostgresConnection, 'fake_cursor', cursor)
+
+    source = io.StringIO(content) if text_mode else csv_path
+    result = DatabaseHelper.copy_postgres_csv('qa.orders', source, pool, chunk_size=8)
+
+    copy, = cursor.copies
+    assert ''.join(copy.chunks) == content if text_mode else b''.join(copy.chunks) == content.encode()
+    assert all(len(chunk) <= 8 for chunk in copy.chunks)
+    assert (result.rows, result.batches, pool.conn.commits, pool.leased) == (2, 1, 1, False)
@@ -0,0 +1,389 @@
+// Minimal DOM the page scripts (auto_utilities/page_scripts.py) run against under node, for
+// Tests/unit/page_scripts_test.py. It implements only what the scripts use: CSS lookups by tag, id, class and
+// attribute, `//tag[@attr="value"]` XPath lookups, computed display/visibility, form fields, events,
+// MutationObserver notifications and an XMLHttpRequest that never reaches the network.
+'use strict';
+
+var observers = [];
+
+function notify(target) {
+    observers.forEach(function (observer) {
+        if (observer.root && observer.root.contains(target)) {
+            observer.schedule();
+        }
+    });
+}
+
+function parseStyle(text) {
+    var style = {};
+    text.split(';').forEach(function (declaration) {
+        var separator = declaration.indexOf(':');
+        if (separator > 0) {
+            style[declaration.slice(0, separator).trim()] = declaration.slice(separator + 1).trim();
+        }
+    });
+    return style;
+}
+
+class Event {
+    constructor(type, init) {
+        this.type = type;
+        this.bubbles = Boolean(init && init.bubbles);
+    }
+}
+
+class EventTarget {
+    addEventListener(type, listener) {
+        this.listeners = this.listeners || {};
+        (this.listeners[type] = this.listeners[type] || []).push(listener);
+    }
+
+    removeEventListener(type, listener) {
+        var listeners = (this.listeners || {})[type] || [];
+        if (listeners.indexOf(listener) !== -1) {
+            listeners.splice(listeners.indexOf(listener), 1);
+        }
+    }
+
+    dispatchEvent(event) {
+        var target = this;
+        while (target) {
+            ((target.listeners || {})[event.type] || []).slice().forEach(function (listener) {
+                listener.call(target, event);
+            });
+            target = event.bubbles ? target.parentNode || (target === document.documentElement ? document : null)
+                : null;
+        }
+        return true;
+    }
+}
+
+class HTMLElement extends EventTarget {
+    constructor(tagName, attributes) {
+        super();
+        this.tagName = tagName.toUpperCase();
+        this.attributes = {};
+        this.childNodes = [];
+        this.parentNode = null;
+        this.style = {};
+        this.ownText = '';
+        Object.keys(attributes || {}).forEach(function (name) { this.setAttribute(name, attributes[name]); }, this);
+    }
+
+    get id() {
+        return this.getAttribute('id') || '';
+    }
+
+    get disabled() {
+        return this.getAttribute('disabled') !== null;
+    }
+
+    get isConnected() {
+        return document.documentElement.contains(this);
+    }
+
+    get isContentEditable() {
+        return this.getAttribute('contenteditable') === 'true';
+    }
+
+    get textContent() {
+        return this.ownText + this.childNodes.map(function (child) { return child.textContent; }).join('');
+    }
+
+    set textContent(value) {
+        this.ownText = String(value);
+        this.childNodes = [];
+        notify(this);
+    }
+
+    get innerText() {
+        return this.textContent;
+    }
+
+    getAttribute(name) {
+        return Object.prototype.hasOwnProperty.call(this.attributes, name) ? this.attributes[name] : null;
+    }
+
+    setAttribute(name, value) {
+        this.attributes[name] = String(value);
+        if (name === 'style') {
+            this.style = parseStyle(this.attributes[name]);
+        }
+        notify(this);
+    }
+
+    appendChild(child) {
+        child.parentNode = this;
+        this.childNodes.push(child);
+        notify(this);
+        return child;
+    }
+
+    append() {
+        Array.prototype.forEach.call(arguments, function (child) {
+            if (typeof child === 'string') {
+                this.ownText += child;
+            } else {
+                this.appendChild(child);
+            }
+        }, this);
+    }
+
+    remove() {
+        var parent = this.parentNode;
+        if (parent) {
+            parent.childNodes.splice(parent.childNodes.indexOf(this), 1);
+            this.parentNode = null;
+            notify(parent);
+        }
+    }
+
+    contains(node) {
+        while (node && node !== this) {
+            node = node.parentNode;
+        }
+        return node === this;
+    }
+
+    descendants() {
+        return this.childNodes.reduce(function (found, child) {
+            return found.concat([child], child.descendants());
+        }, []);
+    }
+
+    querySelectorAll(selector) {
+        var compounds = selector.trim().split(/\s+/);
+        return this.descendants().filter(function (el) { return matchesPath(el, compounds); });
+    }
+
+    querySelector(selector) {
+        return this.querySelectorAll(selector)[0] || null;
+    }
+
+    getClientRects() {
+        for (var el = this; el; el = el.parentNode) {
+            if (el.style.display === 'none') {
+                return [];
+            }
+        }
+        return this.isConnected ? [{}] : [];
+    }
+
+    scrollIntoView(options) {
+        this.scrolledWith = options === undefined ? true : options;
+    }
+
+    focus() {
+        document.activeElement = this;
+    }
+
+    blur() {
+        document.activeElement = document.body;
+    }
+
+    click() {
+        if (this.disabled) {
+            return;
+        }
+        this.clicks = (this.clicks || 0) + 1;
+        this.dispatchEvent(new Event('click', {bubbles: true}));
+    }
+}
+
+class HTMLInputElement extends HTMLElement {
+    get value() {
+        return this.currentValue === undefined ? this.getAttribute('value') || '' : this.currentValue;
+    }
+
+    set value(value) {
+        this.currentValue = String(value);
+    }
+
+    get checked() {
+        return this.currentChecked === undefined ? this.getAttribute('checked') !== null : this.currentChecked;
+    }
+
+    set checked(value) {
+        this.currentChecked = Boolean(value);
+    }
+
+    click() {
+        if (!this.disabled && (this.getAttribute('type') === 'checkbox' || this.getAttribute('type') === 'radio')) {
+            this.checked = this.getAttribute('type') === 'radio' || !this.checked;
+        }
+        super.click();
+    }
+}
+
+class HTMLTextAreaElement extends HTMLElement {
+    get value() {
+        return this.currentValue === undefined ? this.textContent : this.currentValue;
+    }
+
+    set value(value) {
+        this.currentValue = String(value);
+    }
+}
+
+class HTMLOptionElement extends HTMLElement {
+    get text() {
+        return this.textContent;
+    }
+
+    get value() {
+        var value = this.getAttribute('value');
+        return value === null ? this.text : value;
+    }
+}
+
+class HTMLSelectElement extends HTMLElement {
+    get options() {
+        return this.childNodes.filter(function (child) { return child instanceof HTMLOptionElement; });
+    }
+
+    get selectedIndex() {
+        return this.currentIndex === undefined ? (this.options.length ? 0 : -1) : this.currentIndex;
+    }
+
+    get value() {
+        var option = this.options[this.selectedIndex];
+        return option ? option.value : '';
+    }
+
+    set value(value) {
+        this.currentIndex = this.options.findIndex(function (option) { return option.value === value; });
+    }
+}
+
+// Requests sent without a stub fail like an offline page, with an error event
+class XMLHttpRequest extends EventTarget {
+    open(method, url) {
+        this.method = method;
+        this.url = url;
+    }
+
+    send() {
+        var xhr = this;
+        setTimeout(function () { xhr.dispatchEvent(new Event('error')); }, 0);
+    }
+}
+
+var ELEMENT_CLASSES = {input: HTMLInputElement, textarea: HTMLTextAreaElement, select: HTMLSelectElement,
+                       option: HTMLOptionElement};
+
+function matchesCompound(el, compound) {
+    var parts = compound.match(/^([a-z*]*)((?:[#.][\w-]+|\[[\w-]+(?:="[^"]*")?\])*)$/i);
+    if (!parts) {
+        throw new Error('Unsupported selector in the fake DOM: ' + compound);
+    }
+    if (parts[1] && parts[1] !== '*' && el.tagName !== parts[1].toUpperCase()) {
+        return false;
+    }
+    return (parts[2].match(/[#.][\w-]+|\[[^\]]+\]/g) || []).every(function (part) {
+        if (part[0] === '#') {
+            return el.id === part.slice(1);
+        }
+        if (part[0] === '.') {
+            return (el.getAttribute('class') || '').split(/\s+/).indexOf(part.slice(1)) !== -1;
+        }
+        var attribute = /^\[([\w-]+)(?:="([^"]*)")?\]$/.exec(part);
+        return attribute[2] === undefined ? el.getAttribute(attribute[1]) !== null
+            : el.getAttribute(attribute[1]) === attribute[2];
+    });
+}
+
+function matchesPath(el, compounds) {
+    if (!matchesCompound(el, compounds[compounds.length - 1])) {
+        return false;
+    }
+    var ancestor = el.parentNode, remaining = compounds.slice(0, -1);
+    while (remaining.length && ancestor) {
+        if (matchesCompound(ancestor, remaining[remaining.length - 1])) {
+            remaining.pop();
+        }
+        ancestor = ancestor.parentNode;
+    }
+    return remaining.length === 0;
+}
+
+function evaluate(expression) {
+    var path = /^\/\/([a-z*]+)(?:\[@([\w-]+)=["']([^"']*)["']\])?$/i.exec(expression);
+    if (!path) {
+        throw new Error('Unsupported XPath in the fake DOM: ' + expression);
+    }
+    var selector = path[1] + (path[2] ? '[' + path[2] + '="' + path[3] + '"]' : '');
+    var found = document.documentElement.querySelectorAll(selector);
+    return {snapshotLength: found.length, snapshotItem: function (i) { return found[i]; }};
+}
+
+class MutationObserver {
+    constructor(callback) {
+        this.callback = callback;
+        this.root = null;
+        this.pending = false;
+    }
+
+    observe(root) {
+        this.root = root;
+        observers.push(this);
+    }
+
+    disconnect() {
+        this.root = null;
+        observers.splice(observers.indexOf(this), 1);
+    }
+
+    schedule() {
+        if (!this.pending) {
+            this.pending = true;
+            queueMicrotask(function () {
+                this.pending = false;
+                if (this.root) {
+                    this.callback([], this);
+                }
+            }.bind(this));
+        }
+    }
+}
+
+function el(tagName, attributes) {
+    var ElementClass = ELEMENT_CLASSES[tagName] || HTMLElement;
+    var element = new ElementClass(tagName, attributes);
+    element.append.apply(element, Array.prototype.slice.call(arguments, 2));
+    return element;
+}
+
+var document = new EventTarget();
+document.documentElement = el('html');
+document.body = document.documentElement.appendChild(el('body'));
+document.activeElement = document.body;
+document.querySelectorAll = function (selector) { return document.documentElement.querySelectorAll(selector); };
+document.querySelector = function (selector) { return document.documentElement.querySelector(selector); };
+document.evaluate = evaluate;
+
+function getComputedStyle(element) {
+    var defaults = {display: element.tagName === 'LI' ? 'list-item' : 'block', visibility: 'visible'};
+    var style = Object.assign({}, defaults, element.style);
+    style.getPropertyValue = function (name) { return style[name] === undefined ? '' : style[name]; };
+    return style;
+}
+
+// JSON replacer describing elements returned by the scripts
+function describe(key, value) {
+    if (value instanceof HTMLElement) {
+        return {tag: value.tagName.toLowerCase(), id: value.id, text: value.textContent};
+    }
+    return value;
+}
+
+function install(global) {
+    Object.assign(global, {
+        window: global, document: document, getComputedStyle: getComputedStyle, Event: Event,
+        MutationObserver: MutationObserver, XPathResult: {ORDERED_NODE_SNAPSHOT_TYPE: 7}, HTMLElement: HTMLElement,
+        HTMLInputElement: HTMLInputElement, HTMLTextAreaElement: HTMLTextAreaElement,
+        HTMLSelectElement: HTMLSelectElement, XMLHttpRequest: XMLHttpRequest, el: el,
+        location: {href: 'https://app.example/page'},
+    });
+}
+
+module.exports = {install: install, describe: describe};
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from auto_utilities.api_utilities import ApiClient
+from auto_utilities.load_runner import LatencyHistogram, LoadRunner
+
+pytestmark = [pytest.mark.unit]
+
+
+class StubLoadHandler(BaseHTTPRequestHandler):
+    '''
+    Keep-alive endpoint answering `/fast` at once, `/slow` after 50 ms and `/broken` with 500
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/slow':
+            time.sleep(0.05)
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(500 if self.path == '/broken' else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubLoadHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+
+    ApiClient.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_histogram_percentiles_stay_within_precision():
+    histogram = LatencyHistogram(significant_digits=3)
+    for value in range(1, 100_001):
+        histogram.record(value / 1_000_000)
+
+    assert histogram.count == 100_000
+    for percent in (50, 95, 99, 99.9):
+        expected = percent / 100 * 0.1
+        assert abs(histogram.percentile(percent) - expected) <= expected / 1000
+    assert histogram.percentile(100) == 0.1
+    assert len(histogram.counts) < 10_000
+
+
+def test_open_model_keeps_the_arrival_rate_and_reports_per_endpoint(stub_server, tmp_path):
+    runner = LoadRunner([{'method': 'GET', 'url': f'{stub_server}/fast', 'weight': 2},
+                         {'method': 'GET', 'url': f'{stub_server}/slow'},
+                         {'method': 'GET', 'url': f'{stub_server}/broken', 'name': 'broken'}],
+                        rate=200, duration=1)
+
+    report = runner.run()
+    runner.write_report(tmp_path / 'load.json')
+
+    endpoints = report['endpoints']
+    assert report['model'] == 'open' and report['total']['requests'] == 200
+    assert {name: endpoint['requests'] for name, endpoint in endpoints.items()} == {
+        'GET /fast': 100, 'GET /slow': 50, 'broken': 50}
+    assert endpoints['broken']['error_rate'] == 1.0 and endpoints['broken']['errors_by_type'] == {'500': 50}
+    assert endpoints['GET /fast']['errors'] == 0
+    assert endpoints['GET /slow']['latency_ms']['p50'] >= 50
+    assert set(endpoints['GET /slow']['latency_ms']) == {'min', 'mean', 'p50', 'p95', 'p99', 'p99.9', 'max'}
+    assert json.loads((tmp_path / 'load.json').read_text())['total']['requests'] == 200
+
+
+def test_closed_model_runs_virtual_users_back_to_back(stub_server):
+    report = LoadRunner([{'method': 'GET', 'url': f'{stub_server}/slow'}], concurrency=4, duration=0.5).run()
+
+    assert report['model'] == 'closed'
+    assert 4 * 5 <= report['total']['requests'] <= 4 * 11
+    assert report['total']['error_rate'] == 0.0
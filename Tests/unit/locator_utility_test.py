@@ -0,0 +1,36 @@
+import pickle
+from collections import OrderedDict
+
+import pytest
+from selenium.webdriver.common.by import By
+
+from auto_utilities import locator_utility
+from auto_utilities.locator_utility import Locator
+
+pytestmark = [pytest.mark.unit]
+
+
+def test_locators_resolve_their_strategy_and_are_interned():
+    row = Locator('//table//tr', index=1, timeout=30)
+
+    assert Locator('//table//tr', index=1, timeout=30) is row and Locator.of(row) is row
+    assert row.as_tuple() == (By.XPATH, '//table//tr') and Locator('#name').by == By.CSS_SELECTOR
+    assert row.resolve() == (1, 30) and row.resolve(index=0, timeout=5) == (0, 5)
+    assert pickle.loads(pickle.dumps(row)) is row
+    with pytest.raises(AttributeError):
+        row.index = 2
+
+
+def test_interning_keeps_only_the_most_recently_used_locators(monkeypatch):
+    monkeypatch.setattr(locator_utility, 'INTERNED_LOCATORS', 3)
+    monkeypatch.setattr(Locator, '_interned', OrderedDict())
+    first = Locator('#static')
+    evicted = Locator('#row-0')
+
+    for number in range(1, 5):
+        Locator(f'#row-{number}')
+        assert Locator('#static') is first
+
+    recreated = Locator('#row-0')
+    assert len(Locator._interned) == 3
+    assert recreated is not evicted and recreated == evicted and hash(recreated) == hash(evicted)
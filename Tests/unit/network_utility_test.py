@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+
+import pytest
+
+from auto_utilities.network_utility import RequestBlocker
+from auto_utilities.stub_webdriver import StubWebDriverServer
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+pytestmark = [pytest.mark.unit]
+
+
+def performance_entry(method: str, **params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+class FakeDriver:
+    '''
+    Driver answering collect_stats' round trips slowly, from a scripted performance log
+    '''
+
+    current_url = 'https://shop.test/'
+
+    def __init__(self, entries: list, latency: float = 0):
+        self.entries = entries
+        self.latency = latency
+
+    def get_log(self, log_type: str):
+        time.sleep(self.latency)
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_script(self, script: str):
+        time.sleep(self.latency)
+        return 2
+
+
+def test_collect_stats_counts_blocked_requests_and_does_not_serialize_drivers():
+    page = FakeDriver.current_url
+    driver = FakeDriver([
+        performance_entry('Network.requestWillBeSent', requestId='1', documentURL=page,
+                          request={'url': f'{page}logo.png'}),
+        performance_entry('Network.requestWillBeSent', requestId='2', documentURL=page,
+                          request={'url': f'{page}app.js'}),
+        performance_entry('Network.loadingFailed', requestId='1', type='Image', blockedReason='inspector'),
+        performance_entry('Network.loadingFinished', requestId='2'),
+    ])
+    slow_drivers = [FakeDriver([], latency=0.2) for _ in range(4)]
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=RequestBlocker.collect_stats, args=(slow,)) for slow in slow_drivers]
+    for thread in threads:
+        thread.start()
+    stats = RequestBlocker.collect_stats(driver)
+    for thread in threads:
+        thread.join()
+
+    assert stats == {page: {'requests_blocked': 1, 'requests_stubbed': 2, 'bytes_avoided': 0, 'by_type': {'Image': 1}}}
+    assert time.monotonic() - started < 2 * 0.2 * len(slow_drivers) / 2
+
+
+def test_only_first_party_blocked_urls_are_measured_unless_asked(monkeypatch):
+    page = FakeDriver.current_url
+    measured = []
+    monkeypatch.setattr(RequestBlocker, '_content_length', lambda url: measured.append(url) or 100)
+
+    def blocked(request_id: str, url: str):
+        return [performance_entry('Network.requestWillBeSent', requestId=request_id, documentURL=page,
+                                  request={'url': url}),
+                performance_entry('Network.loadingFailed', requestId=request_id, type='Image',
+                                  blockedReason='inspector')]
+
+    driver = FakeDriver(blocked('1', f'{page}logo.png') + blocked('2', 'https://www.google-analytics.com/collect'))
+    first_party = RequestBlocker.collect_stats(driver, measure_bytes=True)[page]['bytes_avoided']
+    driver.entries = blocked('3', 'https://cdn.example/hero.jpg')
+    stats = RequestBlocker.collect_stats(driver, measure_bytes=True, measure_third_party=True)
+    all_hosts = stats[page]['bytes_avoided']
+
+    assert measured == [f'{page}logo.png', 'https://cdn.example/hero.jpg']
+    assert (first_party, all_hosts) == (100, 200)
+
+
+def test_remote_drivers_reach_the_devtools_endpoint_through_their_command_executor():
+    with StubWebDriverServer() as server:
+        chrome = CustomWebDriverManager.create_driver('chrome', server.host)
+        firefox = CustomWebDriverManager.create_driver('firefox', server.host)
+        try:
+            RequestBlocker.apply(chrome, resource_types=['image'], stub_responses={'*/api/*': {'body': '{}'}})
+            with pytest.raises(ValueError, match='no DevTools endpoint'):
+                RequestBlocker.apply(firefox, resource_types=['image'])
+            cdp_commands = server.sessions[chrome.session_id]['cdp']
+        finally:
+            CustomWebDriverManager.quit_driver(chrome)
+            CustomWebDriverManager.quit_driver(firefox)
+
+    assert cdp_commands == ['Network.enable', 'Network.setBlockedURLs', 'Page.addScriptToEvaluateOnNewDocument']
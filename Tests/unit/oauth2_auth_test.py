@@ -0,0 +1,100 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from auto_utilities.api_utilities import ApiClient
+
+pytestmark = [pytest.mark.unit]
+
+
+class StubIdentityHandler(BaseHTTPRequestHandler):
+    '''
+    `/token` issues numbered client-credentials tokens after a short delay; every other path answers 200 only to the
+    latest token and 401 otherwise
+    '''
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        client = base64.b64decode(self.headers['Authorization'].split()[1]).decode()
+        time.sleep(0.2)
+        with server.lock:
+            server.token_requests.append((client, form['grant_type'][0], form.get('scope', [None])[0]))
+            server.issued = f'token-{len(server.token_requests)}'
+            data = {'access_token': server.issued, 'token_type': 'bearer', 'expires_in': server.expires_in}
+        self.respond(200, data)
+
+    def do_GET(self):
+        authorized = self.headers.get('Authorization') == f'Bearer {self.server.issued}'
+        self.respond(200 if authorized else 401, {'authorization': self.headers.get('Authorization')})
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def identity_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubIdentityHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.token_requests = []
+    server.issued = None
+    server.expires_in = 3600
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    ApiClient.clear_auth_cache()
+
+    yield server, base_url, {'token_url': f'{base_url}/token', 'client_id': 'qa-suite', 'client_secret': 'secret',
+                             'scope': 'orders:read'}
+
+    ApiClient.clear_auth_cache()
+    ApiClient.close_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_requests_share_a_single_token_fetch(identity_server):
+    server, base_url, credentials = identity_server
+    specs = [{'method': 'GET', 'url': f'{base_url}/orders/{n}', 'auth_type': 'oauth2', 'credentials': credentials}
+             for n in range(20)]
+
+    results = ApiClient.send_batch(specs, max_workers=20, per_host_limit=20)
+
+    assert all(result.ok for result in results)
+    assert server.token_requests == [('qa-suite:secret', 'client_credentials', 'orders:read')]
+    assert ApiClient._set_auth('oauth2', dict(credentials)) is ApiClient._set_auth('oauth2', credentials)
+
+
+def test_tokens_are_refreshed_before_expiry_and_after_rejection(identity_server):
+    server, base_url, credentials = identity_server
+    server.expires_in = 1
+    credentials['refresh_margin'] = 0.6
+
+    first = ApiClient.get_resource(f'{base_url}/orders', auth_type='oauth2', credentials=credentials)
+    time.sleep(0.5)
+    refreshed = ApiClient.get_resource(f'{base_url}/orders', auth_type='oauth2', credentials=credentials)
+    server.issued = 'revoked'
+    rejected = ApiClient.get_resource(f'{base_url}/orders', auth_type='oauth2', credentials=credentials)
+    recovered = ApiClient.get_resource(f'{base_url}/orders', auth_type='oauth2', credentials=credentials)
+
+    assert first.json()['authorization'] == 'Bearer token-1'
+    assert refreshed.json()['authorization'] == 'Bearer token-2'
+    assert rejected.status_code == 401
+    assert recovered.status_code == 200 and recovered.json()['authorization'] == 'Bearer token-3'
@@ -0,0 +1,214 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from auto_utilities.network_utility import RequestBlocker, STUB_COUNTER
+from auto_utilities.page_scripts import (FILL_FORM, READ_ELEMENTS, RESOLVE_ELEMENT, RESOLVE_ELEMENTS,
+                                         WAIT_FOR_CONDITIONS)
+
+NODE = shutil.which('node')
+FAKE_DOM = os.path.join(os.path.dirname(__file__), 'fake_dom.js')
+
+pytestmark = [pytest.mark.unit, pytest.mark.skipif(not NODE, reason='node is not installed, page scripts not run')]
+
+# The stub WebDriver answers the page scripts in Python; these tests run the scripts themselves under node, against
+# the fake DOM of fake_dom.js
+RUNNER = """
+const dom = require(process.argv[1]);
+dom.install(globalThis);
+const run = JSON.parse(process.argv[2]);
+setTimeout(function () {
+    process.stderr.write('The page script did not call back');
+    process.exit(1);
+}, 20000).unref();
+new Function(run.setup)();
+new Function(run.script).apply(null, run.args.concat([function (result) {
+    const page = new Function(run.inspect)();
+    process.stdout.write(JSON.stringify({result: result, page: page}, dom.describe));
+    process.exit(0);
+}]));
+"""
+
+TEST_PAGE = """
+document.body.append(
+    el('input', {id: 'email', value: 'user@example.com'}),
+    el('textarea', {id: 'notes'}),
+    el('select', {id: 'country'}, el('option', {}, 'Spain'), el('option', {}, 'Portugal'), el('option', {}, 'France')),
+    el('input', {id: 'terms', type: 'checkbox'}),
+    el('div', {id: 'editor', contenteditable: 'true'}, 'Draft'),
+    el('meter', {id: 'level', value: '0.5'}),
+    el('button', {id: 'hidden', style: 'display: none'}, 'Hidden'),
+    el('ul', {},
+       el('li', {class: 'item', 'data-id': '0', style: 'color: rgb(0, 0, 0)'}, 'Item 0'),
+       el('li', {class: 'item', 'data-id': '1', style: 'color: rgb(0, 0, 0)'}, 'Item 1'),
+       el('li', {class: 'item', 'data-id': '2', style: 'color: rgb(0, 0, 0)'}, 'Item 2'))
+);
+setTimeout(function () { document.body.appendChild(el('button', {id: 'late'}, 'Loaded')); }, 300);
+"""
+
+POLL = {'interval': 50, 'backoff': 1.5, 'max_interval': 500}
+
+
+def run_page_script(script: str, *args, setup: str = TEST_PAGE, inspect: str = 'return null;'):
+    '''
+    Runs a page script under node against the fake DOM built by `setup`, and returns what the script called back with
+    and what `inspect` returns right after
+    '''
+    program = json.dumps({'setup': setup, 'script': script, 'args': list(args), 'inspect': inspect})
+    completed = subprocess.run([NODE, '-e', RUNNER, FAKE_DOM, program], capture_output=True, text=True, timeout=30)
+    assert completed.returncode == 0, completed.stderr
+    output = json.loads(completed.stdout)
+    return output['result'], output['page']
+
+
+def test_every_page_script_reports_missing_elements_once_its_timeout_ends():
+    missing = ['#missing', 'css selector']
+    runs = {
+        'resolve': (RESOLVE_ELEMENT, *missing, 0, 'present', 0, None, None),
+        'read': (READ_ELEMENTS, [missing], {'text': True}, 0),
+        'wait': (WAIT_FOR_CONDITIONS, [missing + [0, 'present', None]], 0, POLL, 'all'),
+        'resolve_all': (RESOLVE_ELEMENTS, [missing + [0]], 'present', 0),
+        'fill': (FILL_FORM, [missing + [0, 'text']], {'clear': True, 'click': False}, 0),
+    }
+
+    results = {name: run_page_script(*run)[0] for name, run in runs.items()}
+    results['wait'].pop('elapsed')
+
+    assert results == {'resolve': {'element': None, 'ready': False}, 'read': {'ready': False, 'records': []},
+                       'wait': {'satisfied': False, 'results': [False]},
+                       'resolve_all': {'elements': [None], 'ready': False},
+                       'fill': {'ready': False, 'missing': ['#missing'], 'errors': []}}
+
+
+def test_resolve_element_waits_for_its_condition_and_scrolls_the_element_into_view():
+    late, scrolled = run_page_script(RESOLVE_ELEMENT, '#late', 'css selector', 0, 'clickable', 5000,
+                                     {'block': 'center'}, None,
+                                     inspect="return document.querySelector('#late').scrolledWith;")
+    by_xpath, _ = run_page_script(RESOLVE_ELEMENT, '//li[@data-id="2"]', 'xpath', 0, 'present', 0, None, None)
+    by_index, _ = run_page_script(RESOLVE_ELEMENT, 'li.item', 'css selector', 1, 'present', 0, None, None)
+    hidden, _ = run_page_script(RESOLVE_ELEMENT, '#hidden', 'css selector', 0, 'visible', 100, True, None)
+
+    assert late == {'element': {'tag': 'button', 'id': 'late', 'text': 'Loaded'}, 'ready': True}
+    assert scrolled == {'block': 'center'}
+    assert (by_xpath['element']['text'], by_index['element']['text']) == ('Item 2', 'Item 1')
+    assert hidden == {'element': {'tag': 'button', 'id': 'hidden', 'text': 'Hidden'}, 'ready': False}
+
+
+def test_read_elements_returns_one_record_per_matching_element():
+    result, _ = run_page_script(READ_ELEMENTS, [['li.item', 'css selector'], ['//input[@id="email"]', 'xpath']],
+                                {'text': True, 'attributes': ['data-id', 'value'], 'css': ['color']}, 1000)
+    hidden, _ = run_page_script(READ_ELEMENTS, [['#hidden', 'css selector'], ['#country', 'css selector']],
+                                {'text': True, 'selected_option': True}, 100)
+
+    records = result['records']
+    assert result['ready'] and [(record['locator'], record['index'], record['text']) for record in records] == [
+        ('li.item', 0, 'Item 0'), ('li.item', 1, 'Item 1'), ('li.item', 2, 'Item 2'), ('//input[@id="email"]', 0, '')]
+    assert [record['attributes'] for record in records[2:]] == [{'data-id': '2', 'value': None},
+                                                                {'data-id': None, 'value': 'user@example.com'}]
+    assert records[0]['css'] == {'color': 'rgba(0, 0, 0, 1)'}
+    assert not hidden['ready']
+    assert (hidden['records'][0]['text'], hidden['records'][0]['selected_option']) == ('', None)
+    assert hidden['records'][1]['selected_option'] == 'Spain'
+
+
+def test_wait_for_conditions_resolves_on_dom_changes_and_input_events_without_polling():
+    # Polling every 5 seconds, so only mutations and events can resolve the waits in time
+    slow_poll = {'interval': 5000, 'backoff': 1, 'max_interval': 5000}
+    changes = TEST_PAGE + """
+        setTimeout(function () { document.querySelectorAll('li.item')[1].remove(); }, 100);
+        setTimeout(function () {
+            var email = document.querySelector('#email');
+            email.value = 'new@example.com';
+            email.dispatchEvent(new Event('input', {bubbles: true}));
+        }, 100);
+    """
+
+    all_met, _ = run_page_script(WAIT_FOR_CONDITIONS, [['li.item', 'css selector', 1, 'stale', None],
+                                                       ['#late', 'css selector', 0, 'text', 'Load']],
+                                 5000, slow_poll, 'all', setup=changes)
+    typed, _ = run_page_script(WAIT_FOR_CONDITIONS, [['#email', 'css selector', 0, 'value', 'new@']], 5000, slow_poll,
+                               'all', setup=changes)
+    any_met, _ = run_page_script(WAIT_FOR_CONDITIONS, [['#missing', 'css selector', 0, 'visible', None],
+                                                       ['#late', 'css selector', 0, 'visible', None]],
+                                 5000, slow_poll, 'any')
+    none_met, _ = run_page_script(WAIT_FOR_CONDITIONS, [['li.item', 'css selector', 0, 'text', 'Missing']], 5000,
+                                  slow_poll, 'none')
+
+    assert (all_met['satisfied'], all_met['results']) == (True, [True, True]) and all_met['elapsed'] < 1000
+    assert typed['satisfied'] and typed['elapsed'] < 1000
+    assert (any_met['satisfied'], any_met['results']) == (True, [False, True]) and any_met['elapsed'] < 1000
+    assert (none_met['satisfied'], none_met['results']) == (True, [False]) and none_met['elapsed'] < 100
+
+
+def test_fill_form_sets_each_kind_of_field_and_fires_input_events():
+    listen = TEST_PAGE + """
+        window.events = [];
+        document.addEventListener('change', function (event) { window.events.push(event.type); });
+    """
+    fields = [['#email', 'css selector', 0, 'new@example.com'], ['#notes', 'css selector', 0, 'Line'],
+              ['#country', 'css selector', 0, 'France'], ['#terms', 'css selector', 0, True],
+              ['#editor', 'css selector', 0, ' and more']]
+
+    result, page = run_page_script(FILL_FORM, fields, {'clear': True, 'click': False}, 1000, setup=listen, inspect="""
+        return ['#email', '#notes', '#country'].map(function (id) { return document.querySelector(id).value; })
+            .concat([document.querySelector('#terms').checked, document.querySelector('#editor').textContent,
+                     window.events.length]);
+    """)
+    appended, editor = run_page_script(FILL_FORM, [fields[-1]], {'clear': False, 'click': False}, 1000,
+                                       inspect="return document.querySelector('#editor').textContent;")
+    rejected, _ = run_page_script(FILL_FORM, [['#level', 'css selector', 0, '1'],
+                                              ['#country', 'css selector', 0, 'Peru']],
+                                  {'clear': True, 'click': False}, 1000)
+
+    partial, untouched = run_page_script(FILL_FORM, [fields[0], ['#missing', 'css selector', 0, 'value']],
+                                         {'clear': True, 'click': False}, 100,
+                                         inspect="return document.querySelector('#email').value;")
+
+    assert result == appended == {'ready': True, 'missing': [], 'errors': []}
+    assert (partial, untouched) == ({'ready': False, 'missing': ['#missing'], 'errors': []}, 'user@example.com')
+    assert page == ['new@example.com', 'Line', 'France', True, ' and more', 4]
+    assert editor == 'Draft and more'
+    assert rejected['errors'] == ['#level: Element <meter> does not accept text',
+                                  '#country: Option with text "Peru" not found']
+
+
+def test_stubbed_fetch_and_xhr_calls_get_their_stub_response_and_others_reach_the_network():
+    # The page's own fetch fails like an offline network, so only stubbed calls can succeed
+    setup = "window.fetch = function (url) { return Promise.reject(new Error('offline: ' + url)); };\n" + \
+        RequestBlocker._stub_responses_script({'*/api/flags*': {'body': '{"beta": true}'},
+                                               '*/api/user': {'body': 'Ada', 'status': 201,
+                                                              'headers': {'Content-Type': 'text/plain'}}})
+    calls = """
+        var done = arguments[arguments.length - 1], results = {};
+        fetch('/api/flags?team=qa#top').then(function (response) {
+            results.fetch = [response.status, response.url, response.headers.get('Content-Type')];
+            return response.text();
+        }).then(function (body) {
+            results.fetch.push(body);
+            var xhr = new XMLHttpRequest();
+            xhr.addEventListener('load', function () {
+                results.xhr = [xhr.status, xhr.responseURL, xhr.getResponseHeader('Content-Type'), xhr.responseText];
+                var other = new XMLHttpRequest();
+                other.addEventListener('error', function () {
+                    fetch('https://cdn.example/app.js').catch(function (error) {
+                        results.unstubbed = error.message;
+                        done(results);
+                    });
+                });
+                other.open('GET', '/api/orders');
+                other.send();
+            });
+            xhr.open('GET', 'https://app.example/api/user');
+            xhr.send();
+        });
+    """
+
+    results, stubbed = run_page_script(calls, setup=setup, inspect=f'return window.{STUB_COUNTER};')
+
+    assert results == {'fetch': [200, 'https://app.example/api/flags?team=qa', 'application/json', '{"beta": true}'],
+                       'xhr': [201, 'https://app.example/api/user', 'text/plain', 'Ada'],
+                       'unstubbed': 'offline: https://cdn.example/app.js'}
+    assert stubbed == 2
@@ -0,0 +1,63 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from auto_utilities.result_frames import FrameAssertions, ResultFrames
+
+pytestmark = [pytest.mark.unit]
+
+
+@pytest.fixture
+def orders():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE orders (id INTEGER, status TEXT, total REAL)')
+    connection.executemany('INSERT INTO orders VALUES (?, ?, ?)',
+                           [(n, 'new' if n % 2 else 'shipped-with-a-long-status', n * 1.5) for n in range(1, 11)])
+    yield connection
+    connection.close()
+
+
+def test_results_are_built_column_wise_from_cursor_batches(orders):
+    frame = ResultFrames.fetch(orders.execute('SELECT * FROM orders ORDER BY id'), 'dataframe', batch_size=3)
+    array = ResultFrames.fetch(orders.execute('SELECT * FROM orders ORDER BY id'), 'numpy', batch_size=3)
+    empty = ResultFrames.frame_from_cursor(orders.execute('SELECT * FROM orders WHERE id < 0'))
+
+    assert list(frame.columns) == ['id', 'status', 'total'] and len(frame) == 10
+    assert frame['id'].dtype == np.int64 and frame['total'].dtype == np.float64
+    assert array.dtype.names == ('id', 'status', 'total') and array['id'].dtype == np.int64
+    assert array['status'][1] == 'shipped-with-a-long-status'
+    assert array['total'].sum() == frame['total'].sum() == 82.5
+    assert list(empty.columns) == ['id', 'status', 'total'] and empty.empty
+    with pytest.raises(ValueError):
+        ResultFrames.fetch(orders.execute('SELECT * FROM orders'), 'csv')
+
+
+def test_frame_assertions_check_whole_columns():
+    frame = pd.DataFrame({'id': [1, 2, 3, 3], 'currency': ['EUR', 'EUR', None, 'EUR'], 'total': [5.0, 0.0, 12.5, -1.0]})
+
+    FrameAssertions.assert_column_equals(frame, 'id', [1, 2, 3, 3])
+    FrameAssertions.assert_not_null(frame.to_records(index=False), 'id', 'total')
+    FrameAssertions.assert_unique(frame, 'id', 'total')
+    FrameAssertions.assert_in_range(frame, 'total', min_value=-1, max_value=12.5)
+
+    with pytest.raises(AssertionError, match=r"'currency' differs .* 1 of 4 rows, e.g. row 2: \w+ \(expected 'EUR'\)"):
+        FrameAssertions.assert_column_equals(frame, 'currency', 'EUR')
+    with pytest.raises(AssertionError, match=r"'currency' has nulls: 1 of 4 rows"):
+        FrameAssertions.assert_not_null(frame)
+    with pytest.raises(AssertionError, match=r"\['id'\] have duplicates: 2 of 4 rows, e.g. row 2: \[3\]; row 3: \[3\]"):
+        FrameAssertions.assert_unique(frame, 'id')
+    with pytest.raises(AssertionError, match=r"outside \(0, None\): 2 of 4 rows"):
+        FrameAssertions.assert_in_range(frame, 'total', min_value=0, inclusive=False)
+
+
+def test_arrays_widen_columns_whose_type_changes_in_later_batches(orders):
+    orders.executemany('INSERT INTO orders VALUES (?, ?, ?)', [(None, None, None), (12, 'new', 'n/a')])
+
+    array = ResultFrames.array_from_cursor(orders.execute('SELECT * FROM orders ORDER BY rowid'), batch_size=3)
+
+    assert array['id'].dtype == np.float64 and np.isnan(array['id'][10]) and array['id'][11] == 12
+    assert array['status'].dtype == object and array['status'][10] is None
+    assert array['total'].dtype == object and array['total'][0] == 1.5 and array['total'][11] == 'n/a'
+    assert len(array) == 12
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+
+from auto_utilities.element_cache import ElementCache
+from auto_utilities.locator_utility import Locator
+from auto_utilities.stub_webdriver import StubElement, StubWebDriverServer
+from auto_utilities.ui_utilities import BrowserActions, UIActions, UIWaits
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+pytestmark = [pytest.mark.unit]
+
+
+def remove_second_item(page):
+    page['li.item'] = page['li.item'][:1]
+
+
+def reload_items(page):
+    page['li.item'] = [StubElement('li', text=f'Reloaded {number}') for number in range(3)]
+
+
+STUB_PAGES = {
+    '*': {
+        '#email': [StubElement('input', value='user@example.com')],
+        '#country': [StubElement('select', options=['Spain', 'Portugal', 'France'])],
+        '#terms': [StubElement('input', attributes={'type': 'checkbox'})],
+        '#late': [StubElement('button', text='Loaded', appear_after=0.3)],
+        '#nickname': [StubElement('input', appear_after=0.3)],
+        'li.item': [StubElement('li', text=f'Item {number}', attributes={'data-id': str(number)},
+                                css={'color': 'rgba(0, 0, 0, 1)'}) for number in range(3)],
+        '#remove': [StubElement('button', text='Remove', on_click=remove_second_item)],
+        '#reload': [StubElement('button', text='Reload', on_click=reload_items)],
+    },
+}
+
+
+@pytest.fixture
+def stub_driver():
+    with StubWebDriverServer(STUB_PAGES) as server:
+        CustomWebDriverManager.launch_driver(remote_host=server.host)
+        CustomWebDriverManager.active_driver.get('https://stub.example/list')
+        UIActions.reset_resolution_stats()
+        yield CustomWebDriverManager.active_driver
+        CustomWebDriverManager.terminate_driver()
+
+
+@pytest.mark.parametrize('script_resolution', [True, False])
+def test_elements_are_waited_for_and_missing_ones_raise(stub_driver, monkeypatch, script_resolution):
+    monkeypatch.setattr(UIActions, 'script_resolution', script_resolution)
+
+    UIActions.click_element('#late', timeout=5)
+    text = UIActions.get_element_text('#late')
+    with pytest.raises(NoSuchElementException):
+        UIActions.click_element('#missing', timeout=0.2)
+
+    assert text == 'Loaded'
+    assert (UIActions.get_resolution_stats().get('script_resolutions', 0) > 0) == script_resolution
+
+
+def test_bulk_reads_match_element_by_element_reads(stub_driver, monkeypatch):
+    def read():
+        return UIActions.read_elements(['li.item', '#email'], text=True, attributes=['data-id', 'value'],
+                                       css_properties=['color'])
+
+    records = read()
+    monkeypatch.setattr(UIActions, 'script_resolution', False)
+
+    assert records == read()
+    assert [(record['locator'], record['index'], record['text']) for record in records[:3]] == [
+        ('li.item', number, f'Item {number}') for number in range(3)]
+    assert records[3]['attributes'] == {'data-id': None, 'value': 'user@example.com'}
+    assert UIActions.get_element_attribute('li.item', 'data-id', all_elements=True) == ['0', '1', '2']
+
+
+def test_cached_elements_are_reused_and_resolved_again_once_stale(stub_driver):
+    ElementCache.enable()
+    ElementCache.reset_stats()
+    try:
+        first = UIActions.get_element_text('li.item')
+        UIActions.get_element_text('li.item')
+        UIActions.click_element('#reload')
+        reloaded = UIActions.get_element_text('li.item')
+        BrowserActions.refresh_page()
+        stats = ElementCache.get_stats()
+    finally:
+        ElementCache.disable()
+
+    assert (first, reloaded) == ('Item 0', 'Reloaded 0')
+    assert stats['hits'] >= 2 and stats['stale'] == 1 and stats['invalidations'] == 1
+
+
+@pytest.mark.parametrize('script_resolution', [True, False])
+def test_forms_are_filled_in_one_call_or_field_by_field(stub_driver, monkeypatch, script_resolution):
+    monkeypatch.setattr(UIActions, 'script_resolution', script_resolution)
+
+    UIActions.fill_form({'#email': 'new@example.com', '#country': 'France', '#terms': True})
+
+    assert UIActions.get_element_attribute('#email', 'value') == 'new@example.com'
+    assert UIActions.get_selected_option_text('#country') == 'France'
+    assert UIActions.is_element_selected('#terms')
+
+
+@pytest.mark.parametrize('script_resolution', [True, False])
+def test_forms_wait_as_long_as_their_slowest_field(stub_driver, monkeypatch, capsys, script_resolution):
+    monkeypatch.setattr(UIActions, 'script_resolution', script_resolution)
+
+    UIActions.fill_form({Locator('#email', timeout=0.1): 'new@example.com', Locator('#nickname', timeout=5): 'user'})
+
+    assert UIActions.get_element_attribute('#nickname', 'value') == 'user'
+    assert 'within the timeout' not in capsys.readouterr().out
+
+
+def test_forms_with_a_missing_field_are_left_untouched(stub_driver):
+    with pytest.raises(NoSuchElementException):
+        UIActions.fill_form({'#email': 'new@example.com', '#missing': 'value'}, timeout=0.2)
+
+    assert UIActions.get_element_attribute('#email', 'value') == 'user@example.com'
+
+
+def test_pipelines_resolve_targets_in_their_own_driver(stub_driver):
+    pipeline = UIActions.pipeline().click('#terms').type('#email', 'user', clear_first=True)
+
+    with CustomWebDriverManager.use_driver(object()):
+        pipeline.perform(timeout=1)
+
+    assert UIActions.get_resolution_stats()['script_resolutions'] == 1
+
+
+def test_each_thread_sees_its_own_active_driver(stub_driver):
+    other_driver = object()
+    seen = {}
+
+    def worker():
+        seen['default'] = CustomWebDriverManager.active_driver
+        with CustomWebDriverManager.use_driver(other_driver):
+            seen['inside'] = UIActions.active_driver
+        seen['after'] = CustomWebDriverManager.active_driver
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert seen == {'default': stub_driver, 'inside': other_driver, 'after': stub_driver}
+    assert CustomWebDriverManager.active_driver is stub_driver
+
+
+@pytest.mark.parametrize('event_driven', [True, False])
+def test_waits_return_as_soon_as_the_condition_holds(stub_driver, monkeypatch, event_driven):
+    monkeypatch.setattr(UIWaits, 'event_driven', event_driven)
+
+    started = time.monotonic()
+    UIWaits.wait_until_visible('#late', timeout=5)
+    met = UIWaits.any_of(UIWaits.visible('#missing'), UIWaits.text_present('#late', 'Load'), timeout=5)
+
+    assert time.monotonic() - started < 1.5
+    assert met == UIWaits.text_present('#late', 'Load')
+    assert ('event_driven_waits' in UIActions.get_resolution_stats()) == event_driven
+
+
+def test_fallback_waits_only_for_the_time_the_in_page_wait_left(stub_driver, monkeypatch):
+    def fail_late(conditions, mode, timeout):
+        time.sleep(0.6)
+        raise WebDriverException('script error')
+
+    monkeypatch.setattr(UIWaits, '_wait_in_page', fail_late)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutException):
+        UIWaits.wait_until_visible('#missing', timeout=1)
+
+    assert time.monotonic() - started < 1.4
+    assert UIActions.get_resolution_stats()['fallbacks'] == 1
+
+
+def test_stale_fallback_watches_the_indexed_element(stub_driver):
+    conditions = [UIWaits.stale(Locator('li.item')), UIWaits.stale(Locator('li.item', index=1)),
+                  UIWaits.stale('#missing')]
+    checks = [UIWaits._expected_condition(condition) for condition in conditions]
+
+    UIActions.click_element('#remove')
+
+    assert [bool(check(stub_driver)) for check in checks] == [False, True, True]
+
+
+@pytest.mark.parametrize('event_driven', [True, False])
+def test_stale_waits_on_missing_elements_return_at_once(stub_driver, monkeypatch, event_driven):
+    monkeypatch.setattr(UIWaits, 'event_driven', event_driven)
+
+    started = time.monotonic()
+    assert UIWaits.all_of(UIWaits.stale('#missing'), UIWaits.present('li.item'), timeout=5)
+    assert UIWaits.any_of(UIWaits.stale('#missing'), timeout=5) == UIWaits.stale('#missing')
+
+    assert time.monotonic() - started < 1
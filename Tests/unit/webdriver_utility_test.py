@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from selenium import webdriver
+
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+pytestmark = [pytest.mark.unit]
+
+
+@pytest.fixture
+def temporary_dirs():
+    yield CustomWebDriverManager._temporary_dirs
+    CustomWebDriverManager.remove_temporary_dirs()
+
+
+def test_profiles_add_their_startup_flags(temporary_dirs):
+    ci_options, _ = CustomWebDriverManager._build_options('chrome', profile='ci')
+    debug_options, _ = CustomWebDriverManager._build_options('chrome', profile='debug')
+    firefox_options, _ = CustomWebDriverManager._build_options('firefox', profile='fast')
+
+    assert {'--headless=new', '--no-sandbox', '--disable-gpu'} <= set(ci_options.arguments)
+    assert ci_options.page_load_strategy == 'eager' and debug_options.page_load_strategy == 'normal'
+    download_dir = ci_options.experimental_options['prefs']['download.default_directory']
+    assert download_dir in temporary_dirs and os.path.isdir(download_dir)
+    assert not {'--headless=new', '--disable-gpu'} & set(debug_options.arguments)
+    assert '-headless' in firefox_options.arguments
+    assert firefox_options.preferences['layers.acceleration.disabled'] is True
+
+
+def test_unknown_profiles_and_network_capture_on_firefox_are_rejected():
+    with pytest.raises(ValueError, match='Unknown profile: turbo'):
+        CustomWebDriverManager._build_options('chrome', profile='turbo')
+    with pytest.raises(ValueError, match='firefox does not expose'):
+        CustomWebDriverManager._build_options('firefox', capture_network=True)
+
+
+def test_temporary_dirs_are_removed_when_their_driver_quits_or_fails_to_start(temporary_dirs, monkeypatch):
+    class FakeRemote:
+        '''
+        Stands in for a grid session
+        '''
+
+        def __init__(self, command_executor, options):
+            self.download_dir = options.experimental_options['prefs']['download.default_directory']
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(webdriver, 'Remote', FakeRemote)
+    CustomWebDriverManager.launch_driver(remote_host='grid', profile='ci')
+    download_dir = CustomWebDriverManager.active_driver.download_dir
+    in_use = os.path.isdir(download_dir)
+    CustomWebDriverManager.terminate_driver()
+
+    def refuse(command_executor, options):
+        raise ConnectionError('grid unreachable')
+
+    monkeypatch.setattr(webdriver, 'Remote', refuse)
+    with pytest.raises(Exception, match='grid unreachable'):
+        CustomWebDriverManager.create_driver(remote_host='grid', profile='ci')
+
+    assert in_use and not os.path.exists(download_dir)
+    assert temporary_dirs == []
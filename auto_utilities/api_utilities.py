@@ -1,11 +1,136 @@
+import atexit
+import json
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.cookiejar import DefaultCookiePolicy
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from requests_oauthlib import OAuth1
+from urllib3.util.retry import Retry
+
+from auto_utilities.oauth2_auth import OAuth2ClientCredentials
+from auto_utilities.response_cache import ResponseCache
+from auto_utilities.transfer_streams import (DEFAULT_CHECKSUM, DEFAULT_CHUNK_SIZE, DownloadStream, MultipartStream,
+                                             TransferResult, UploadStream)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_RETRIES = 0
+DEFAULT_BACKOFF_FACTOR = 0.3
+DEFAULT_RETRY_STATUSES = (502, 503, 504)
+DEFAULT_BATCH_WORKERS = 16
+
+
+class BatchResult(NamedTuple):
+    """
+    Outcome of one request of ApiClient.send_batch / stream_batch: the response, or the exception it raised.
+    """
+    index: int
+    request: dict
+    response: requests.Response = None
+    error: Exception = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None and self.response is not None and self.response.ok
 
 
 class ApiClient:
 
-    AUTH_TYPES = {'oauth1', 'basic', None}
+    AUTH_TYPES = {'oauth1', 'basic', 'oauth2', None}
+
+    pool_connections = DEFAULT_POOL_CONNECTIONS
+    pool_maxsize = DEFAULT_POOL_MAXSIZE
+    # No retries by default, like plain requests calls; configure_sessions(retries=...) enables them
+    retry_policy = Retry(total=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                         status_forcelist=DEFAULT_RETRY_STATUSES, raise_on_status=False)
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+    _auth_cache = {}
+    _auth_lock = threading.Lock()
+
+    @classmethod
+    def configure_sessions(cls, pool_connections: int = None, pool_maxsize: int = None, retries: int = None,
+                           backoff_factor: float = None, status_forcelist: tuple = None, retry_policy: Retry = None):
+        """
+        Changes the connection pool and retry settings. Open sessions are closed so the new settings apply to the next
+        request of every host.
+
+        Requests are not retried unless retries are enabled here. urllib3 only retries idempotent methods (GET, PUT,
+        DELETE, ...) on retryable statuses, never POST or PATCH.
+
+        Args:
+            pool_connections: Number of connection pools kept per session.
+            pool_maxsize: Maximum number of keep-alive connections per host, i.e. concurrent requests to one host.
+            retries: Total number of retries on connection errors and retryable statuses (default 0).
+            backoff_factor: Exponential backoff factor between retries, in seconds (default 0.3).
+            status_forcelist: HTTP statuses that are retried (default 502, 503 and 504).
+            retry_policy: A complete urllib3 Retry policy, overriding the three retry arguments.
+        """
+        if pool_connections is not None:
+            cls.pool_connections = pool_connections
+        if pool_maxsize is not None:
+            cls.pool_maxsize = pool_maxsize
+        if retry_policy is not None:
+            cls.retry_policy = retry_policy
+        elif retries is not None or backoff_factor is not None or status_forcelist is not None:
+            cls.retry_policy = Retry(total=cls.retry_policy.total if retries is None else retries,
+                                     backoff_factor=cls.retry_policy.backoff_factor if backoff_factor is None
+                                     else backoff_factor,
+                                     status_forcelist=cls.retry_policy.status_forcelist if status_forcelist is None
+                                     else status_forcelist,
+                                     raise_on_status=False)
+        cls.close_sessions()
+
+    @classmethod
+    def close_sessions(cls):
+        """
+        Closes the pooled session of every host and their keep-alive connections. Registered to run at exit.
+        """
+        with cls._sessions_lock:
+            sessions = list(cls._sessions.values())
+            cls._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    @classmethod
+    def _get_session(cls, url: str):
+        """
+        Returns the pooled keep-alive session of the URL's scheme and host, creating it on first use.
+
+        Sessions are shared by all threads; they never store cookies, so calls stay as independent as the module-level
+        requests functions they replace.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=cls.pool_connections, pool_maxsize=cls.pool_maxsize,
+                                      max_retries=cls.retry_policy)
+                session.mount(f'{parts.scheme}://', adapter)
+                cls._sessions[key] = session
+        return session
+
+    @classmethod
+    def _request(cls, method: str, url: str, auth_type: str = None, credentials: dict = None, **kwargs):
+        """
+        Sends a request through the pooled session of the URL's host.
+        """
+        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
+        response = cls._get_session(url).request(method, url, auth=auth, **kwargs)
+        if ResponseCache.enabled and method != 'GET':
+            ResponseCache.invalidate(url)
+        return response
 
     @classmethod
     def get_resource(cls, url: str, auth_type: str = None, headers: dict = None, credentials: dict = None,
@@ -23,8 +148,14 @@ class ApiClient:
         Returns:
             Response object from the GET request.
         """
-        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
-        return requests.get(url, auth=auth, headers=headers, allow_redirects=follow_redirects)
+        if ResponseCache.enabled:
+            return ResponseCache.fetch(
+                url, ResponseCache.auth_identity(auth_type, credentials), headers,
+                lambda validators: cls._request('GET', url, auth_type, credentials,
+                                                headers={**(headers or {}), **validators},
+                                                allow_redirects=follow_redirects),
+                follow_redirects)
+        return cls._request('GET', url, auth_type, credentials, headers=headers, allow_redirects=follow_redirects)
 
     @classmethod
     def delete_resource(cls, url: str, auth_type: str = None, headers: dict = None, credentials: dict = None,
@@ -42,8 +173,7 @@ class ApiClient:
         Returns:
             Response object from the DELETE request.
         """
-        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
-        return requests.delete(url, auth=auth, headers=headers, allow_redirects=follow_redirects)
+        return cls._request('DELETE', url, auth_type, credentials, headers=headers, allow_redirects=follow_redirects)
 
     @classmethod
     def patch_resource(cls, url: str, data: any = None, auth_type: str = None, headers: dict = None, files=None,
@@ -63,8 +193,8 @@ class ApiClient:
         Returns:
             Response object from the PATCH request.
         """
-        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
-        return requests.patch(url, data=data, auth=auth, headers=headers, files=files, allow_redirects=follow_redirects)
+        return cls._request('PATCH', url, auth_type, credentials, data=data, headers=headers, files=files,
+                            allow_redirects=follow_redirects)
 
     @classmethod
     def post_resource(cls, url: str, payload: any, auth_type: str = None, headers: dict = None, files=None,
@@ -84,8 +214,8 @@ class ApiClient:
         Returns:
             Response object from the POST request.
         """
-        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
-        return requests.post(url, data=payload, auth=auth, headers=headers, files=files, allow_redirects=follow_redirects)
+        return cls._request('POST', url, auth_type, credentials, data=payload, headers=headers, files=files,
+                            allow_redirects=follow_redirects)
 
     @classmethod
     def put_resource(cls, url: str, payload=None, auth_type: str = None, headers: dict = None, files=None,
@@ -105,17 +235,202 @@ class ApiClient:
         Returns:
             Response object from the PUT request.
         """
-        auth = cls._set_auth(auth_type=auth_type, credentials=credentials)
-        return requests.put(url, data=payload, auth=auth, headers=headers, files=files, allow_redirects=follow_redirects)
+        return cls._request('PUT', url, auth_type, credentials, data=payload, headers=headers, files=files,
+                            allow_redirects=follow_redirects)
+
+    @classmethod
+    def stream_resource(cls, url: str, auth_type: str = None, headers: dict = None, credentials: dict = None,
+                        follow_redirects: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        checksum: str = DEFAULT_CHECKSUM, progress=None):
+        """
+        Fetch a resource using the GET method without buffering its body.
+
+        Args:
+            url: Endpoint URL to send the request to.
+            auth_type: Authentication method to be used (default: None).
+            headers: Optional dictionary of HTTP headers.
+            credentials: Optional dictionary of credentials for authentication.
+            follow_redirects: Allow redirection of the request (default: True).
+            chunk_size: Maximum number of bytes held in memory at a time.
+            checksum: hashlib algorithm computed over the body while it is read, or None.
+            progress: Callable receiving (bytes_read, total_bytes or None) after every chunk.
+
+        Returns:
+            DownloadStream iterating the body in chunks; use it as a context manager to release the connection.
+        """
+        response = cls._request('GET', url, auth_type, credentials, headers=headers, allow_redirects=follow_redirects,
+                                stream=True)
+        return DownloadStream(response, chunk_size=chunk_size, checksum=checksum, progress=progress)
+
+    @classmethod
+    def download_resource(cls, url: str, destination, auth_type: str = None, headers: dict = None,
+                          credentials: dict = None, follow_redirects: bool = True,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE, checksum: str = DEFAULT_CHECKSUM, progress=None):
+        """
+        Download a resource straight to a file, one chunk at a time.
+
+        Args:
+            url: Endpoint URL to send the request to.
+            destination: File path or binary file object the body is written to.
+            Other arguments as in stream_resource.
+
+        Returns:
+            TransferResult with the response, byte count, seconds, throughput and checksum of the body.
+
+        Example:
+            >>> result = ApiClient.download_resource(f'{base_url}/exports/orders', '/tmp/orders.csv')
+            >>> assert result.response.ok and result.checksum == expected_sha256
+        """
+        with cls.stream_resource(url, auth_type=auth_type, headers=headers, credentials=credentials,
+                                 follow_redirects=follow_redirects, chunk_size=chunk_size, checksum=checksum,
+                                 progress=progress) as download:
+            return download.save(destination)
+
+    @classmethod
+    def upload_resource(cls, url: str, source, method: str = 'PUT', auth_type: str = None, headers: dict = None,
+                        credentials: dict = None, follow_redirects: bool = True,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        """
+        Upload a body that is read while the request is sent, so its size is not bound by memory.
+
+        Args:
+            url: Endpoint URL to send the request to.
+            source: File path, binary file object, bytes, iterable of bytes chunks (sent with chunked transfer
+                encoding), UploadStream or MultipartStream.
+            method: POST, PUT or PATCH (default: PUT).
+            auth_type: Authentication method to be used (default: None).
+            headers: Optional dictionary of HTTP headers.
+            credentials: Optional dictionary of credentials for authentication.
+            follow_redirects: Allow redirection of the request (default: True).
+            chunk_size: Maximum number of bytes read from the source at a time.
+            progress: Callable receiving (bytes_sent, total_bytes or None) after every chunk.
+
+        Returns:
+            TransferResult with the response, byte count, seconds and throughput of the upload.
+
+        Raises:
+            ValueError: If the method does not send a body.
+        """
+        method = method.upper()
+        if method not in ('POST', 'PUT', 'PATCH'):
+            raise ValueError(f"Unsupported upload method: {method}. Valid options: POST, PUT, PATCH")
+
+        body = source if isinstance(source, (UploadStream, MultipartStream)) else UploadStream(source, chunk_size)
+        body.progress = progress or body.progress
+        if isinstance(body, MultipartStream):
+            headers = {'Content-Type': body.content_type, **(headers or {})}
+        try:
+            response = cls._request(method, url, auth_type, credentials, data=body, headers=headers,
+                                    allow_redirects=follow_redirects)
+        finally:
+            body.close()
+        return TransferResult(response, body.bytes, body.seconds)
+
+    @classmethod
+    def send_batch(cls, request_specs: list, max_workers: int = DEFAULT_BATCH_WORKERS, per_host_limit: int = None):
+        """
+        Sends independent requests concurrently and returns their results in input order.
+
+        Args:
+            request_specs: Request dictionaries with 'method' and 'url' plus any of 'payload', 'auth_type', 'headers',
+                'credentials', 'files' and 'follow_redirects', e.g. {'method': 'GET', 'url': 'https://api/items/1'}.
+            max_workers: Maximum number of requests in flight overall.
+            per_host_limit: Maximum number of requests in flight per host (default: the session pool size).
+
+        Returns:
+            List of BatchResult; a failing request records its exception instead of aborting the batch.
+
+        Example:
+            >>> results = ApiClient.send_batch([{'method': 'GET', 'url': f'{base_url}/items/{n}'} for n in range(100)])
+            >>> failed = [result for result in results if not result.ok]
+        """
+        results = list(cls.stream_batch(request_specs, max_workers, per_host_limit))
+        return sorted(results, key=lambda result: result.index)
+
+    @classmethod
+    def stream_batch(cls, request_specs: list, max_workers: int = DEFAULT_BATCH_WORKERS, per_host_limit: int = None):
+        """
+        Sends independent requests concurrently and yields each BatchResult as soon as its request completes.
+
+        Takes the same arguments as send_batch; `BatchResult.index` gives the position in `request_specs`.
+
+        Requests are queued per host and only submitted while their host is below `per_host_limit`, so the workers
+        never wait on a busy host while requests to other hosts are pending.
+        """
+        limit = per_host_limit or cls.pool_maxsize
+        pending = {}
+        for index, spec in enumerate(request_specs):
+            parts = urlsplit(spec['url'])
+            pending.setdefault((parts.scheme, parts.netloc), deque()).append((index, spec))
+        in_flight = {}
+        busy_hosts = Counter()
+
+        def send(index: int, spec: dict):
+            started = time.perf_counter()
+            try:
+                response = cls._send_spec(spec)
+            except Exception as e:
+                return BatchResult(index, spec, error=e, seconds=time.perf_counter() - started)
+            return BatchResult(index, spec, response=response, seconds=time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api_batch') as executor:
+            while pending or in_flight:
+                # Free workers take requests round-robin from the hosts that are below their limit
+                submitted = True
+                while submitted and len(in_flight) < max_workers:
+                    submitted = False
+                    for host in [host for host in pending if busy_hosts[host] < limit]:
+                        if len(in_flight) >= max_workers:
+                            break
+                        index, spec = pending[host].popleft()
+                        if not pending[host]:
+                            del pending[host]
+                        in_flight[executor.submit(send, index, spec)] = host
+                        busy_hosts[host] += 1
+                        submitted = True
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    busy_hosts[in_flight.pop(future)] -= 1
+                    yield future.result()
+
+    @classmethod
+    def _send_spec(cls, spec: dict):
+        method = spec.get('method', 'GET').upper()
+        options = {'auth_type': spec.get('auth_type'), 'headers': spec.get('headers'),
+                   'credentials': spec.get('credentials'), 'follow_redirects': spec.get('follow_redirects', True)}
+        if method == 'GET':
+            return cls.get_resource(spec['url'], **options)
+        if method == 'DELETE':
+            return cls.delete_resource(spec['url'], **options)
+        if method == 'PATCH':
+            return cls.patch_resource(spec['url'], data=spec.get('payload'), files=spec.get('files'), **options)
+        if method == 'POST':
+            return cls.post_resource(spec['url'], spec.get('payload'), files=spec.get('files'), **options)
+        if method == 'PUT':
+            return cls.put_resource(spec['url'], spec.get('payload'), files=spec.get('files'), **options)
+        raise ValueError(f"Unsupported method: {method}. Valid options: GET, POST, PUT, PATCH, DELETE")
+
+    @classmethod
+    def clear_auth_cache(cls):
+        """
+        Forgets the cached authentication objects, and with them any cached OAuth2 tokens.
+        """
+        with cls._auth_lock:
+            cls._auth_cache.clear()
 
     @classmethod
     def _set_auth(cls, auth_type: str, credentials: dict = None):
         """
         Helper method to configure authentication based on the provided credentials.
 
+        Authentication objects are cached per auth type and credentials, so an OAuth2 token is fetched once and shared
+        by every request sent with the same credentials.
+
         Args:
-            auth_type: Type of authentication ('oauth1' or 'basic').
-            credentials: Dictionary containing the authentication credentials.
+            auth_type: Type of authentication ('oauth1', 'basic' or 'oauth2').
+            credentials: Dictionary containing the authentication credentials. For 'oauth2': 'token_url', 'client_id',
+                'client_secret' and optionally 'scope', 'audience', 'client_auth' and 'refresh_margin'.
 
         Returns:
             Authentication object or None if no authentication is used.
@@ -126,8 +441,21 @@ class ApiClient:
         if auth_type not in cls.AUTH_TYPES:
             raise ValueError(f"Unsupported authentication method: {auth_type}. Valid options: {cls.AUTH_TYPES}")
 
-        if auth_type == 'oauth1':
-            return OAuth1(credentials['application_key'], credentials['application_secret'])
-        elif auth_type == 'basic':
-            return HTTPBasicAuth(credentials['username'], credentials['password'])
-        return None
+        if auth_type is None:
+            return None
+
+        key = json.dumps([auth_type, credentials], sort_keys=True, default=str)
+        with cls._auth_lock:
+            auth = cls._auth_cache.get(key)
+            if auth is None:
+                if auth_type == 'oauth1':
+                    auth = OAuth1(credentials['application_key'], credentials['application_secret'])
+                elif auth_type == 'basic':
+                    auth = HTTPBasicAuth(credentials['username'], credentials['password'])
+                else:
+                    auth = OAuth2ClientCredentials(**credentials)
+                cls._auth_cache[key] = auth
+        return auth
+
+
+atexit.register(ApiClient.close_sessions)
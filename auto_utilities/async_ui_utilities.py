@@ -0,0 +1,876 @@
+import asyncio
+import base64
+import contextvars
+import json
+import time
+import weakref
+
+import aiohttp
+from selenium.common.exceptions import (ElementClickInterceptedException, ElementNotInteractableException,
+                                        InvalidSelectorException, JavascriptException, NoAlertPresentException,
+                                        NoSuchCookieException, NoSuchElementException, NoSuchFrameException,
+                                        NoSuchWindowException, StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+from selenium.webdriver.common.keys import Keys
+
+from auto_utilities.locator_utility import AnyLocator, Locator
+from auto_utilities.page_scripts import FILL_FORM, READ_ELEMENTS, RESOLVE_ELEMENT, RESOLVE_ELEMENTS
+from auto_utilities.ui_utilities import DEFAULT_TIMEOUT, IMAGE_FORMATS, WAIT_TIMEOUT_MESSAGES
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+DEFAULT_POLL_FREQUENCY = 0.25
+DEFAULT_MAX_CONNECTIONS = 200
+# Seconds a single WebDriver command may take; waits poll with short commands, so only a hung driver reaches it
+DEFAULT_COMMAND_TIMEOUT = 120
+POINTER_MOVE_DURATION = 250
+# W3C button number and click count of each perform_mouse_click action
+MOUSE_CLICKS = {'click': (0, 1), 'right_click': (2, 1), 'double_click': (0, 2)}
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+W3C_ERRORS = {
+    'element click intercepted': ElementClickInterceptedException,
+    'element not interactable': ElementNotInteractableException,
+    'invalid selector': InvalidSelectorException,
+    'javascript error': JavascriptException,
+    'no such alert': NoAlertPresentException,
+    'no such cookie': NoSuchCookieException,
+    'no such element': NoSuchElementException,
+    'no such frame': NoSuchFrameException,
+    'no such window': NoSuchWindowException,
+    'script timeout': TimeoutException,
+    'stale element reference': StaleElementReferenceException,
+    'timeout': TimeoutException,
+}
+
+
+class AsyncWebDriver:
+    """
+    Single W3C WebDriver session driven over a shared, pooled aiohttp client.
+    """
+
+    def __init__(self, base_url: str, session_id: str, http_client: aiohttp.ClientSession, capabilities: dict = None):
+        self.base_url = base_url
+        self.session_id = session_id
+        self.capabilities = capabilities or {}
+        self._http_client = http_client
+
+    async def command(self, method: str, path: str = '', payload: dict = None):
+        """
+        Sends a command of this session and returns its unwrapped `value`.
+
+        Raises:
+            WebDriverException: The Selenium exception matching the W3C error code of a failed command.
+        """
+        return await send_w3c_command(self._http_client, method, f'{self.base_url}/session/{self.session_id}{path}',
+                                      payload, self)
+
+    async def find_elements(self, by: str, value: str):
+        return await self.command('POST', '/elements', {'using': by, 'value': value})
+
+    async def find_element(self, by: str, value: str):
+        return await self.command('POST', '/element', {'using': by, 'value': value})
+
+    async def execute_script(self, script: str, *args):
+        return await self.command('POST', '/execute/sync', {'script': script, 'args': _wrap_elements(list(args))})
+
+    async def execute_async_script(self, script: str, *args):
+        return await self.command('POST', '/execute/async', {'script': script, 'args': _wrap_elements(list(args))})
+
+    async def perform_actions(self, *sources: dict):
+        await self.command('POST', '/actions', {'actions': list(sources)})
+
+    async def release_actions(self):
+        await self.command('DELETE', '/actions')
+
+    async def quit(self):
+        await send_w3c_command(self._http_client, 'DELETE', f'{self.base_url}/session/{self.session_id}')
+
+
+class AsyncWebElement:
+    """
+    Element reference of an AsyncWebDriver session.
+    """
+
+    def __init__(self, driver: AsyncWebDriver, element_id: str):
+        self.driver = driver
+        self.id = element_id
+
+    async def _command(self, method: str, path: str, payload: dict = None):
+        return await self.driver.command(method, f'/element/{self.id}{path}', payload)
+
+    async def click(self):
+        await self._command('POST', '/click', {})
+
+    async def clear(self):
+        await self._command('POST', '/clear', {})
+
+    async def send_keys(self, text: str):
+        await self._command('POST', '/value', {'text': text})
+
+    async def get_text(self):
+        return await self._command('GET', '/text')
+
+    async def get_attribute(self, name: str):
+        return await self._command('GET', f'/attribute/{name}')
+
+    async def get_property(self, name: str):
+        return await self._command('GET', f'/property/{name}')
+
+    async def value_of_css_property(self, property_name: str):
+        return await self._command('GET', f'/css/{property_name}')
+
+    async def is_displayed(self):
+        return await self._command('GET', '/displayed')
+
+    async def is_enabled(self):
+        return await self._command('GET', '/enabled')
+
+    async def is_selected(self):
+        return await self._command('GET', '/selected')
+
+    async def find_element(self, by: str, value: str):
+        return await self._command('POST', '/element', {'using': by, 'value': value})
+
+    async def get_rect(self):
+        return await self._command('GET', '/rect')
+
+    async def screenshot_as_base64(self):
+        return await self._command('GET', '/screenshot')
+
+    def to_w3c(self):
+        return {ELEMENT_KEY: self.id}
+
+    def __eq__(self, other):
+        return isinstance(other, AsyncWebElement) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+async def send_w3c_command(http_client: aiohttp.ClientSession, method: str, url: str, payload: dict = None,
+                           driver: AsyncWebDriver = None):
+    """
+    Sends a raw W3C WebDriver command and returns its `value`, with element references turned into AsyncWebElements.
+
+    Raises:
+        TimeoutException: If the driver does not answer within the HTTP client's timeout.
+        WebDriverException: If the command failed or the answer is not a WebDriver response, e.g. a proxy error page.
+    """
+    try:
+        async with http_client.request(method, url, json=payload) as response:
+            text = await response.text()
+    except asyncio.TimeoutError:
+        raise TimeoutException(f"No response to {method} {url} within {http_client.timeout.total} seconds")
+    try:
+        body = json.loads(text) if text else None
+    except ValueError:
+        raise WebDriverException(f"Invalid WebDriver response to {method} {url} "
+                                 f"({response.status} {response.reason}): {text[:200]}")
+    value = body.get('value') if isinstance(body, dict) else None
+    if response.status >= 400 or (isinstance(value, dict) and 'error' in value):
+        error = value.get('error', '') if isinstance(value, dict) else ''
+        message = value.get('message', '') if isinstance(value, dict) else str(body)
+        raise W3C_ERRORS.get(error, WebDriverException)(f'{error}: {message}' if error else message)
+    return _unwrap_elements(value, driver)
+
+
+def _wrap_elements(value):
+    if isinstance(value, AsyncWebElement):
+        return value.to_w3c()
+    if isinstance(value, (list, tuple)):
+        return [_wrap_elements(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _wrap_elements(item) for key, item in value.items()}
+    return value
+
+
+def _pointer_source(actions: list):
+    return {'type': 'pointer', 'id': 'mouse', 'parameters': {'pointerType': 'mouse'}, 'actions': actions}
+
+
+def _key_source(actions: list):
+    return {'type': 'key', 'id': 'keyboard', 'actions': actions}
+
+
+def _key_presses(text: str):
+    return [{'type': key_action, 'value': key} for key in text for key_action in ('keyDown', 'keyUp')]
+
+
+def _xpath_literal(text: str):
+    if '"' not in text:
+        return f'"{text}"'
+    if "'" not in text:
+        return f"'{text}'"
+    return 'concat("' + '", \'"\', "'.join(text.split('"')) + '")'
+
+
+async def _write_file(path: str, data: bytes):
+    # File writes run in the default executor so a slow disk does not stall the other sessions of the loop
+    def write():
+        with open(path, 'wb') as output_file:
+            output_file.write(data)
+
+    await asyncio.get_running_loop().run_in_executor(None, write)
+
+
+def _unwrap_elements(value, driver: AsyncWebDriver):
+    if isinstance(value, list):
+        return [_unwrap_elements(item, driver) for item in value]
+    if isinstance(value, dict):
+        if ELEMENT_KEY in value and driver is not None:
+            return AsyncWebElement(driver, value[ELEMENT_KEY])
+        return {key: _unwrap_elements(item, driver) for key, item in value.items()}
+    return value
+
+
+class AsyncWebDriverManager:
+    """
+    Launches and tracks AsyncWebDriver sessions. The active driver is bound to the current asyncio task, so many
+    sessions can be driven concurrently from one event loop.
+
+    Example:
+        >>> async def smoke_check(url):
+        ...     await AsyncWebDriverManager.launch_driver(remote_host='grid:4444')
+        ...     await AsyncBrowserActions.navigate_to_url(url)
+        ...     await AsyncUIWaits.wait_until_visible('#app')
+        ...     await AsyncWebDriverManager.terminate_driver()
+        >>> await asyncio.gather(*(smoke_check(url) for url in urls))
+    """
+
+    max_connections = DEFAULT_MAX_CONNECTIONS
+    command_timeout = DEFAULT_COMMAND_TIMEOUT
+    _active_driver = contextvars.ContextVar('async_active_driver', default=None)
+    _http_clients = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get_http_client(cls):
+        """
+        Returns the pooled HTTP client shared by every session of the running event loop. A command without an answer
+        within `command_timeout` seconds raises TimeoutException.
+        """
+        loop = asyncio.get_running_loop()
+        http_client = cls._http_clients.get(loop)
+        if http_client is None or http_client.closed:
+            connector = aiohttp.TCPConnector(limit=cls.max_connections, limit_per_host=0)
+            timeout = aiohttp.ClientTimeout(total=cls.command_timeout)
+            http_client = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            cls._http_clients[loop] = http_client
+        return http_client
+
+    @classmethod
+    async def launch_driver(cls, browser_type: str = 'chrome', remote_host: str = None, download_path: str = None,
+                            base_url: str = None, profile: str = None):
+        """
+        Starts a new session and makes it the active driver of the current task.
+
+        Args:
+            browser_type: Browser to request from the grid.
+            remote_host: Grid host; commands are sent to http://<remote_host>/wd/hub.
+            download_path: Optional download directory passed in the browser options.
+            base_url: Full WebDriver endpoint URL, overriding `remote_host` (e.g. a local stub server).
+            profile: Performance profile applied to the browser options (see CustomWebDriverManager).
+        """
+        if not (remote_host or base_url):
+            raise ValueError("The async driver requires a remote_host or base_url of a WebDriver endpoint.")
+        base_url = (base_url or f'http://{remote_host}/wd/hub').rstrip('/')
+        driver_options, _ = CustomWebDriverManager._build_options(browser_type, download_path, profile)
+        payload = {'capabilities': {'alwaysMatch': driver_options.to_capabilities(), 'firstMatch': [{}]}}
+
+        http_client = cls.get_http_client()
+        try:
+            session = await send_w3c_command(http_client, 'POST', f'{base_url}/session', payload)
+        except Exception as e:
+            CustomWebDriverManager._hand_over_temporary_dirs(driver_options, None)
+            raise Exception(f"Failed to initialize WebDriver for {browser_type}: {e}")
+
+        driver = AsyncWebDriver(base_url, session['sessionId'], http_client, session.get('capabilities'))
+        CustomWebDriverManager._hand_over_temporary_dirs(driver_options, driver)
+        cls._active_driver.set(driver)
+        return driver
+
+    @classmethod
+    def get_active_driver(cls):
+        driver = cls._active_driver.get()
+        if driver:
+            return driver
+        raise Exception("No active WebDriver instance. Please initialize the driver first.")
+
+    @classmethod
+    def use_driver(cls, driver: AsyncWebDriver):
+        """
+        Makes `driver` the active driver of the current task.
+        """
+        cls._active_driver.set(driver)
+
+    @classmethod
+    async def terminate_driver(cls):
+        driver = cls._active_driver.get()
+        if driver:
+            try:
+                await driver.quit()
+            finally:
+                CustomWebDriverManager.remove_temporary_dirs(driver)
+            cls._active_driver.set(None)
+
+    @classmethod
+    async def close_http_client(cls):
+        """
+        Closes the pooled HTTP client of the running event loop; call once all sessions are terminated.
+        """
+        http_client = cls._http_clients.pop(asyncio.get_running_loop(), None)
+        if http_client is not None:
+            await http_client.close()
+
+
+class AsyncUIActions(AsyncWebDriverManager):
+    """
+    Awaitable counterparts of the UIActions helpers, with the same names and arguments. ActionPipeline, the
+    script_resolution switch and the resolution statistics are sync only: every lookup here is one script call.
+    """
+
+    @classmethod
+    async def capture_console_browser_errors(cls, level: str, display_err=False):
+        logs = await cls.get_active_driver().command('POST', '/se/log', {'type': 'browser'})
+        error_logs = [log['message'] for log in logs if log['level'] == level]
+        if display_err:
+            return error_logs
+        return len(error_logs) > 0
+
+    @classmethod
+    async def clear_input(cls, locator: AnyLocator, index: int = None, timeout: int = None,
+                          scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='clickable',
+                                          timeout=timeout)
+        await element.clear()
+
+    @classmethod
+    async def click_element(cls, locator: AnyLocator, index: int = None, timeout: int = None,
+                            scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='clickable',
+                                          timeout=timeout)
+        await element.click()
+
+    @classmethod
+    async def click_partial_link(cls, partial_text: str):
+        element = await cls.get_active_driver().find_element('partial link text', partial_text)
+        await element.click()
+
+    @classmethod
+    async def perform_mouse_click(cls, click_action: str, locator: AnyLocator = None, x_offset: float = 0,
+                                  y_offset: float = 0, reset_position: bool = True, reset_actions: bool = True):
+        if click_action not in MOUSE_CLICKS:
+            raise ValueError('Invalid click action specified')
+        button, clicks = MOUSE_CLICKS[click_action]
+        driver = cls.get_active_driver()
+        await cls.move_mouse(locator, x_offset, y_offset, reset_actions=False)
+        await driver.perform_actions(_pointer_source([{'type': 'pointerDown', 'button': button},
+                                                      {'type': 'pointerUp', 'button': button}] * clicks))
+        if reset_position:
+            await cls.move_mouse(x_offset=-x_offset, y_offset=-y_offset, reset_actions=False)
+        if reset_actions:
+            await driver.release_actions()
+
+    @classmethod
+    async def delete_input(cls, locator: AnyLocator, index: int = None, timeout: int = None,
+                           scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='clickable',
+                                          timeout=timeout)
+        text_content = await element.get_text() or await element.get_property('value') or ''
+        await element.send_keys(Keys.BACKSPACE * len(text_content))
+
+    @classmethod
+    async def capture_element_screenshot(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None,
+                                         as_base64: bool = True, image_path: str = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options)
+        screenshot = await element.screenshot_as_base64()
+        if image_path:
+            await _write_file(image_path, base64.b64decode(screenshot))
+            return True
+        return screenshot if as_base64 else base64.b64decode(screenshot)
+
+    @classmethod
+    async def enter_text(cls, locator: AnyLocator, text: str, index: int = None, click_first: bool = True,
+                         clear_first: bool = True, timeout: int = None, scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='clickable',
+                                          timeout=timeout)
+        if click_first:
+            await element.click()
+        if clear_first:
+            await element.clear()
+        await element.send_keys(text)
+
+    @classmethod
+    async def fill_form(cls, fields: dict, clear_first: bool = True, click_first: bool = False, timeout: int = None,
+                        poll_frequency: float = None):
+        # Polls until every field is clickable, then fills them all with one FILL_FORM call (see UIActions.fill_form)
+        if not fields:
+            return
+        locators = list(map(Locator.of, fields))
+        if timeout is None:
+            timeout = max(locator.resolve(default_timeout=DEFAULT_TIMEOUT)[1] for locator in locators)
+        targets = [[locator.value, locator.by, locator.resolve()[0]] for locator in locators]
+        driver = cls.get_active_driver()
+
+        async def clickable():
+            return (await driver.execute_async_script(RESOLVE_ELEMENTS, targets, 'clickable', 0))['ready']
+
+        if not await AsyncUIWaits._poll(clickable, timeout, poll_frequency):
+            print(WAIT_TIMEOUT_MESSAGES['clickable'].format(locator=', '.join(map(str, locators))))
+        queries = [target + [value] for target, value in zip(targets, fields.values())]
+        result = await driver.execute_async_script(FILL_FORM, queries, {'clear': clear_first, 'click': click_first}, 0)
+        if result['missing']:
+            raise NoSuchElementException(f"No element found for locators {result['missing']}")
+        if result['errors']:
+            raise ValueError('; '.join(result['errors']))
+
+    @classmethod
+    async def type_at_offset(cls, text: str, x_offset: float = 0, y_offset: float = 0, reset_actions: bool = True):
+        # Both input sources advance tick by tick, so the pointer pauses while the keys are typed after the move
+        keys = _key_presses(text)
+        driver = cls.get_active_driver()
+        await driver.perform_actions(
+            _pointer_source([{'type': 'pointerMove', 'duration': POINTER_MOVE_DURATION, 'origin': 'pointer',
+                              'x': int(x_offset), 'y': int(y_offset)}] + [{'type': 'pause'}] * len(keys)),
+            _key_source([{'type': 'pause'}] + keys))
+        if reset_actions:
+            await driver.release_actions()
+
+    @classmethod
+    async def run_script(cls, script: str, locator: AnyLocator = None, timeout: int = None, index: int = None,
+                         scroll_options: dict = None):
+        driver = cls.get_active_driver()
+        if locator:
+            element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='clickable',
+                                              timeout=timeout)
+            return await driver.execute_script(script, element)
+        return await driver.execute_script(script)
+
+    @classmethod
+    async def get_element_attribute(cls, locator: AnyLocator, attribute: str, all_elements: bool = False,
+                                    index: int = None, timeout: int = None):
+        if all_elements:
+            records = await cls.read_elements(locator, attributes=[attribute], timeout=timeout)
+            return [record['attributes'][attribute] for record in records]
+        element = await cls._find_element(locator, index, scroll_to=False, wait_for='visible', timeout=timeout)
+        return await element.get_attribute(attribute)
+
+    @classmethod
+    async def get_css_property(cls, locator: AnyLocator, property_name: str, all_elements: bool = False,
+                               index: int = None, timeout: int = None):
+        if all_elements:
+            records = await cls.read_elements(locator, css_properties=[property_name], timeout=timeout)
+            return [record['css'][property_name] for record in records]
+        element = await cls._find_element(locator, index, scroll_to=False, wait_for='visible', timeout=timeout)
+        return await element.value_of_css_property(property_name)
+
+    @classmethod
+    async def get_element_location(cls, locator: AnyLocator, scroll_to: bool = True, scroll_options: dict = None):
+        element = await cls._find_element(locator, scroll_to=scroll_to, scroll_options=scroll_options)
+        rect = await element.get_rect()
+        return {'x': round(rect['x']), 'y': round(rect['y'])}
+
+    @classmethod
+    async def get_element_text(cls, locator: AnyLocator, all_elements: bool = False, index: int = None,
+                               timeout: int = None):
+        if all_elements:
+            records = await cls.read_elements(locator, text=True, timeout=timeout)
+            return [record['text'] for record in records]
+        element = await cls._find_element(locator, index, scroll_to=False, wait_for='visible', timeout=timeout)
+        return await element.get_text()
+
+    @classmethod
+    async def get_selected_option_text(cls, locator: AnyLocator, all_elements: bool = False, index: int = None,
+                                       timeout: int = None):
+        records = await cls.read_elements(locator, selected_option=True, timeout=timeout)
+        if all_elements:
+            return [record['selected_option'] for record in records]
+        index, _ = Locator.of(locator).resolve(index)
+        try:
+            return records[index]['selected_option']
+        except IndexError:
+            raise NoSuchElementException(f"No element found for locator '{locator}' at index {index}")
+
+    @classmethod
+    async def read_elements(cls, locators, text: bool = False, attributes: list = None, css_properties: list = None,
+                            selected_option: bool = False, timeout: int = None, poll_frequency: float = None):
+        locators = [Locator.of(locators)] if isinstance(locators, (str, Locator)) else list(map(Locator.of, locators))
+        _, timeout = locators[0].resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+        queries = [[locator.value, locator.by] for locator in locators]
+        fields = {'text': text, 'attributes': attributes or [], 'css': css_properties or [],
+                  'selected_option': selected_option}
+        driver = cls.get_active_driver()
+
+        async def read():
+            result = await driver.execute_async_script(READ_ELEMENTS, queries, fields, 0)
+            return result if result['ready'] else None
+
+        result = await AsyncUIWaits._poll(read, timeout, poll_frequency)
+        if result is None:
+            print(WAIT_TIMEOUT_MESSAGES['visible'].format(locator=', '.join(map(str, locators))))
+            result = await driver.execute_async_script(READ_ELEMENTS, queries, fields, 0)
+        return result['records']
+
+    @classmethod
+    async def count_elements(cls, locator: AnyLocator):
+        return len(await cls._find_elements(locator))
+
+    @classmethod
+    async def is_element_displayed(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        try:
+            element = await cls._find_element(locator, index, scroll_options=scroll_options)
+            return await element.is_displayed()
+        except NoSuchElementException:
+            return False
+
+    @classmethod
+    async def is_element_enabled(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        try:
+            element = await cls._find_element(locator, index, scroll_options=scroll_options)
+            return await element.is_enabled()
+        except NoSuchElementException:
+            return False
+
+    @classmethod
+    async def is_element_focused(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        try:
+            element = await cls._find_element(locator, index, scroll_options=scroll_options)
+            return element == await cls.get_active_driver().command('GET', '/element/active')
+        except NoSuchElementException:
+            return False
+
+    @classmethod
+    async def is_partial_link_displayed(cls, partial_text: str):
+        try:
+            element = await cls.get_active_driver().find_element('partial link text', partial_text)
+            return await element.is_displayed()
+        except NoSuchElementException:
+            print('Partial link text not found')
+            return False
+
+    @classmethod
+    async def is_element_selected(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options)
+        return await element.is_selected()
+
+    @classmethod
+    async def move_mouse(cls, locator: AnyLocator = None, x_offset: float = 0, y_offset: float = 0,
+                         reset_actions: bool = True):
+        # With a locator the offsets are taken from the element's center, otherwise from the current position
+        driver = cls.get_active_driver()
+        origin = (await cls._find_element(locator, scroll_to=False)).to_w3c() if locator else 'pointer'
+        await driver.perform_actions(_pointer_source([{'type': 'pointerMove', 'duration': POINTER_MOVE_DURATION,
+                                                       'origin': origin, 'x': int(x_offset), 'y': int(y_offset)}]))
+        if reset_actions:
+            await driver.release_actions()
+
+    @classmethod
+    async def execute_keyboard_shortcut(cls, key: str, modifier_key: str = None):
+        if modifier_key:
+            modifier = getattr(Keys, modifier_key.upper())
+            keys = [{'type': 'keyDown', 'value': modifier}] + _key_presses(key) + [{'type': 'keyUp', 'value': modifier}]
+        else:
+            keys = _key_presses(getattr(Keys, key.upper()))
+        driver = cls.get_active_driver()
+        await driver.perform_actions(_key_source(keys))
+        await driver.release_actions()
+
+    @classmethod
+    async def scroll_to_view(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        await cls._find_element(locator, index, scroll_options=scroll_options)
+
+    @classmethod
+    async def select_option_by_text(cls, locator: AnyLocator, option_text: str, index: int = None, timeout: int = None,
+                                    scroll_options: dict = None):
+        element = await cls._find_element(locator, index, scroll_options=scroll_options, wait_for='visible',
+                                          timeout=timeout)
+        option_xpath = f'.//option[normalize-space(.) = {_xpath_literal(option_text)}]'
+        try:
+            option = await element.find_element('xpath', option_xpath)
+        except NoSuchElementException:
+            raise NoSuchElementException(f'Could not locate element with visible text: {option_text}')
+        if not await option.is_selected():
+            await option.click()
+
+    @classmethod
+    async def select_option_matching_text(cls, dropdown_locator: AnyLocator, options_locator: AnyLocator, text: str,
+                                          index: int = None, click_dropdown: bool = True, timeout: int = None,
+                                          scroll_options: dict = None):
+        if click_dropdown:
+            element = await cls._find_element(dropdown_locator, index, scroll_options=scroll_options,
+                                              wait_for='visible', timeout=timeout)
+            await element.click()
+
+        for option in await cls._find_elements(f'{dropdown_locator}{options_locator}'):
+            if await option.get_text() == text:
+                await option.click()
+                return
+        raise ValueError(f'Option with text "{text}" not found')
+
+    @classmethod
+    async def _find_elements(cls, locator: AnyLocator):
+        return await cls.get_active_driver().find_elements(*Locator.of(locator).as_tuple())
+
+    @classmethod
+    async def _find_element(cls, locator: AnyLocator, index: int = None, scroll_to: bool = True,
+                            scroll_options: dict = None, wait_for: str = None, timeout: int = None,
+                            poll_frequency: float = None):
+        # Every poll runs the lookup, condition check and scroll as one script call; polls are spaced with
+        # asyncio.sleep so that other sessions keep running in between
+        locator = Locator.of(locator)
+        index, timeout = locator.resolve(index, timeout, DEFAULT_TIMEOUT)
+        driver = cls.get_active_driver()
+        scroll = (scroll_options or True) if scroll_to else None
+
+        async def resolve():
+            return await driver.execute_async_script(RESOLVE_ELEMENT, locator.value, locator.by, index,
+                                                     wait_for or 'present', 0, scroll, None)
+
+        if wait_for:
+            result = await AsyncUIWaits._poll(lambda: cls._ready(resolve), timeout, poll_frequency)
+            if result is None:
+                print(WAIT_TIMEOUT_MESSAGES[wait_for].format(locator=locator))
+                result = await resolve()
+        else:
+            result = await resolve()
+        if result['element'] is None:
+            raise NoSuchElementException(f"No element found for locator '{locator}' at index {index}")
+        return result['element']
+
+    @staticmethod
+    async def _ready(resolve):
+        result = await resolve()
+        return result if result['ready'] else None
+
+
+class AsyncUIWaits(AsyncWebDriverManager):
+
+    @classmethod
+    async def _poll(cls, condition, timeout: float, poll_frequency: float = None):
+        """
+        Awaits `condition()` until it returns a truthy value or the timeout expires, sleeping between polls without
+        blocking the event loop.
+
+        Returns:
+            The truthy value returned by the condition, or None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        poll_frequency = DEFAULT_POLL_FREQUENCY if poll_frequency is None else poll_frequency
+        while True:
+            result = await condition()
+            if result:
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(poll_frequency, remaining))
+
+    @classmethod
+    async def _wait(cls, condition, timeout: float, message: str, ignore_timeout: bool = False,
+                    poll_frequency: float = None):
+        result = await cls._poll(condition, timeout, poll_frequency)
+        if result is None:
+            if ignore_timeout:
+                print(message)
+            else:
+                raise TimeoutException(message)
+        return result
+
+    @classmethod
+    async def _check_element(cls, locator: Locator, condition: str):
+        driver = cls.get_active_driver()
+        return await driver.execute_async_script(RESOLVE_ELEMENT, locator.value, locator.by, locator.index, condition,
+                                                 0, None, None)
+
+    @classmethod
+    async def wait_until_alert_present(cls, timeout: int = DEFAULT_TIMEOUT, ignore_timeout: bool = False,
+                                       poll_frequency: float = None):
+        await cls._wait(AsyncBrowserActions._alert_present, timeout, 'Alert did not appear within the timeout period',
+                        ignore_timeout, poll_frequency)
+
+    @classmethod
+    async def wait_until_visible(cls, locator: AnyLocator, timeout: int = None, ignore_timeout: bool = False,
+                                 poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+
+        async def visible():
+            return (await cls._check_element(locator, 'visible'))['ready']
+
+        await cls._wait(visible, timeout, f'Element "{locator}" did not become visible within the timeout period',
+                        ignore_timeout, poll_frequency)
+
+    @classmethod
+    async def wait_until_clickable(cls, locator: AnyLocator, timeout: int = None, ignore_timeout: bool = False,
+                                   poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+
+        async def clickable():
+            return (await cls._check_element(locator, 'clickable'))['ready']
+
+        await cls._wait(clickable, timeout, f'Element "{locator}" was not clickable within the timeout period',
+                        ignore_timeout, poll_frequency)
+
+    @classmethod
+    async def wait_until_stale(cls, locator: AnyLocator, timeout: int = None, poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+        driver = cls.get_active_driver()
+        try:
+            element = await driver.find_element(*locator.as_tuple())
+        except NoSuchElementException:
+            print(f'Element "{locator}" did not become stale within the timeout period')
+            return
+
+        async def stale():
+            try:
+                await element.is_enabled()
+                return False
+            except StaleElementReferenceException:
+                return True
+
+        await cls._wait(stale, timeout, f'Element "{locator}" did not become stale within the timeout period', True,
+                        poll_frequency)
+
+    @classmethod
+    async def wait_until_invisible(cls, locator: AnyLocator, timeout: int = None, poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+
+        async def invisible():
+            return not (await cls._check_element(locator, 'visible'))['ready']
+
+        await cls._wait(invisible, timeout, f'Element "{locator}" did not become invisible within the timeout period',
+                        True, poll_frequency)
+
+    @classmethod
+    async def wait_until_text_present(cls, locator: AnyLocator, text: str, timeout: int = None,
+                                      ignore_timeout: bool = False, poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+        driver = cls.get_active_driver()
+
+        async def text_present():
+            try:
+                element = await driver.find_element(*locator.as_tuple())
+                return text in await element.get_text()
+            except (NoSuchElementException, StaleElementReferenceException):
+                return False
+
+        await cls._wait(text_present, timeout,
+                        f'Text "{text}" not present in element "{locator}" within the timeout period',
+                        ignore_timeout, poll_frequency)
+
+    @classmethod
+    async def wait_until_value_present(cls, locator: AnyLocator, value: str, timeout: int = None,
+                                       ignore_timeout: bool = False, poll_frequency: float = None):
+        locator = Locator.of(locator)
+        _, timeout = locator.resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+        driver = cls.get_active_driver()
+
+        async def value_present():
+            try:
+                element = await driver.find_element(*locator.as_tuple())
+                return value in (await element.get_attribute('value') or '')
+            except (NoSuchElementException, StaleElementReferenceException):
+                return False
+
+        await cls._wait(value_present, timeout,
+                        f'Value "{value}" not present in element "{locator}" within the timeout period',
+                        ignore_timeout, poll_frequency)
+
+
+class AsyncBrowserActions(AsyncWebDriverManager):
+
+    @classmethod
+    async def accept_browser_alert(cls):
+        await cls.get_active_driver().command('POST', '/alert/accept', {})
+
+    @classmethod
+    async def get_alert_message(cls):
+        return await cls.get_active_driver().command('GET', '/alert/text')
+
+    @classmethod
+    async def close_window(cls):
+        await cls.get_active_driver().command('DELETE', '/window')
+
+    @classmethod
+    async def dismiss_browser_alert(cls):
+        await cls.get_active_driver().command('POST', '/alert/dismiss', {})
+
+    @classmethod
+    async def switch_to_frame(cls, locator: AnyLocator):
+        driver = cls.get_active_driver()
+        element = await driver.find_element(*Locator.of(locator).as_tuple())
+        await driver.command('POST', '/frame', {'id': element.to_w3c()})
+
+    @classmethod
+    async def switch_to_default_content(cls):
+        await cls.get_active_driver().command('POST', '/frame', {'id': None})
+
+    @classmethod
+    async def retrieve_all_cookies(cls):
+        return await cls.get_active_driver().command('GET', '/cookie')
+
+    @classmethod
+    async def retrieve_cookie(cls, name: str):
+        try:
+            return await cls.get_active_driver().command('GET', f'/cookie/{name}')
+        except NoSuchCookieException:
+            raise ValueError(f'Cookie named "{name}" not found')
+
+    @classmethod
+    async def get_current_url(cls):
+        return await cls.get_active_driver().command('GET', '/url')
+
+    @classmethod
+    async def get_all_window_handles(cls):
+        return await cls.get_active_driver().command('GET', '/window/handles')
+
+    @classmethod
+    async def navigate_to_url(cls, url: str):
+        await cls.get_active_driver().command('POST', '/url', {'url': url})
+
+    @classmethod
+    async def is_alert_present(cls, timeout: int = DEFAULT_TIMEOUT, poll_frequency: float = None):
+        return bool(await AsyncUIWaits._poll(cls._alert_present, timeout, poll_frequency))
+
+    @classmethod
+    async def _alert_present(cls):
+        try:
+            await cls.get_active_driver().command('GET', '/alert/text')
+            return True
+        except NoAlertPresentException:
+            return False
+
+    @classmethod
+    async def refresh_page(cls):
+        await cls.get_active_driver().command('POST', '/refresh', {})
+
+    @classmethod
+    async def set_window_size(cls, width: int, height: int):
+        await cls.get_active_driver().command('POST', '/window/rect', {'width': width, 'height': height})
+
+    @classmethod
+    async def save_screenshot(cls, file_path: str, format: str = 'png'):
+        if format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format. Supported formats: {IMAGE_FORMATS}")
+        screenshot = await cls.get_active_driver().command('GET', '/screenshot')
+        await _write_file(f'{file_path}.{format}', base64.b64decode(screenshot))
+
+    @classmethod
+    async def switch_to_window_by_index(cls, index: int):
+        driver = cls.get_active_driver()
+        handles = await driver.command('GET', '/window/handles')
+        try:
+            handle = handles[index]
+        except IndexError:
+            raise ValueError(f'No window found at index {index}')
+        await driver.command('POST', '/window', {'handle': handle})
+
+    @classmethod
+    async def navigate_back(cls):
+        await cls.get_active_driver().execute_script("window.history.go(-1)")
+
+    @classmethod
+    async def navigate_forward(cls):
+        await cls.get_active_driver().execute_script("window.history.go(1)")
@@ -0,0 +1,275 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from selenium.common.exceptions import WebDriverException
+
+from auto_utilities.element_cache import ElementCache
+from auto_utilities.network_utility import RequestBlocker
+from auto_utilities.webdriver_utility import CustomWebDriverManager
+
+DEFAULT_LEASE_TIMEOUT = 120
+MAX_RELAUNCH_ATTEMPTS = 3
+RELAUNCH_BACKOFF = 2
+CLEAR_STORAGE_SCRIPT = ("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {} "
+                        "return window.location.origin;")
+
+
+class BrowserPool:
+    """
+    Pool of prewarmed WebDriver instances leased to tests and reset between them instead of being relaunched.
+
+    Example:
+        >>> pool = BrowserPool(size=2, max_uses=25)
+        >>> pool.start()
+        >>> driver = pool.lease()
+        >>> pool.release(driver)
+        >>> pool.close()
+    """
+
+    def __init__(self, size: int = 1, browser_type: str = 'chrome', remote_host: str = None, max_uses: int = 25,
+                 download_root: str = None, prepare=None, lease_timeout: int = DEFAULT_LEASE_TIMEOUT,
+                 profile: str = None, request_blocking: dict = None):
+        """
+        Args:
+            size: Number of drivers kept in the pool.
+            browser_type: Browser launched for every driver.
+            remote_host: Selenium grid host, or None for local drivers.
+            max_uses: Number of leases after which a driver is quit and replaced.
+            download_root: Directory holding one download directory per driver (default: a temporary directory).
+            prepare: Optional callable run once on every newly launched driver, e.g. to maximize the window.
+            lease_timeout: Seconds to wait for a free driver before giving up.
+            profile: Performance profile the drivers are launched with (see CustomWebDriverManager).
+            request_blocking: Requests blocked or stubbed on every driver (see CustomWebDriverManager.launch_driver).
+        """
+        self.size = size
+        self.browser_type = browser_type
+        self.remote_host = remote_host
+        self.max_uses = max_uses
+        self.download_root = download_root or tempfile.mkdtemp(prefix='browser_pool_')
+        self.prepare = prepare
+        self.lease_timeout = lease_timeout
+        self.profile = profile
+        self.request_blocking = request_blocking
+
+        self._idle = queue.Queue()
+        self._drivers = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='browser_pool')
+        self._closed = threading.Event()
+        self._launch_error = None
+        self.stats = {'launches': 0, 'launch_failures': 0, 'launch_seconds': 0.0, 'leases': 0,
+                      'lease_wait_seconds': 0.0, 'max_lease_wait_seconds': 0.0, 'recycled': 0, 'crashed': 0,
+                      'lost_slots': 0}
+
+    def start(self):
+        """
+        Launches all drivers of the pool in parallel and waits until they are ready. If any launch fails, the drivers
+        that did launch are quit and the pool is closed before the error is raised.
+        """
+        futures = [self._executor.submit(self._launch) for _ in range(self.size)]
+        wait(futures)
+        try:
+            for future in futures:
+                future.result()
+        except Exception:
+            self.close()
+            raise
+
+    def lease(self, timeout: int = None):
+        """
+        Takes a ready driver out of the pool, waiting for one to be released or launched if none is free.
+
+        Raises:
+            TimeoutError: If no driver becomes available within the timeout.
+            WebDriverException: If every slot of the pool was lost because its driver could not be relaunched.
+        """
+        timeout = self.lease_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        driver = None
+        while driver is None:
+            with self._lock:
+                lost_slots, launch_error = self.stats['lost_slots'], self._launch_error
+            if lost_slots >= self.size:
+                raise WebDriverException(f"All {self.size} browsers of the pool failed to relaunch: {launch_error}")
+            try:
+                # None is put by a slot given up after failed relaunches, to wake a waiting lease
+                driver = self._idle.get(timeout=max(started + timeout - time.perf_counter(), 0))
+            except queue.Empty:
+                message = f"No browser became available within {timeout} seconds"
+                if lost_slots:
+                    message += f" ({lost_slots} of {self.size} browsers failed to relaunch: {launch_error})"
+                raise TimeoutError(message) from launch_error
+        waited = time.perf_counter() - started
+
+        with self._lock:
+            self._drivers[driver]['uses'] += 1
+            self.stats['leases'] += 1
+            self.stats['lease_wait_seconds'] += waited
+            self.stats['max_lease_wait_seconds'] = max(self.stats['max_lease_wait_seconds'], waited)
+        return driver
+
+    def release(self, driver):
+        """
+        Returns a leased driver. The driver is reset and reused, or replaced when it crashed, could not be reset or
+        reached `max_uses`.
+        """
+        with self._lock:
+            uses = self._drivers[driver]['uses']
+
+        if not self._is_alive(driver):
+            self._replace(driver, 'crashed')
+        elif uses >= self.max_uses:
+            self._replace(driver, 'recycled')
+        else:
+            try:
+                self.reset_state(driver)
+            except (WebDriverException, OSError):
+                # A driver whose state or download directory cannot be cleaned is replaced so its slot is not lost
+                self._replace(driver, 'crashed')
+            else:
+                self._idle.put(driver)
+
+    def reset_state(self, driver):
+        """
+        Brings a driver back to a clean state: single window, no cookies, empty storage and download directory.
+
+        On Chromium drivers the cookies of every site are cleared through the DevTools Protocol, along with all storage
+        (local and session storage, IndexedDB, cache storage, service workers) of the page the test ended on. Other
+        browsers only get the cookies and web storage of that page cleared. Storage of other origins a test visited
+        earlier cannot be reached either way and carries over to the next lease; use `max_uses=1` for tests that need
+        it clean.
+        """
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        origin = driver.execute_script(CLEAR_STORAGE_SCRIPT)
+        driver.delete_all_cookies()
+        self._clear_browser_data(driver, origin)
+        driver.get('about:blank')
+        ElementCache.invalidate(driver)
+
+        download_path = self._drivers[driver]['download_path']
+        for entry in os.listdir(download_path):
+            entry_path = os.path.join(download_path, entry)
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+            else:
+                os.remove(entry_path)
+
+    def get_download_path(self, driver):
+        return self._drivers[driver]['download_path']
+
+    def get_stats(self):
+        """
+        Returns launch and lease counters, including average launch and lease wait times in seconds.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats['avg_launch_seconds'] = stats['launch_seconds'] / stats['launches'] if stats['launches'] else 0.0
+        stats['avg_lease_wait_seconds'] = stats['lease_wait_seconds'] / stats['leases'] if stats['leases'] else 0.0
+        return stats
+
+    def close(self):
+        """
+        Quits every driver of the pool and removes their download directories.
+        """
+        self._closed.set()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+        for driver in drivers:
+            self._quit(driver)
+        shutil.rmtree(self.download_root, ignore_errors=True)
+
+    def _launch(self):
+        download_path = tempfile.mkdtemp(dir=self.download_root)
+        started = time.perf_counter()
+        try:
+            driver = CustomWebDriverManager.create_driver(self.browser_type, self.remote_host, download_path,
+                                                          self.profile, self.request_blocking)
+            if self.prepare:
+                self.prepare(driver)
+        except Exception:
+            with self._lock:
+                self.stats['launch_failures'] += 1
+            shutil.rmtree(download_path, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self.stats['launches'] += 1
+            self.stats['launch_seconds'] += time.perf_counter() - started
+            self._drivers[driver] = {'uses': 0, 'download_path': download_path}
+        self._idle.put(driver)
+        return driver
+
+    def _replace(self, driver, reason: str):
+        with self._lock:
+            entry = self._drivers.pop(driver, None)
+            self.stats[reason] += 1
+        self._quit(driver)
+        if entry:
+            shutil.rmtree(entry['download_path'], ignore_errors=True)
+        self._relaunch()
+
+    def _relaunch(self, attempt: int = 1):
+        if self._closed.is_set():
+            return
+        try:
+            future = self._executor.submit(self._launch)
+        except RuntimeError:
+            # The pool was closed meanwhile
+            return
+        future.add_done_callback(lambda launched: self._relaunched(launched, attempt))
+
+    def _relaunched(self, future, attempt: int):
+        """
+        Retries a failed relaunch with a growing delay, and gives the slot up after MAX_RELAUNCH_ATTEMPTS so lease
+        reports the failure instead of waiting for a driver that never comes.
+        """
+        if future.cancelled() or future.exception() is None:
+            return
+        error = future.exception()
+        print(f"Browser relaunch failed (attempt {attempt} of {MAX_RELAUNCH_ATTEMPTS}): {error}")
+        if attempt < MAX_RELAUNCH_ATTEMPTS:
+            if not self._closed.wait(RELAUNCH_BACKOFF * attempt):
+                self._relaunch(attempt + 1)
+            return
+        with self._lock:
+            self.stats['lost_slots'] += 1
+            self._launch_error = error
+        self._idle.put(None)
+
+    @staticmethod
+    def _clear_browser_data(driver, origin: str):
+        try:
+            RequestBlocker.execute_cdp(driver, 'Network.clearBrowserCookies', {})
+            if origin and origin != 'null':
+                RequestBlocker.execute_cdp(driver, 'Storage.clearDataForOrigin',
+                                           {'origin': origin, 'storageTypes': 'all'})
+        except WebDriverException:
+            # Not a Chromium driver; cookies and web storage of the current page were cleared already
+            pass
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        # Also removes the profile's temporary directories, so recycled and relaunched drivers do not pile them up
+        try:
+            CustomWebDriverManager.quit_driver(driver)
+        except WebDriverException:
+            pass
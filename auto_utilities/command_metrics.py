@@ -0,0 +1,222 @@
+import contextvars
+import csv
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from selenium.webdriver.remote.command import Command
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+NAVIGATION_COMMANDS = {Command.GET, Command.REFRESH, Command.GO_BACK, Command.GO_FORWARD}
+SCRIPT_COMMANDS = {Command.W3C_EXECUTE_SCRIPT, Command.W3C_EXECUTE_SCRIPT_ASYNC}
+FIND_COMMANDS = {Command.FIND_ELEMENT, Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENT, Command.FIND_CHILD_ELEMENTS}
+SCRIPT_MARKER = re.compile(r'^/\* auto_utilities:(\w+) \*/')
+WAIT_SCRIPTS = {'wait'}
+CSV_FIELDS = ('test', 'command', 'phase', 'locator', 'script', 'milliseconds', 'payload_bytes')
+SLOWEST_LOCATORS = 10
+
+
+class CommandRecorder:
+    """
+    Opt-in recorder of every WebDriver command sent by instrumented drivers: command name, locator (when known),
+    wall time, request payload size, test and phase (wait, action or navigation).
+
+    Drivers are only wrapped once `instrument` is called, so suites that never enable it pay nothing.
+
+    Example:
+        >>> CommandRecorder.instrument(driver)
+        >>> CommandRecorder.start_test('Tests/facebook_test.py::test_login')
+        >>> CommandRecorder.summarize_test('Tests/facebook_test.py::test_login')
+        {'commands': 14, 'seconds': 1.92, 'phases': {'action': {'commands': 9, 'seconds': 0.41}, ...}}
+        >>> CommandRecorder.write_report(json_path='commands.json', csv_path='commands.csv')
+    """
+
+    current_test = None
+    records = []
+    _phase = contextvars.ContextVar('command_phase', default=None)
+    _element_locators = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def instrument(cls, driver):
+        """
+        Wraps the driver's command executor so every command it sends is recorded. Safe to call repeatedly.
+        """
+        executor = driver.command_executor
+        if getattr(executor, '_command_recorder_original', None):
+            return driver
+        original = executor.execute
+
+        def execute(command, params):
+            started = time.perf_counter()
+            try:
+                response = original(command, params)
+            except Exception:
+                cls._record(command, params, None, time.perf_counter() - started)
+                raise
+            cls._record(command, params, response, time.perf_counter() - started)
+            return response
+
+        executor._command_recorder_original = original
+        executor.execute = execute
+        return driver
+
+    @classmethod
+    def uninstrument(cls, driver):
+        executor = driver.command_executor
+        original = getattr(executor, '_command_recorder_original', None)
+        if original:
+            executor.execute = original
+            executor._command_recorder_original = None
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name: str):
+        """
+        Attributes the commands sent inside the block to `name` ('wait', 'action' or 'navigation'), overriding the
+        classification by command name.
+        """
+        token = cls._phase.set(name)
+        try:
+            yield
+        finally:
+            cls._phase.reset(token)
+
+    @classmethod
+    def start_test(cls, name: str):
+        with cls._lock:
+            cls.current_test = name
+            cls._element_locators.clear()
+
+    @classmethod
+    def summarize_test(cls, name: str):
+        """
+        Returns command count, total seconds and per-phase totals of a single test.
+        """
+        with cls._lock:
+            records = [record for record in cls.records if record['test'] == name]
+        return cls._summarize(records)
+
+    @staticmethod
+    def _summarize(records: list):
+        summary = {'commands': 0, 'seconds': 0.0, 'phases': {}}
+        for record in records:
+            phase = summary['phases'].setdefault(record['phase'], {'commands': 0, 'seconds': 0.0})
+            phase['commands'] += 1
+            phase['seconds'] += record['seconds']
+            summary['commands'] += 1
+            summary['seconds'] += record['seconds']
+        return summary
+
+    @classmethod
+    def build_report(cls):
+        """
+        Aggregates all records: per-test summaries, p50/p95 per command type and the slowest locators.
+        """
+        with cls._lock:
+            records = list(cls.records)
+
+        durations = defaultdict(list)
+        locators = defaultdict(list)
+        # Grouped in the same pass, in order of each test's first command
+        by_test = defaultdict(list)
+        for record in records:
+            by_test[record['test']].append(record)
+            durations[record['command']].append(record['seconds'])
+            if record['locator']:
+                locators[record['locator']].append(record['seconds'])
+
+        commands = {command: {'count': len(values), 'total_ms': sum(values) * 1000,
+                              'p50_ms': cls._percentile(values, 50) * 1000,
+                              'p95_ms': cls._percentile(values, 95) * 1000}
+                    for command, values in sorted(durations.items())}
+        slowest = sorted(({'locator': locator, 'commands': len(values), 'total_ms': sum(values) * 1000,
+                           'max_ms': max(values) * 1000} for locator, values in locators.items()),
+                         key=lambda entry: entry['total_ms'], reverse=True)[:SLOWEST_LOCATORS]
+        tests = {name: cls._summarize(test_records) for name, test_records in by_test.items()}
+        return {'tests': tests, 'commands': commands, 'slowest_locators': slowest}
+
+    @classmethod
+    def write_report(cls, json_path: str = None, csv_path: str = None):
+        """
+        Writes the aggregated report as JSON and/or every recorded command as CSV.
+        """
+        if json_path:
+            with open(json_path, 'w') as report_file:
+                json.dump(cls.build_report(), report_file, indent=2)
+        if csv_path:
+            with cls._lock:
+                records = list(cls.records)
+            with open(csv_path, 'w', newline='') as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for record in records:
+                    writer.writerow(dict(record, milliseconds=round(record['seconds'] * 1000, 3)))
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.records.clear()
+            cls._element_locators.clear()
+            cls.current_test = None
+
+    @classmethod
+    def _record(cls, command: str, params: dict, response, seconds: float):
+        params = params or {}
+        script = None
+        locator = None
+        if command in SCRIPT_COMMANDS:
+            marker = SCRIPT_MARKER.match(params.get('script', ''))
+            script = marker.group(1) if marker else None
+            if script:
+                locator = cls._script_locator(params.get('args') or [])
+        elif command in FIND_COMMANDS:
+            locator = params.get('value')
+        elif 'id' in params:
+            locator = cls._element_locators.get(params['id'])
+
+        phase = cls._phase.get()
+        if phase is None:
+            if command in NAVIGATION_COMMANDS:
+                phase = 'navigation'
+            elif script in WAIT_SCRIPTS:
+                phase = 'wait'
+            else:
+                phase = 'action'
+
+        record = {'test': cls.current_test, 'command': command, 'phase': phase, 'locator': locator,
+                  'script': script, 'seconds': seconds, 'payload_bytes': len(json.dumps(params, default=str))}
+        with cls._lock:
+            cls.records.append(record)
+            if locator and response and command in FIND_COMMANDS | SCRIPT_COMMANDS:
+                for element_id in cls._element_ids(response.get('value')):
+                    cls._element_locators[element_id] = locator
+
+    @staticmethod
+    def _script_locator(args: list):
+        first = args[0] if args else None
+        if isinstance(first, str):
+            return first
+        if isinstance(first, list):
+            return ', '.join(str(query[0]) for query in first if isinstance(query, list) and query)
+        return None
+
+    @classmethod
+    def _element_ids(cls, value):
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return [value[ELEMENT_KEY]]
+            return [element_id for item in value.values() for element_id in cls._element_ids(item)]
+        if isinstance(value, list):
+            return [element_id for item in value for element_id in cls._element_ids(item)]
+        return []
+
+    @staticmethod
+    def _percentile(values: list, percent: float):
+        # Nearest-rank percentile
+        ordered = sorted(values)
+        return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
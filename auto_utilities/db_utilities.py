@@ -1,10 +1,271 @@
+import itertools
+import math
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import NamedTuple
+
 import cx_Oracle
 import pyodbc
 from cx_Oracle import SessionPool
+from psycopg import sql
 from pymysql import Error
-from pymysql.constants import CLIENT
-from pymysqlpool import ConnectionPool
-from psycopg_pool import ConnectionPool as PstgConnectionPool
+from pymysql.constants import CLIENT, SERVER_STATUS
+from pymysql.cursors import SSCursor
+from pymysqlpool import ConnectionPool, GetConnectionFromPoolError
+from psycopg_pool import ConnectionPool as PstgConnectionPool, PoolTimeout as PstgPoolTimeout
+
+from auto_utilities.result_frames import ResultFrames
+
+DEFAULT_FETCH_BATCH_SIZE = 5000
+DEFAULT_BULK_BATCH_SIZE = 1000
+DEFAULT_COPY_CHUNK_SIZE = 1024 * 1024
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_MAX_IDLE = 300
+DEFAULT_MAX_LIFETIME = 3600
+SQL_SERVER_HEALTH_CHECK = 'SELECT 1'
+ORACLE_POOL_TIMEOUT_CODE = 24457
+MYSQL_CHECKOUT_POLL_INTERVAL = 0.05
+POOL_WAIT_SAMPLES = 10000
+
+
+class BulkLoadResult(NamedTuple):
+    """
+    Outcome of a bulk write: rows sent, batches, wall time and the (row index, message) of every rejected row.
+    """
+    rows: int
+    batches: int
+    seconds: float
+    errors: list
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled connection becomes available within the pool timeout.
+    """
+
+
+class PoolClosed(Exception):
+    """
+    Raised when a connection is requested from a pool that was closed.
+    """
+
+
+class PoolMetrics:
+    """
+    Checkout statistics of one connection pool, recorded by DatabaseHelper.lease: number of checkouts, timeouts and
+    the time callers waited for a connection.
+    """
+
+    def __init__(self):
+        # Serializes Oracle acquires, which set the pool-wide wait_timeout to each caller's own timeout
+        self.checkout_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._waits = deque(maxlen=POOL_WAIT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self._waits.append(seconds)
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            attempts = self.checkouts + self.timeouts
+            return {'checkouts': self.checkouts, 'timeouts': self.timeouts,
+                    'wait_ms_mean': self.wait_seconds / attempts * 1000 if attempts else 0.0,
+                    'wait_ms_p95': waits[max(math.ceil(0.95 * len(waits)) - 1, 0)] * 1000 if waits else 0.0,
+                    'wait_ms_max': self.max_wait_seconds * 1000}
+
+
+class SqlServerConnectionPool:
+    """
+    Thread-safe pool of pyodbc connections to SQL Server, so queries reuse logged-in connections instead of paying the
+    connection and login latency every time.
+
+    Idle connections are reused most recently returned first. Connections idle for longer than `max_idle` are closed
+    (down to `min_size`), and every checked out connection is health checked first, replacing it if the check fails.
+
+    Args:
+        connection_string: ODBC connection string
+        min_size: Number of connections opened up front and kept open while idle
+        max_size: Maximum number of open connections
+        timeout: Seconds to wait for a free connection before raising PoolTimeout
+        max_idle: Seconds an idle connection is kept above `min_size`
+        health_check: If set, runs `SELECT 1` on a connection before handing it out
+
+    Example:
+        >>> pool = DatabaseHelper.setup_sql_server_pool('qa', pwd, 'db.example.com', 'orders')
+        >>> with pool.connection() as conn:
+        ...     conn.cursor().execute('SELECT 1').fetchone()
+    """
+
+    def __init__(self, connection_string: str, min_size: int = 1, max_size: int = 4,
+                 timeout: float = DEFAULT_POOL_TIMEOUT, max_idle: float = DEFAULT_MAX_IDLE, health_check: bool = True):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self.connection_string = connection_string
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check = health_check
+        self.created = 0
+        self.destroyed = 0
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        try:
+            for _ in range(min_size):
+                self._idle.append((self._open(), time.monotonic()))
+                self._size += 1
+        except pyodbc.Error:
+            self.close()
+            raise
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def getconn(self, timeout: float = None):
+        """
+        Returns a healthy connection, reusing an idle one or opening a new one while under `max_size`.
+
+        Raises:
+            PoolTimeout: If no connection becomes free within the timeout
+            PoolClosed: If the pool is closed
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            conn, opened = self._checkout(deadline, timeout)
+            if opened or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn):
+        """
+        Returns a connection to the pool, rolling back whatever transaction it left open.
+        """
+        try:
+            conn.rollback()
+        except pyodbc.Error:
+            self._discard(conn)
+            return
+        with self._condition:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+                return
+        # The pool was closed while the connection was in use
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """
+        Leases a connection for the duration of the block and always returns it to the pool.
+        """
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        """
+        Closes the idle connections; connections in use are closed when they are returned. Callers waiting for a
+        connection get PoolClosed.
+        """
+        with self._condition:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._closed = True
+            self._condition.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def _checkout(self, deadline: float, timeout: float):
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolClosed("SQL Server connection pool is closed")
+                    now = time.monotonic()
+                    while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+                        expired.append(self._idle.popleft()[0])
+                        self._size -= 1
+                    if self._idle:
+                        return self._idle.pop()[0], False
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    if now >= deadline:
+                        raise PoolTimeout(f"No SQL Server connection available after {timeout} seconds")
+                    self._condition.wait(deadline - now)
+        finally:
+            for conn in expired:
+                self._close(conn)
+
+        try:
+            return self._open(), True
+        except pyodbc.Error:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _is_healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            conn.cursor().execute(SQL_SERVER_HEALTH_CHECK).fetchone()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _discard(self, conn):
+        self._close(conn)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _open(self):
+        conn = pyodbc.connect(self.connection_string)
+        with self._condition:
+            self.created += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+        with self._condition:
+            self.destroyed += 1
 
 
 class DatabaseHelper:
@@ -23,10 +284,31 @@ class DatabaseHelper:
 
         >>> results[2][3]
         Third row, fourth column of the results
+
+        Bind parameters use each driver's placeholders: %s for MySQL and PostgreSQL, :name or :1 for Oracle, ? for
+        SQL Server.
+
+        >>> run_postgres_query('SELECT * FROM orders WHERE id = %s', pool, params=(42,))
+
+        To validate large results without loading them in memory:
+
+        >>> for row in DatabaseHelper.stream_postgres_query('query', DatabaseHelper.postgres_pool):
+        ...     validate(row)
+
+        To check whole columns at once (see FrameAssertions):
+
+        >>> orders = run_postgres_query('SELECT * FROM orders', pool, result_format='dataframe')
+        >>> FrameAssertions.assert_unique(orders, 'id')
     """
 
+    # Keyed by the pool itself, so metrics go away with their pool; pools that cannot be weakly referenced are kept
+    # in a plain dict until reset_pool_metrics
+    _pool_metrics = weakref.WeakKeyDictionary()
+    _strong_pool_metrics = {}
+
     @classmethod
-    def setup_mysql_pool(cls, username: str, pwd: str, host_url: str):
+    def setup_mysql_pool(cls, username: str, pwd: str, host_url: str, min_size: int = 2, max_size: int = 4,
+                         timeout: float = DEFAULT_POOL_TIMEOUT, max_lifetime: float = DEFAULT_MAX_LIFETIME):
         """
         Initializes MySQL connection pool.
 
@@ -34,6 +316,10 @@ class DatabaseHelper:
             username: MySQL username
             pwd: MySQL password
             host_url: Host for the database
+            min_size: Number of connections kept in the pool
+            max_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+            max_lifetime: Seconds after which a connection is replaced
 
         Returns:
             Connection pool object for MySQL
@@ -42,15 +328,20 @@ class DatabaseHelper:
             user=username,
             password=pwd,
             host=host_url,
-            size=2,
-            maxsize=4,
+            size=min_size,
+            maxsize=max_size,
+            con_lifetime=int(max_lifetime),
             client_flag=CLIENT.MULTI_STATEMENTS,
             autocommit=True
         )
+        # pymysqlpool has no checkout timeout of its own; lease spreads it over the pool's retries
+        cls.mysql_pool.checkout_timeout = timeout
         return cls.mysql_pool
 
     @classmethod
-    def setup_oracle_pool(cls, username: str, pwd: str, dsn_string: str):
+    def setup_oracle_pool(cls, username: str, pwd: str, dsn_string: str, min_size: int = 1, max_size: int = 4,
+                          increment: int = 1, timeout: float = DEFAULT_POOL_TIMEOUT,
+                          max_idle: float = DEFAULT_MAX_IDLE, max_lifetime: float = DEFAULT_MAX_LIFETIME):
         """
         Initializes Oracle connection pool.
 
@@ -58,6 +349,12 @@ class DatabaseHelper:
             username: Oracle username
             pwd: Oracle password
             dsn_string: Oracle connection string (DSN)
+            min_size: Number of sessions kept open
+            max_size: Maximum number of open sessions
+            increment: Number of sessions opened at a time when the pool grows
+            timeout: Seconds to wait for a free session
+            max_idle: Seconds an idle session above `min_size` is kept open
+            max_lifetime: Seconds after which a session is replaced
 
         Returns:
             Oracle connection pool
@@ -66,14 +363,49 @@ class DatabaseHelper:
             user=username,
             password=pwd,
             dsn=dsn_string,
-            min=1,
-            max=4,
-            increment=1
+            min=min_size,
+            max=max_size,
+            increment=increment,
+            getmode=cx_Oracle.SPOOL_ATTRVAL_TIMEDWAIT,
+            wait_timeout=int(timeout * 1000),
+            timeout=int(max_idle),
+            max_lifetime_session=int(max_lifetime)
         )
         return cls.oracle_pool
 
     @classmethod
-    def setup_postgres_pool(cls, username: str, pwd: str, host_url: str, dbname: str, port_num: str):
+    def setup_sql_server_pool(cls, username: str, pwd: str, srv_name: str, db_name: str, min_size: int = 1,
+                              max_size: int = 4, timeout: float = DEFAULT_POOL_TIMEOUT,
+                              max_idle: float = DEFAULT_MAX_IDLE):
+        """
+        Initializes SQL Server connection pool.
+
+        Args:
+            username: SQL Server username
+            pwd: SQL Server password
+            srv_name: Server name
+            db_name: Database name
+            min_size: Number of connections kept open while idle
+            max_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+            max_idle: Seconds an idle connection above `min_size` is kept open
+
+        Returns:
+            SQL Server connection pool
+        """
+        cls.sql_server_pool = SqlServerConnectionPool(
+            cls._sql_server_connection_string(username, pwd, srv_name, db_name),
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            max_idle=max_idle
+        )
+        return cls.sql_server_pool
+
+    @classmethod
+    def setup_postgres_pool(cls, username: str, pwd: str, host_url: str, dbname: str, port_num: str,
+                            min_size: int = 1, max_size: int = 4, timeout: float = DEFAULT_POOL_TIMEOUT,
+                            max_idle: float = DEFAULT_MAX_IDLE, max_lifetime: float = DEFAULT_MAX_LIFETIME):
         """
         Initializes PostgreSQL connection pool.
 
@@ -83,6 +415,11 @@ class DatabaseHelper:
             host_url: Hostname for the PostgreSQL server
             dbname: Database name
             port_num: Port number
+            min_size: Number of connections kept open
+            max_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+            max_idle: Seconds an idle connection above `min_size` is kept open
+            max_lifetime: Seconds after which a connection is replaced
 
         Returns:
             PostgreSQL connection pool
@@ -90,13 +427,58 @@ class DatabaseHelper:
         connection_info = f"user={username} password={pwd} host={host_url} dbname={dbname} port={port_num}"
         cls.postgres_pool = PstgConnectionPool(
             conninfo=connection_info,
-            min_size=1,
-            max_size=4
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            max_idle=max_idle,
+            max_lifetime=max_lifetime
         )
         return cls.postgres_pool
 
     @classmethod
-    def run_mysql_query(cls, query: str, pool: ConnectionPool, apply_commit: bool = False):
+    @contextmanager
+    def lease(cls, pool, timeout: float = None):
+        """
+        Leases a connection from any of the MySQL, Oracle, SQL Server or PostgreSQL pools for the duration of the block
+        and always returns it the way its pool expects, recording the checkout in the pool's metrics.
+
+        Args:
+            pool: Connection pool object
+            timeout: Seconds to wait for a free connection (default: the pool's timeout). Oracle checkouts are
+                serialized per pool to apply it, as cx_Oracle only has a pool-wide wait_timeout.
+
+        Raises:
+            PoolTimeout: If no connection becomes free in time
+
+        Example:
+            >>> with DatabaseHelper.lease(DatabaseHelper.postgres_pool) as conn:
+            ...     conn.execute('TRUNCATE qa.orders')
+            ...     conn.commit()
+        """
+        conn = cls._checkout(pool, timeout)
+        try:
+            yield conn
+        finally:
+            cls._checkin(pool, conn)
+
+    @classmethod
+    def get_pool_metrics(cls, pool):
+        """
+        Returns the pool's checkout metrics (checkouts, timeouts, mean/p95/max wait in ms) with its current size,
+        in-use and idle connection counts and, where the driver tracks them, the connections created and destroyed.
+        """
+        metrics = cls._metrics_of(pool).snapshot()
+        metrics.update(cls._pool_gauges(pool))
+        return metrics
+
+    @classmethod
+    def reset_pool_metrics(cls):
+        cls._pool_metrics.clear()
+        cls._strong_pool_metrics.clear()
+
+    @classmethod
+    def run_mysql_query(cls, query: str, pool: ConnectionPool, apply_commit: bool = False, params=None,
+                        result_format: str = None):
         """
         Executes a query on MySQL using connection pool.
 
@@ -104,32 +486,40 @@ class DatabaseHelper:
             query: SQL query to execute
             pool: MySQL connection pool object
             apply_commit: If set, commits the transaction
+            params: Optional bind parameters for the query's placeholders
+            result_format: None for a list of tuples, 'dataframe' for a pandas DataFrame or 'numpy' for a NumPy
+                structured array, built from the cursor in batches with the query's column names
 
         Returns:
             Query result or row count based on `apply_commit` flag
+
+        Raises:
+            ValueError: If `result_format` is not supported
         """
+        ResultFrames.check_format(result_format)
         conn = None
         cur = None
         try:
-            conn = pool.get_connection()
+            conn = cls._checkout(pool)
             cur = conn.cursor()
-            cur.execute(query)
+            cur.execute(query, params)
 
             if apply_commit:
                 conn.commit()
                 return cur.rowcount
             else:
-                return cur.fetchall()
+                return ResultFrames.fetch(cur, result_format)
         except Error as e:
             print("MySQL Pool Error: ", e)
         finally:
             if cur:
                 cur.close()
             if conn:
-                conn.close()
+                cls._checkin(pool, conn)
 
     @classmethod
-    def run_oracle_query(cls, query: str, pool: SessionPool, apply_commit: bool = False):
+    def run_oracle_query(cls, query: str, pool: SessionPool, apply_commit: bool = False, params=None,
+                         result_format: str = None):
         """
         Executes a query on Oracle using connection pool.
 
@@ -137,36 +527,45 @@ class DatabaseHelper:
             query: SQL query to execute
             pool: Oracle connection pool object
             apply_commit: If set, commits the transaction
+            params: Optional bind parameters for the query's placeholders
+            result_format: None for a list of tuples, 'dataframe' for a pandas DataFrame or 'numpy' for a NumPy
+                structured array, built from the cursor in batches with the query's column names
 
         Returns:
             Query result or row count based on `apply_commit` flag
+
+        Raises:
+            ValueError: If `result_format` is not supported
         """
+        ResultFrames.check_format(result_format)
         conn = None
         cur = None
         try:
-            conn = pool.acquire()
+            conn = cls._checkout(pool)
             cur = conn.cursor()
 
             conn.outputtypehandler = cls.__oracle_data_handler
 
-            cur.execute(query)
+            cur.execute(query, params)
             if apply_commit:
                 conn.commit()
                 return cur.rowcount
             else:
-                return cur.fetchall()
+                return ResultFrames.fetch(cur, result_format)
         except cx_Oracle.Error as e:
             print("Oracle Pool Error: ", e)
         finally:
             if cur:
                 cur.close()
             if conn:
-                pool.release(conn)
+                cls._checkin(pool, conn)
 
     @classmethod
-    def run_sql_server_query(cls, query: str, username: str, pwd: str, srv_name: str, db_name: str, apply_commit: bool = False):
+    def run_sql_server_query(cls, query: str, username: str = None, pwd: str = None, srv_name: str = None,
+                             db_name: str = None, apply_commit: bool = False, params=None,
+                             pool: SqlServerConnectionPool = None, result_format: str = None):
         """
-        Executes a query on SQL Server.
+        Executes a query on SQL Server, on a pooled connection when `pool` is given or else on a new connection.
 
         Args:
             query: SQL query to execute
@@ -175,32 +574,45 @@ class DatabaseHelper:
             srv_name: Server name
             db_name: Database name
             apply_commit: If set, commits the transaction
+            params: Optional bind parameters for the query's placeholders
+            pool: SQL Server connection pool object, replacing the connection arguments
+            result_format: None for a list of tuples, 'dataframe' for a pandas DataFrame or 'numpy' for a NumPy
+                structured array, built from the cursor in batches with the query's column names
 
         Returns:
             Query result or row count based on `apply_commit` flag
+
+        Raises:
+            ValueError: If `result_format` is not supported
         """
+        ResultFrames.check_format(result_format)
         conn = None
         cur = None
         try:
-            conn = pyodbc.connect(f'DRIVER={{SQL Server}};SERVER={srv_name};DATABASE={db_name};UID={username};PWD={pwd}')
+            conn = cls._sql_server_connect(username, pwd, srv_name, db_name, pool)
             cur = conn.cursor()
-            cur.execute(query)
+            # pyodbc would bind a None argument as a parameter, so it is only passed when given
+            if params:
+                cur.execute(query, params)
+            else:
+                cur.execute(query)
 
             if apply_commit:
                 conn.commit()
                 return cur.rowcount
             else:
-                return cur.fetchall()
+                return ResultFrames.fetch(cur, result_format)
         except pyodbc.Error as e:
             print("SQL Server Error: ", e)
         finally:
             if cur:
                 cur.close()
             if conn:
-                conn.close()
+                cls._sql_server_release(conn, pool)
 
     @classmethod
-    def run_postgres_query(cls, query: str, pool: PstgConnectionPool, apply_commit: bool = False):
+    def run_postgres_query(cls, query: str, pool: PstgConnectionPool, apply_commit: bool = False, params=None,
+                           result_format: str = None):
         """
         Executes a query on PostgreSQL using connection pool.
 
@@ -208,29 +620,602 @@ class DatabaseHelper:
             query: SQL query to execute
             pool: PostgreSQL connection pool object
             apply_commit: If set, commits the transaction
+            params: Optional bind parameters for the query's placeholders
+            result_format: None for a list of tuples, 'dataframe' for a pandas DataFrame or 'numpy' for a NumPy
+                structured array, built from the cursor in batches with the query's column names
 
         Returns:
             Query result or row count based on `apply_commit` flag
+
+        Raises:
+            ValueError: If `result_format` is not supported
         """
+        ResultFrames.check_format(result_format)
         conn = None
         cur = None
         try:
-            conn = pool.getconn()
+            conn = cls._checkout(pool)
             cur = conn.cursor()
-            cur.execute(query)
+            cur.execute(query, params)
 
             if apply_commit:
                 conn.commit()
                 return cur.rowcount
             else:
-                return cur.fetchall()
+                return ResultFrames.fetch(cur, result_format)
         except Exception as e:
             print(f'PostgreSQL Pool Error: {e}')
         finally:
             if cur:
                 cur.close()
             if conn:
-                conn.close()
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def stream_mysql_query(cls, query: str, pool: ConnectionPool, batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+                           as_batches: bool = False, params=None):
+        """
+        Executes a query on MySQL with an unbuffered server-side cursor (SSCursor) and yields its rows as they arrive.
+
+        The pooled connection stays leased until the generator is exhausted or closed, and memory holds at most one
+        batch whatever the size of the result. Closing the generator early still reads the rest of the result, as
+        MySQL requires before the connection can be reused.
+
+        Args:
+            query: SQL query to execute
+            pool: MySQL connection pool object
+            batch_size: Number of rows fetched per round trip
+            as_batches: If set, yields lists of up to `batch_size` rows instead of single rows
+            params: Optional bind parameters for the query's placeholders
+
+        Yields:
+            Result rows, or batches of rows
+
+        Raises:
+            pymysql.Error: Printed and re-raised, as rows may already have been consumed
+        """
+        conn = cls._checkout(pool)
+        try:
+            cur = conn.cursor(SSCursor)
+            try:
+                cur.execute(query, params)
+                yield from cls._fetch_batches(cur, batch_size, as_batches)
+            finally:
+                cur.close()
+        except Error as e:
+            print("MySQL Pool Error: ", e)
+            raise
+        finally:
+            cls._checkin(pool, conn)
+
+    @classmethod
+    def stream_oracle_query(cls, query: str, pool: SessionPool, batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+                            prefetch_rows: int = None, as_batches: bool = False, params=None):
+        """
+        Executes a query on Oracle and yields its rows `batch_size` at a time.
+
+        The pooled session stays acquired until the generator is exhausted or closed, and memory holds at most one
+        batch whatever the size of the result.
+
+        Args:
+            query: SQL query to execute
+            pool: Oracle connection pool object
+            batch_size: Cursor `arraysize`, the number of rows fetched per round trip
+            prefetch_rows: Cursor `prefetchrows`, rows returned with the execute round trip (default: `batch_size`)
+            as_batches: If set, yields lists of up to `batch_size` rows instead of single rows
+            params: Optional bind parameters for the query's placeholders
+
+        Yields:
+            Result rows, or batches of rows
+
+        Raises:
+            cx_Oracle.Error: Printed and re-raised, as rows may already have been consumed
+        """
+        conn = cls._checkout(pool)
+        try:
+            conn.outputtypehandler = cls.__oracle_data_handler
+            cur = conn.cursor()
+            try:
+                cur.arraysize = batch_size
+                cur.prefetchrows = batch_size if prefetch_rows is None else prefetch_rows
+                cur.execute(query, params)
+                yield from cls._fetch_batches(cur, batch_size, as_batches)
+            finally:
+                cur.close()
+        except cx_Oracle.Error as e:
+            print("Oracle Pool Error: ", e)
+            raise
+        finally:
+            cls._checkin(pool, conn)
+
+    @classmethod
+    def stream_sql_server_query(cls, query: str, username: str = None, pwd: str = None, srv_name: str = None,
+                                db_name: str = None, batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+                                as_batches: bool = False, params=None, pool: SqlServerConnectionPool = None):
+        """
+        Executes a query on SQL Server and yields its rows `batch_size` at a time.
+
+        The connection stays open (or leased, with `pool`) until the generator is exhausted or closed, and memory
+        holds at most one batch whatever the size of the result.
+
+        Args:
+            query: SQL query to execute
+            username: SQL Server username
+            pwd: SQL Server password
+            srv_name: Server name
+            db_name: Database name
+            batch_size: Number of rows fetched per call
+            as_batches: If set, yields lists of up to `batch_size` rows instead of single rows
+            params: Optional bind parameters for the query's placeholders
+            pool: SQL Server connection pool object, replacing the connection arguments
+
+        Yields:
+            Result rows, or batches of rows
+
+        Raises:
+            pyodbc.Error: Printed and re-raised, as rows may already have been consumed
+        """
+        conn = cls._sql_server_connect(username, pwd, srv_name, db_name, pool)
+        try:
+            cur = conn.cursor()
+            try:
+                cur.arraysize = batch_size
+                # pyodbc would bind a None argument as a parameter, so it is only passed when given
+                if params:
+                    cur.execute(query, params)
+                else:
+                    cur.execute(query)
+                yield from cls._fetch_batches(cur, batch_size, as_batches)
+            finally:
+                cur.close()
+        except pyodbc.Error as e:
+            print("SQL Server Error: ", e)
+            raise
+        finally:
+            cls._sql_server_release(conn, pool)
+
+    @classmethod
+    def stream_postgres_query(cls, query: str, pool: PstgConnectionPool, batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+                              as_batches: bool = False, params=None):
+        """
+        Executes a query on PostgreSQL with a named (server-side) cursor and yields its rows `batch_size` at a time.
+
+        The pooled connection stays leased until the generator is exhausted or closed, and memory holds at most one
+        batch whatever the size of the result.
+
+        Args:
+            query: SQL query to execute
+            pool: PostgreSQL connection pool object
+            batch_size: Number of rows fetched per round trip
+            as_batches: If set, yields lists of up to `batch_size` rows instead of single rows
+            params: Optional bind parameters for the query's placeholders
+
+        Yields:
+            Result rows, or batches of rows
+
+        Raises:
+            Exception: Printed and re-raised, as rows may already have been consumed
+        """
+        conn = cls._checkout(pool)
+        try:
+            # Outside a transaction (autocommit) a server-side cursor has to be declared WITH HOLD to exist at all
+            with conn.cursor(name=f'auto_utilities_{uuid.uuid4().hex}', withhold=conn.autocommit) as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                yield from cls._fetch_batches(cur, batch_size, as_batches)
+        except Exception as e:
+            print(f'PostgreSQL Pool Error: {e}')
+            raise
+        finally:
+            cls._checkin(pool, conn)
+
+    @classmethod
+    def run_mysql_bulk(cls, query: str, rows, pool: ConnectionPool, batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+                       commit_every: int = 1):
+        """
+        Executes a parameterized statement on MySQL once per row, `batch_size` rows per executemany call.
+
+        An `INSERT ... VALUES (%s, ...)` statement is sent as one multi-row INSERT per batch.
+
+        Args:
+            query: Parameterized SQL statement
+            rows: Iterable of parameter sequences, consumed one batch at a time
+            pool: MySQL connection pool object
+            batch_size: Number of rows sent per round trip
+            commit_every: Number of batches per transaction; the remainder is committed at the end
+
+        Returns:
+            BulkLoadResult with rows, batches, seconds and rows_per_second, or None on error
+        """
+        conn = None
+        cur = None
+        try:
+            conn = cls._checkout(pool)
+            cur = conn.cursor()
+            # The pool's connections autocommit, so every group of batches opens its own transaction
+            return cls._execute_batches(conn, rows, batch_size, commit_every,
+                                        lambda batch: cur.executemany(query, batch), begin=conn.begin)
+        except Error as e:
+            print("MySQL Pool Error: ", e)
+            if conn:
+                conn.rollback()
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def run_oracle_bulk(cls, query: str, rows, pool: SessionPool, batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+                        commit_every: int = 1, batch_errors: bool = True):
+        """
+        Executes a parameterized statement on Oracle with array binding, `batch_size` rows per round trip.
+
+        Args:
+            query: Parameterized SQL statement
+            rows: Iterable of parameter sequences or dictionaries, consumed one batch at a time
+            pool: Oracle connection pool object
+            batch_size: Number of rows bound per round trip
+            commit_every: Number of batches per transaction; the remainder is committed at the end
+            batch_errors: If set, rows rejected by the database are reported in `errors` instead of aborting the load
+
+        Returns:
+            BulkLoadResult with rows, batches, seconds, rows_per_second and rejected rows, or None on error
+        """
+        conn = None
+        cur = None
+        try:
+            conn = cls._checkout(pool)
+            cur = conn.cursor()
+
+            def execute(batch):
+                cur.executemany(query, batch, batcherrors=batch_errors)
+                return [(error.offset, error.message) for error in cur.getbatcherrors()] if batch_errors else []
+
+            return cls._execute_batches(conn, rows, batch_size, commit_every, execute)
+        except cx_Oracle.Error as e:
+            print("Oracle Pool Error: ", e)
+            if conn:
+                conn.rollback()
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def run_sql_server_bulk(cls, query: str, rows, username: str = None, pwd: str = None, srv_name: str = None,
+                            db_name: str = None, batch_size: int = DEFAULT_BULK_BATCH_SIZE, commit_every: int = 1,
+                            pool: SqlServerConnectionPool = None):
+        """
+        Executes a parameterized statement on SQL Server with `fast_executemany`, `batch_size` rows per round trip.
+
+        Args:
+            query: Parameterized SQL statement
+            rows: Iterable of parameter sequences, consumed one batch at a time
+            username: SQL Server username
+            pwd: SQL Server password
+            srv_name: Server name
+            db_name: Database name
+            batch_size: Number of rows sent per round trip
+            commit_every: Number of batches per transaction; the remainder is committed at the end
+            pool: SQL Server connection pool object, replacing the connection arguments
+
+        Returns:
+            BulkLoadResult with rows, batches, seconds and rows_per_second, or None on error
+        """
+        conn = None
+        cur = None
+        try:
+            conn = cls._sql_server_connect(username, pwd, srv_name, db_name, pool)
+            cur = conn.cursor()
+            cur.fast_executemany = True
+            return cls._execute_batches(conn, rows, batch_size, commit_every,
+                                        lambda batch: cur.executemany(query, batch))
+        except pyodbc.Error as e:
+            print("SQL Server Error: ", e)
+            if conn:
+                conn.rollback()
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                cls._sql_server_release(conn, pool)
+
+    @classmethod
+    def run_postgres_bulk(cls, query: str, rows, pool: PstgConnectionPool, batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+                          commit_every: int = 1):
+        """
+        Executes a parameterized statement on PostgreSQL once per row, `batch_size` rows per executemany call (sent
+        as one pipeline).
+
+        Args:
+            query: Parameterized SQL statement
+            rows: Iterable of parameter sequences, consumed one batch at a time
+            pool: PostgreSQL connection pool object
+            batch_size: Number of rows sent per round trip
+            commit_every: Number of batches per transaction; the remainder is committed at the end
+
+        Returns:
+            BulkLoadResult with rows, batches, seconds and rows_per_second, or None on error
+        """
+        conn = None
+        try:
+            conn = cls._checkout(pool)
+            with conn.cursor() as cur:
+                return cls._execute_batches(conn, rows, batch_size, commit_every,
+                                            lambda batch: cur.executemany(query, batch))
+        except Exception as e:
+            print(f'PostgreSQL Pool Error: {e}')
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def copy_postgres_rows(cls, table: str, columns: list, rows, pool: PstgConnectionPool,
+                           batch_size: int = DEFAULT_BULK_BATCH_SIZE, commit_every: int = 1):
+        """
+        Loads rows into a PostgreSQL table with COPY FROM STDIN, one COPY per batch.
+
+        Args:
+            table: Table name, optionally schema qualified
+            columns: Column names matching the values of each row
+            rows: Iterable of value sequences, consumed one batch at a time
+            pool: PostgreSQL connection pool object
+            batch_size: Number of rows per COPY
+            commit_every: Number of batches per transaction; the remainder is committed at the end
+
+        Returns:
+            BulkLoadResult with rows, batches, seconds and rows_per_second, or None on error
+
+        Example:
+            >>> DatabaseHelper.copy_postgres_rows('qa.orders', ['id', 'status'], ((n, 'new') for n in range(10 ** 6)),
+            ...                                   DatabaseHelper.postgres_pool, batch_size=50000)
+        """
+        statement = sql.SQL('COPY {} ({}) FROM STDIN').format(
+            sql.Identifier(*table.split('.')), sql.SQL(', ').join(map(sql.Identifier, columns)))
+        conn = None
+        try:
+            conn = cls._checkout(pool)
+            with conn.cursor() as cur:
+                def execute(batch):
+                    with cur.copy(statement) as copy:
+                        for row in batch:
+                            copy.write_row(row)
+
+                return cls._execute_batches(conn, rows, batch_size, commit_every, execute)
+        except Exception as e:
+            print(f'PostgreSQL Pool Error: {e}')
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def copy_postgres_csv(cls, table: str, source, pool: PstgConnectionPool, columns: list = None, header: bool = True,
+                          chunk_size: int = DEFAULT_COPY_CHUNK_SIZE):
+        """
+        Streams a CSV file into a PostgreSQL table with a single COPY FROM STDIN and commits it.
+
+        Args:
+            table: Table name, optionally schema qualified
+            source: CSV file path, or file object opened in binary or text mode
+            pool: PostgreSQL connection pool object
+            columns: Column names in the order of the CSV fields (default: all columns of the table)
+            header: If set, the first line is a header and is skipped
+            chunk_size: Number of bytes read from the file per write
+
+        Returns:
+            BulkLoadResult with rows, seconds and rows_per_second, or None on error
+        """
+        statement = sql.SQL('COPY {} {} FROM STDIN WITH (FORMAT csv, HEADER {})').format(
+            sql.Identifier(*table.split('.')),
+            sql.SQL('({})').format(sql.SQL(', ').join(map(sql.Identifier, columns))) if columns else sql.SQL(''),
+            sql.SQL('true' if header else 'false'))
+        conn = None
+        csv_file = None
+        try:
+            csv_file = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+            conn = cls._checkout(pool)
+            started = time.perf_counter()
+            with conn.cursor() as cur:
+                with cur.copy(statement) as copy:
+                    chunk = csv_file.read(chunk_size)
+                    while chunk:
+                        copy.write(chunk)
+                        chunk = csv_file.read(chunk_size)
+                conn.commit()
+                return BulkLoadResult(cur.rowcount, 1, time.perf_counter() - started, [])
+        except Exception as e:
+            print(f'PostgreSQL Pool Error: {e}')
+            if conn:
+                conn.rollback()
+        finally:
+            if csv_file is not None and csv_file is not source:
+                csv_file.close()
+            if conn:
+                cls._checkin(pool, conn)
+
+    @classmethod
+    def _checkout(cls, pool, timeout: float = None):
+        """
+        Takes a connection from the pool, translating each driver's timeout into PoolTimeout.
+        """
+        metrics = cls._metrics_of(pool)
+        started = time.perf_counter()
+        try:
+            if isinstance(pool, (SqlServerConnectionPool, PstgConnectionPool)):
+                conn = pool.getconn(timeout)
+            elif isinstance(pool, SessionPool):
+                conn = cls._acquire_oracle(pool, metrics.checkout_lock, timeout)
+            elif isinstance(pool, ConnectionPool):
+                timeout = getattr(pool, 'checkout_timeout', DEFAULT_POOL_TIMEOUT) if timeout is None else timeout
+                conn = cls._acquire_mysql(pool, metrics.checkout_lock, timeout)
+            else:
+                raise TypeError(f"Unsupported connection pool: {type(pool).__name__}")
+        except (PoolTimeout, PstgPoolTimeout, GetConnectionFromPoolError, cx_Oracle.DatabaseError) as e:
+            if isinstance(e, cx_Oracle.DatabaseError) and \
+                    getattr(e.args[0], 'code', None) != ORACLE_POOL_TIMEOUT_CODE:
+                raise
+            metrics.record(time.perf_counter() - started, timed_out=True)
+            if isinstance(e, PoolTimeout):
+                raise
+            raise PoolTimeout(f"No connection available from {type(pool).__name__}: {e}") from e
+        metrics.record(time.perf_counter() - started)
+        return conn
+
+    @staticmethod
+    def _acquire_mysql(pool: ConnectionPool, checkout_lock: threading.Lock, timeout: float):
+        """
+        Takes an idle MySQL connection or, below the pool's maxsize, opens one at once; otherwise polls until one is
+        returned. pymysqlpool's own retries sleep through every retry before growing past `size`, so they are not used.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # The lock makes the size check and the open one step, so concurrent checkouts cannot exceed maxsize
+            with checkout_lock:
+                try:
+                    return pool.get_connection(retry_num=0)
+                except GetConnectionFromPoolError:
+                    pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(f"No MySQL connection available after {timeout} seconds")
+            time.sleep(min(MYSQL_CHECKOUT_POLL_INTERVAL, remaining))
+
+    @staticmethod
+    def _acquire_oracle(pool: SessionPool, checkout_lock: threading.Lock, timeout: float = None):
+        """
+        Acquires an Oracle session. A `timeout` is applied by setting the pool's wait_timeout to the time left for
+        the duration of the acquire; holding the checkout lock keeps other callers from seeing the changed value.
+        """
+        if timeout is None:
+            with checkout_lock:
+                return pool.acquire()
+
+        deadline = time.monotonic() + timeout
+        if not checkout_lock.acquire(timeout=timeout):
+            raise PoolTimeout(f"No Oracle session available after {timeout} seconds")
+        try:
+            wait_timeout = pool.wait_timeout
+            pool.wait_timeout = max(int((deadline - time.monotonic()) * 1000), 1)
+            try:
+                return pool.acquire()
+            finally:
+                pool.wait_timeout = wait_timeout
+        finally:
+            checkout_lock.release()
+
+    @classmethod
+    def _checkin(cls, pool, conn):
+        """
+        Returns a connection to its pool.
+        """
+        if isinstance(pool, SqlServerConnectionPool):
+            pool.putconn(conn)
+        elif isinstance(pool, PstgConnectionPool):
+            # The pool would roll back an open transaction too, but logs a warning for each one
+            if not conn.autocommit and not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    # A broken connection is detected and discarded by putconn
+                    pass
+            pool.putconn(conn)
+        elif isinstance(pool, SessionPool):
+            pool.release(conn)
+        else:
+            # pymysqlpool connections go back to their pool when closed, without rolling back an open transaction
+            if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                try:
+                    conn.rollback()
+                except Error:
+                    pass
+            conn.close()
+
+    @classmethod
+    def _metrics_of(cls, pool):
+        try:
+            return cls._pool_metrics.setdefault(pool, PoolMetrics())
+        except TypeError:
+            # cx_Oracle pools do not support weak references
+            return cls._strong_pool_metrics.setdefault(pool, PoolMetrics())
+
+    @staticmethod
+    def _pool_gauges(pool):
+        created = destroyed = None
+        if isinstance(pool, SqlServerConnectionPool):
+            size, idle, created, destroyed = pool.size, pool.idle, pool.created, pool.destroyed
+        elif isinstance(pool, PstgConnectionPool):
+            stats = pool.get_stats()
+            size, idle = stats.get('pool_size', 0), stats.get('pool_available', 0)
+            created = stats.get('connections_num', 0) - stats.get('connections_errors', 0)
+            destroyed = created - size
+        elif isinstance(pool, SessionPool):
+            size, idle = pool.opened, pool.opened - pool.busy
+        else:
+            size, idle = pool.total_num, pool.available_num
+        return {'size': size, 'in_use': size - idle, 'idle': idle, 'created': created, 'destroyed': destroyed}
+
+    @staticmethod
+    def _sql_server_connection_string(username: str, pwd: str, srv_name: str, db_name: str):
+        return f'DRIVER={{SQL Server}};SERVER={srv_name};DATABASE={db_name};UID={username};PWD={pwd}'
+
+    @classmethod
+    def _sql_server_connect(cls, username: str, pwd: str, srv_name: str, db_name: str,
+                            pool: SqlServerConnectionPool = None):
+        if pool:
+            return cls._checkout(pool)
+        return pyodbc.connect(cls._sql_server_connection_string(username, pwd, srv_name, db_name))
+
+    @classmethod
+    def _sql_server_release(cls, conn, pool: SqlServerConnectionPool = None):
+        if pool:
+            cls._checkin(pool, conn)
+        else:
+            conn.close()
+
+    @classmethod
+    def _execute_batches(cls, conn, rows, batch_size: int, commit_every: int, execute, begin=None):
+        """
+        Sends `rows` in batches through `execute`, committing every `commit_every` batches and once at the end.
+        `execute` may return the (offset in batch, message) of rejected rows.
+        """
+        started = time.perf_counter()
+        total = 0
+        batches = 0
+        errors = []
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            if begin and (batches == 0 or commit_every and batches % commit_every == 0):
+                begin()
+            errors.extend((total + offset, message) for offset, message in execute(batch) or [])
+            total += len(batch)
+            batches += 1
+            if commit_every and batches % commit_every == 0:
+                conn.commit()
+        conn.commit()
+        return BulkLoadResult(total, batches, time.perf_counter() - started, errors)
+
+    @staticmethod
+    def _fetch_batches(cur, batch_size: int, as_batches: bool):
+        """
+        Yields the rows of an executed cursor, fetched `batch_size` at a time.
+        """
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            if as_batches:
+                yield rows
+            else:
+                yield from rows
 
     @classmethod
     def __oracle_data_handler(cls, cur, name, default_type, size, precision, scale):
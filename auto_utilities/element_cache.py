@@ -0,0 +1,95 @@
+import threading
+import weakref
+from collections import Counter
+
+DEFAULT_CONTEXT = (None, ())
+
+
+class ElementCache:
+    """
+    Opt-in, per-driver cache of resolved WebElements keyed by (locator, index, window/frame context).
+
+    Entries are dropped when the page changes (navigation, refresh, history moves, frame or window switches) and when a
+    cached element turns out to be stale. Hit, miss, stale and invalidation counters are kept in `stats`.
+
+    Example:
+        >>> ElementCache.enable()
+        >>> ElementCache.get_stats()
+        {'hits': 12, 'misses': 3, 'stale': 1, 'invalidations': 2}
+    """
+
+    enabled = False
+    stats = Counter()
+    _entries = weakref.WeakKeyDictionary()
+    _contexts = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls):
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls):
+        """
+        Turns the cache off and drops every cached element.
+        """
+        cls.enabled = False
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def get(cls, driver, locator, index: int):
+        """
+        Returns the cached element for the locator and index in the driver's current context, or None.
+        """
+        with cls._lock:
+            element = cls._entries.get(driver, {}).get((locator, index, cls._contexts.get(driver, DEFAULT_CONTEXT)))
+            cls.stats['hits' if element is not None else 'misses'] += 1
+        return element
+
+    @classmethod
+    def put(cls, driver, locator, index: int, element):
+        with cls._lock:
+            key = (locator, index, cls._contexts.get(driver, DEFAULT_CONTEXT))
+            cls._entries.setdefault(driver, {})[key] = element
+
+    @classmethod
+    def discard(cls, driver, locator, index: int):
+        """
+        Drops a single entry after its element was found to be stale.
+        """
+        with cls._lock:
+            key = (locator, index, cls._contexts.get(driver, DEFAULT_CONTEXT))
+            if cls._entries.get(driver, {}).pop(key, None) is not None:
+                cls.stats['stale'] += 1
+
+    @classmethod
+    def invalidate(cls, driver, window: str = None, frame=None, reset_frames: bool = False):
+        """
+        Drops every cached element of the driver and records its new window/frame context.
+
+        Args:
+            driver: WebDriver whose page changed.
+            window: Handle of the window switched to, if any. Switching windows also resets the frame path.
+            frame: Locator of the frame switched into, if any.
+            reset_frames: Set when switching back to the top-level document.
+        """
+        with cls._lock:
+            if cls._entries.pop(driver, None):
+                cls.stats['invalidations'] += 1
+            current_window, frames = cls._contexts.get(driver, DEFAULT_CONTEXT)
+            if window is not None:
+                current_window, frames = window, ()
+            if reset_frames:
+                frames = ()
+            if frame is not None:
+                frames = frames + (frame,)
+            cls._contexts[driver] = (current_window, frames)
+
+    @classmethod
+    def get_stats(cls):
+        return dict(cls.stats)
+
+    @classmethod
+    def reset_stats(cls):
+        cls.stats.clear()
@@ -0,0 +1,250 @@
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from auto_utilities.api_utilities import ApiClient
+
+DEFAULT_SIGNIFICANT_DIGITS = 3
+DEFAULT_DURATION = 10
+REPORTED_PERCENTILES = (50, 95, 99, 99.9)
+ARRIVAL_PATTERNS = {'constant', 'poisson'}
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram: microsecond values are counted in log-linear buckets whose width keeps the relative
+    error below 10^-significant_digits, so memory stays constant however many values are recorded.
+
+    Example:
+        >>> histogram = LatencyHistogram()
+        >>> histogram.record(0.0123)
+        >>> histogram.percentile(99)
+        0.0123
+    """
+
+    def __init__(self, significant_digits: int = DEFAULT_SIGNIFICANT_DIGITS):
+        self.sub_bucket_count = 2 ** math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float):
+        value = max(int(round(seconds * 1_000_000)), 0)
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent: float):
+        """
+        Returns the value in seconds that `percent` of the recorded values are less than or equal to.
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(percent / 100 * self.count), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._highest_value(bucket), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self):
+        """
+        Returns min, mean, max and the reported percentiles in milliseconds.
+        """
+        if not self.count:
+            return {}
+        summary = {'min': self.min / 1000, 'mean': self.total / self.count / 1000}
+        summary.update({f'p{percent:g}': self.percentile(percent) * 1000 for percent in REPORTED_PERCENTILES})
+        summary['max'] = self.max / 1000
+        return summary
+
+    def _bucket(self, value: int):
+        # Values below sub_bucket_count are exact; above it only the top bits are kept, indexed by how many were dropped
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_count.bit_length() + 1
+        return shift * self.sub_bucket_count + (value >> shift)
+
+    def _highest_value(self, bucket: int):
+        shift, sub_bucket = divmod(bucket, self.sub_bucket_count)
+        return ((sub_bucket + 1) << shift) - 1
+
+
+class LoadRunner:
+    """
+    Replays a scenario of ApiClient requests as a load test, for a duration, either at a target arrival rate (open
+    model) or with a fixed number of concurrent virtual users (closed model).
+
+    At a target rate, requests are scheduled at their arrival times whether or not earlier ones have completed, and
+    latency is measured from the scheduled time rather than from when a worker picked the request up. A slow server
+    therefore shows up as higher latency instead of silently lowering the request rate (coordinated omission).
+
+    Args:
+        scenario: Request dictionaries as taken by ApiClient.send_batch, optionally with 'name' (the endpoint name in
+            the report, default: method and URL path) and 'weight' (relative frequency, default: 1). A step may give
+            a 'call' callable instead of method and URL; a returned response is checked for its status.
+        rate: Target requests per second (open model).
+        concurrency: Number of virtual users sending requests back to back (closed model), used when `rate` is None.
+        duration: Seconds to generate load for.
+        max_workers: Maximum number of requests in flight at a target rate (default: enough for 10 seconds latency).
+        arrival: 'constant' for evenly spaced arrivals or 'poisson' for exponentially distributed gaps.
+        seed: Seed of the poisson arrivals.
+        significant_digits: Precision of the latency histograms.
+
+    Example:
+        >>> runner = LoadRunner([{'method': 'GET', 'url': f'{base_url}/orders', 'weight': 9},
+        ...                      {'method': 'POST', 'url': f'{base_url}/orders', 'payload': order}],
+        ...                     rate=200, duration=60)
+        >>> report = runner.run()
+        >>> report['endpoints']['GET /orders']['latency_ms']['p99']
+        41.2
+        >>> runner.write_report('load_report.json')
+    """
+
+    def __init__(self, scenario: list, rate: float = None, concurrency: int = None, duration: float = DEFAULT_DURATION,
+                 max_workers: int = None, arrival: str = 'constant', seed: int = None,
+                 significant_digits: int = DEFAULT_SIGNIFICANT_DIGITS):
+        if not scenario:
+            raise ValueError("The scenario has no steps")
+        if (rate is None) == (concurrency is None):
+            raise ValueError("Either a target rate or a concurrency is required, not both")
+        if arrival not in ARRIVAL_PATTERNS:
+            raise ValueError(f"Unsupported arrival pattern: {arrival}. Valid options: {ARRIVAL_PATTERNS}")
+
+        self.scenario = scenario
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_workers = max_workers or (concurrency if rate is None else max(int(rate * 10), 1))
+        self.arrival = arrival
+        self.significant_digits = significant_digits
+        self.report = None
+        self._random = random.Random(seed)
+        self._steps = itertools.cycle([step for step in scenario for _ in range(step.get('weight', 1))])
+        self._steps_lock = threading.Lock()
+        self._histograms = defaultdict(lambda: LatencyHistogram(significant_digits))
+        self._requests = Counter()
+        self._errors = defaultdict(Counter)
+        self._results_lock = threading.Lock()
+        self._max_start_delay = 0.0
+
+    def run(self):
+        """
+        Generates the load and returns the report (see `build_report`).
+        """
+        started = time.perf_counter()
+        if self.rate is not None:
+            self._run_open(started)
+        else:
+            self._run_closed(started)
+        self.report = self.build_report(time.perf_counter() - started)
+        return self.report
+
+    def build_report(self, elapsed: float):
+        """
+        Aggregates the results: request and error counts, error rate, throughput and latency percentiles (ms), per
+        endpoint and in total.
+        """
+        with self._results_lock:
+            endpoints = {name: self._endpoint_report(self._histograms[name], self._requests[name], self._errors[name],
+                                                     elapsed)
+                         for name in sorted(self._requests)}
+            total = LatencyHistogram(self.significant_digits)
+            errors = Counter()
+            for name in self._requests:
+                total.merge(self._histograms[name])
+                errors.update(self._errors[name])
+            report = {'model': 'open' if self.rate is not None else 'closed', 'target_rps': self.rate,
+                      'concurrency': self.concurrency, 'arrival': self.arrival, 'duration': self.duration,
+                      'elapsed': elapsed, 'max_start_delay_ms': self._max_start_delay * 1000,
+                      'total': self._endpoint_report(total, sum(self._requests.values()), errors, elapsed),
+                      'endpoints': endpoints}
+        return report
+
+    def write_report(self, json_path: str):
+        with open(json_path, 'w') as report_file:
+            json.dump(self.report, report_file, indent=2)
+
+    def _run_open(self, started: float):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='load') as executor:
+            offset = 0.0
+            while offset < self.duration:
+                scheduled = started + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._send, self._next_step(), scheduled)
+                offset += self._random.expovariate(self.rate) if self.arrival == 'poisson' else 1 / self.rate
+
+    def _run_closed(self, started: float):
+        deadline = started + self.duration
+
+        def virtual_user():
+            while time.perf_counter() < deadline:
+                self._send(self._next_step(), time.perf_counter())
+
+        users = [threading.Thread(target=virtual_user, name=f'load_user_{number}', daemon=True)
+                 for number in range(self.concurrency)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+
+    def _next_step(self):
+        with self._steps_lock:
+            return next(self._steps)
+
+    def _send(self, step: dict, scheduled: float):
+        start_delay = time.perf_counter() - scheduled
+        error = None
+        try:
+            response = step['call']() if 'call' in step else ApiClient._send_spec(step)
+            status_code = getattr(response, 'status_code', None)
+            if status_code is not None and status_code >= 400:
+                error = str(status_code)
+        except Exception as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled
+
+        name = self._endpoint_name(step)
+        with self._results_lock:
+            self._histograms[name].record(latency)
+            self._requests[name] += 1
+            if error:
+                self._errors[name][error] += 1
+            self._max_start_delay = max(self._max_start_delay, start_delay)
+
+    @staticmethod
+    def _endpoint_name(step: dict):
+        if 'name' in step:
+            return step['name']
+        if 'call' in step:
+            return getattr(step['call'], '__name__', 'call')
+        return f"{step.get('method', 'GET').upper()} {urlsplit(step['url']).path or '/'}"
+
+    @staticmethod
+    def _endpoint_report(histogram: LatencyHistogram, requests: int, errors: Counter, elapsed: float):
+        error_count = sum(errors.values())
+        return {'requests': requests, 'errors': error_count, 'error_rate': error_count / requests if requests else 0.0,
+                'errors_by_type': dict(errors), 'throughput_rps': requests / elapsed if elapsed else 0.0,
+                'latency_ms': histogram.summary()}
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import Union
+
+from selenium.webdriver.common.by import By
+
+XPATH_PREFIXES = ('/', '(/')
+INTERNED_LOCATORS = 4096
+
+
+class Locator:
+    """
+    Immutable page-object locator with its `By` strategy resolved once at declaration time.
+
+    The most recently used INTERNED_LOCATORS locators are interned: declaring the same value, index and timeout twice
+    returns the same instance. Locators built on the fly (e.g. by select_option_matching_text) age out of the table, so
+    compare them by equality, which like hashing uses the value, index and timeout.
+
+    Example:
+        >>> submit_button = Locator('button[value="1"]')
+        >>> second_row = Locator('//table//tr', index=1, timeout=30)
+    """
+
+    __slots__ = ('value', 'by', 'index', 'timeout')
+
+    _interned = OrderedDict()
+    _interned_lock = threading.Lock()
+
+    def __new__(cls, value, index: int = 0, timeout: int = None):
+        if isinstance(value, Locator):
+            value = value.value
+        key = (value, index, timeout)
+        with cls._interned_lock:
+            locator = cls._interned.get(key)
+            if locator is not None:
+                cls._interned.move_to_end(key)
+                return locator
+            locator = super().__new__(cls)
+            by = By.XPATH if value.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
+            for name, attr_value in (('value', value), ('by', by), ('index', index), ('timeout', timeout)):
+                object.__setattr__(locator, name, attr_value)
+            cls._interned[key] = locator
+            if len(cls._interned) > INTERNED_LOCATORS:
+                cls._interned.popitem(last=False)
+        return locator
+
+    @classmethod
+    def of(cls, locator):
+        """
+        Returns `locator` unchanged if it already is a Locator, otherwise the interned Locator for the string.
+        """
+        return locator if isinstance(locator, Locator) else cls(locator)
+
+    def resolve(self, index: int = None, timeout: int = None, default_timeout: int = None):
+        """
+        Applies this locator's default index and timeout to the values passed to a UI helper.
+
+        Returns:
+            Tuple of (index, timeout).
+        """
+        if timeout is None:
+            timeout = default_timeout if self.timeout is None else self.timeout
+        return self.index if index is None else index, timeout
+
+    def as_tuple(self):
+        """
+        Returns the (by, value) pair expected by Selenium's find_element and expected conditions.
+        """
+        return self.by, self.value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return Locator, (self.value, self.index, self.timeout)
+
+    def __eq__(self, other):
+        if not isinstance(other, Locator):
+            return NotImplemented
+        return (self.value, self.index, self.timeout) == (other.value, other.index, other.timeout)
+
+    def __hash__(self):
+        return hash((self.value, self.index, self.timeout))
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"Locator({self.value!r}, index={self.index}, timeout={self.timeout})"
+
+
+AnyLocator = Union[str, Locator]
@@ -0,0 +1,261 @@
+import json
+import re
+import threading
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from selenium.common.exceptions import WebDriverException
+
+# URL patterns blocked for each resource type; Network.setBlockedURLs only matches URLs, so types map to extensions
+RESOURCE_TYPE_PATTERNS = {
+    'image': ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.ico', '.bmp', '.avif'],
+    'font': ['.woff', '.woff2', '.ttf', '.otf', '.eot'],
+    'media': ['.mp4', '.webm', '.ogg', '.ogv', '.mp3', '.wav', '.m3u8', '.mpd'],
+    'stylesheet': ['.css'],
+}
+TRACKER_PATTERNS = [
+    '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*', '*googlesyndication.com/*',
+    '*connect.facebook.net/*/fbevents.js*', '*hotjar.com/*', '*segment.io/*', '*newrelic.com/*', '*nr-data.net/*',
+]
+BLOCKED_REASON_INSPECTOR = 'inspector'
+STUB_COUNTER = '__autoUtilitiesStubbedRequests'
+
+# Answers fetch() and XMLHttpRequest calls to stubbed endpoints in the page, before any request is sent. Only these
+# two APIs are stubbed: documents, scripts, images, stylesheets, workers, beacons and WebSockets load from the network.
+# Intercepting those needs the Fetch domain (Fetch.enable / Fetch.fulfillRequest), whose Fetch.requestPaused events
+# the WebDriver CDP endpoint cannot deliver
+STUB_RESPONSES_SCRIPT = """/* auto_utilities:stub_responses */
+(function (stubs) {
+    window.%(counter)s = 0;
+    function absoluteURL(url) {
+        return new URL(url, window.location.href).href;
+    }
+    function findStub(url) {
+        var absolute = absoluteURL(url);
+        for (var i = 0; i < stubs.length; i++) {
+            if (new RegExp(stubs[i].pattern).test(absolute)) {
+                return stubs[i];
+            }
+        }
+        return null;
+    }
+
+    var originalFetch = window.fetch;
+    window.fetch = function (input, init) {
+        var url = typeof input === 'string' ? input : input.url, stub = findStub(url);
+        if (!stub) {
+            return originalFetch.apply(this, arguments);
+        }
+        window.%(counter)s++;
+        var response = new Response(stub.body, {status: stub.status, headers: stub.headers});
+        Object.defineProperty(response, 'url', {value: absoluteURL(url).split('#')[0]});
+        return Promise.resolve(response);
+    };
+
+    var originalOpen = XMLHttpRequest.prototype.open, originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__stub = findStub(url);
+        this.__stubURL = this.__stub ? absoluteURL(url).split('#')[0] : null;
+        return originalOpen.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function () {
+        var xhr = this, stub = this.__stub;
+        if (!stub) {
+            return originalSend.apply(this, arguments);
+        }
+        window.%(counter)s++;
+        var values = {readyState: 4, status: stub.status, statusText: 'OK', responseText: stub.body,
+                      response: stub.body, responseURL: xhr.__stubURL};
+        Object.keys(values).forEach(function (name) {
+            Object.defineProperty(xhr, name, {value: values[name], configurable: true});
+        });
+        xhr.getAllResponseHeaders = function () {
+            return Object.keys(stub.headers).map(function (name) { return name + ': ' + stub.headers[name]; })
+                .join('\\r\\n');
+        };
+        xhr.getResponseHeader = function (name) { return stub.headers[name] || null; };
+        setTimeout(function () {
+            ['readystatechange', 'load', 'loadend'].forEach(function (type) {
+                xhr.dispatchEvent(new Event(type));
+            });
+        }, 0);
+    };
+})(%(stubs)s);
+"""
+
+
+class RequestBlocker:
+    """
+    Blocks requests a test never asserts on (images, fonts, media, trackers, custom URL patterns) and answers selected
+    endpoints with local stub responses, using the Chrome DevTools Protocol of local or remote Chromium drivers.
+    Stub responses only answer fetch() and XMLHttpRequest calls of the page (see STUB_RESPONSES_SCRIPT).
+
+    Statistics are kept per page (document URL): requests blocked by resource type, requests stubbed and, optionally,
+    the bytes the blocked requests would have transferred.
+
+    Example:
+        >>> RequestBlocker.apply(driver, resource_types=['image', 'font', 'tracker'],
+        ...                      stub_responses={'*/api/feature-flags*': {'body': '{}'}})
+        >>> RequestBlocker.collect_stats(driver)
+        {'https://www.facebook.com/': {'requests_blocked': 41, 'requests_stubbed': 1, 'by_type': {'Image': 38, ...}}}
+    """
+
+    _stats = weakref.WeakKeyDictionary()
+    _pending = weakref.WeakKeyDictionary()
+    _driver_locks = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def apply(cls, driver, url_patterns: list = None, resource_types: list = None, stub_responses: dict = None):
+        """
+        Starts blocking and stubbing on the driver; applies to every page loaded afterwards.
+
+        Args:
+            driver: Chromium-based local or remote WebDriver.
+            url_patterns: URL wildcard patterns to block, e.g. '*.mp4' or '*://ads.example.com/*'.
+            resource_types: Any of 'image', 'font', 'media', 'stylesheet' and 'tracker'.
+            stub_responses: Mapping of URL wildcard pattern to a response dict with 'body', 'status' and 'headers'.
+                Only fetch() and XMLHttpRequest calls are stubbed; other requests to these URLs reach the network.
+
+        Raises:
+            ValueError: If a resource type is unknown or the driver does not expose the DevTools Protocol.
+        """
+        blocked_urls = list(url_patterns or [])
+        for resource_type in resource_types or []:
+            if resource_type == 'tracker':
+                blocked_urls.extend(TRACKER_PATTERNS)
+            elif resource_type in RESOURCE_TYPE_PATTERNS:
+                for extension in RESOURCE_TYPE_PATTERNS[resource_type]:
+                    blocked_urls.extend([f'*{extension}', f'*{extension}?*'])
+            else:
+                valid_types = set(RESOURCE_TYPE_PATTERNS) | {'tracker'}
+                raise ValueError(f"Unsupported resource type: {resource_type}. Valid options: {valid_types}")
+
+        try:
+            cls.execute_cdp(driver, 'Network.enable', {})
+            cls.execute_cdp(driver, 'Network.setBlockedURLs', {'urls': blocked_urls})
+            if stub_responses:
+                cls.execute_cdp(driver, 'Page.addScriptToEvaluateOnNewDocument',
+                                {'source': cls._stub_responses_script(stub_responses)})
+        except WebDriverException as e:
+            raise ValueError(f"DevTools Protocol is not reachable for this driver: {e}")
+
+    @classmethod
+    def execute_cdp(cls, driver, command: str, params: dict):
+        """
+        Runs a DevTools command on local Chromium drivers or, through the vendor endpoint, on remote ones.
+
+        Remote drivers need a ChromiumRemoteConnection command executor, which CustomWebDriverManager uses for remote
+        Chrome drivers.
+        """
+        if hasattr(driver, 'execute_cdp_cmd'):
+            return driver.execute_cdp_cmd(command, params)
+        try:
+            return driver.execute('executeCdpCommand', {'cmd': command, 'params': params})['value']
+        except KeyError:
+            raise WebDriverException("The driver's command executor has no DevTools endpoint; launch remote Chromium "
+                                     "drivers with a ChromiumRemoteConnection")
+
+    @classmethod
+    def collect_stats(cls, driver, measure_bytes: bool = False, measure_third_party: bool = False):
+        """
+        Drains the driver's performance log into the per-page statistics and returns them.
+
+        The driver must be launched with performance logging (see CustomWebDriverManager `request_blocking`).
+
+        Args:
+            driver: Driver the blocking was applied to.
+            measure_bytes: Sends HEAD requests for newly blocked URLs to add their Content-Length to `bytes_avoided`;
+                blocked requests never reach the network, so their size is otherwise unknown. Only URLs on the host of
+                the page that loaded them are measured.
+            measure_third_party: Also measures blocked URLs of other hosts (trackers, CDNs), i.e. sends them HEAD
+                requests from the test runner.
+        """
+        # Driver round trips only hold this driver's lock, which keeps its log batches in order; the shared lock
+        # guards the statistics of every driver and is only taken to update them
+        with cls._driver_lock(driver):
+            entries = driver.get_log('performance')
+            stubbed = driver.execute_script(f"return window.{STUB_COUNTER} || 0;")
+            current_page = driver.current_url
+            blocked_urls = cls._record_log(driver, entries, stubbed, current_page)
+
+        if not measure_third_party:
+            blocked_urls = [(page, url) for page, url in blocked_urls if cls._same_host(page, url)]
+        if measure_bytes and blocked_urls:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                sizes = list(executor.map(cls._content_length, [url for _, url in blocked_urls]))
+            with cls._lock:
+                stats = cls._stats[driver]
+                for (page, _), size in zip(blocked_urls, sizes):
+                    stats[page]['bytes_avoided'] += size
+
+        return cls.get_stats(driver)
+
+    @classmethod
+    def get_stats(cls, driver):
+        with cls._lock:
+            return {page: dict(page_stats, by_type=dict(page_stats['by_type']))
+                    for page, page_stats in cls._stats.get(driver, {}).items()}
+
+    @classmethod
+    def _driver_lock(cls, driver):
+        with cls._lock:
+            return cls._driver_locks.setdefault(driver, threading.Lock())
+
+    @classmethod
+    def _record_log(cls, driver, entries: list, stubbed: int, current_page: str):
+        """
+        Adds drained performance log entries to the driver's statistics and returns the (page, url) of each newly
+        blocked request.
+        """
+        blocked_urls = []
+        with cls._lock:
+            stats = cls._stats.setdefault(driver, defaultdict(cls._empty_page_stats))
+            pending = cls._pending.setdefault(driver, {})
+            for entry in entries:
+                message = json.loads(entry['message'])['message']
+                params = message.get('params', {})
+                if message.get('method') == 'Network.requestWillBeSent':
+                    pending[params['requestId']] = (params['request']['url'], params.get('documentURL'))
+                elif message.get('method') == 'Network.loadingFailed':
+                    url, page = pending.pop(params['requestId'], (None, None))
+                    if params.get('blockedReason') == BLOCKED_REASON_INSPECTOR:
+                        page_stats = stats[page]
+                        page_stats['requests_blocked'] += 1
+                        page_stats['by_type'][params.get('type', 'Other')] += 1
+                        blocked_urls.append((page, url))
+                elif message.get('method') == 'Network.loadingFinished':
+                    pending.pop(params['requestId'], None)
+            stats[current_page]['requests_stubbed'] = max(stats[current_page]['requests_stubbed'], stubbed)
+        return blocked_urls
+
+    @staticmethod
+    def _empty_page_stats():
+        return {'requests_blocked': 0, 'requests_stubbed': 0, 'bytes_avoided': 0, 'by_type': defaultdict(int)}
+
+    @staticmethod
+    def _same_host(page: str, url: str):
+        return bool(page and url) and urlsplit(page).hostname == urlsplit(url).hostname
+
+    @staticmethod
+    def _content_length(url: str):
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=5)
+            return int(response.headers.get('Content-Length', 0))
+        except (requests.RequestException, ValueError):
+            return 0
+
+    @classmethod
+    def _stub_responses_script(cls, stub_responses: dict):
+        stubs = [{'pattern': cls._wildcard_to_regex(pattern), 'body': response.get('body', ''),
+                  'status': response.get('status', 200),
+                  'headers': response.get('headers', {'Content-Type': 'application/json'})}
+                 for pattern, response in stub_responses.items()]
+        return STUB_RESPONSES_SCRIPT % {'counter': STUB_COUNTER, 'stubs': json.dumps(stubs)}
+
+    @staticmethod
+    def _wildcard_to_regex(pattern: str):
+        return '^' + '.*'.join(re.escape(part) for part in pattern.split('*')) + '$'
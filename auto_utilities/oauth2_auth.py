@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.auth import AuthBase, HTTPBasicAuth
+
+DEFAULT_REFRESH_MARGIN = 60
+DEFAULT_TOKEN_LIFETIME = 300
+DEFAULT_TOKEN_TIMEOUT = 30
+
+
+class OAuth2ClientCredentials(AuthBase):
+    """
+    Bearer-token authentication using the OAuth2 client-credentials grant.
+
+    The token is fetched once and shared by every request and thread using this object. It is refreshed
+    `refresh_margin` seconds before it expires: the first caller to notice refreshes it while the others keep using the
+    still valid token, and once it has expired only one caller fetches a new token while the others wait for it, so
+    concurrent requests never stampede the token endpoint.
+
+    Args:
+        token_url: Token endpoint of the identity provider.
+        client_id: OAuth2 client id.
+        client_secret: OAuth2 client secret.
+        scope: Optional space separated scopes to request.
+        audience: Optional audience (resource) to request the token for.
+        client_auth: 'basic' to send the client credentials in an Authorization header, 'body' to send them as form
+            fields (default: 'basic').
+        refresh_margin: Seconds before expiry at which the token is refreshed.
+        timeout: Timeout of the token request, in seconds.
+
+    Example:
+        >>> ApiClient.get_resource(f'{base_url}/orders', auth_type='oauth2', credentials={
+        ...     'token_url': 'https://idp/oauth2/token', 'client_id': 'qa-suite', 'client_secret': secret})
+    """
+
+    def __init__(self, token_url: str, client_id: str, client_secret: str, scope: str = None, audience: str = None,
+                 client_auth: str = 'basic', refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 timeout: float = DEFAULT_TOKEN_TIMEOUT):
+        if client_auth not in ('basic', 'body'):
+            raise ValueError(f"Unsupported client authentication: {client_auth}. Valid options: basic, body")
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.audience = audience
+        self.client_auth = client_auth
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.stats = Counter()
+        self._token = None
+        self._token_type = 'Bearer'
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    def __call__(self, request):
+        request.headers['Authorization'] = f'{self._token_type} {self.get_token()}'
+        request.register_hook('response', self._invalidate_rejected_token)
+        return request
+
+    def get_token(self):
+        """
+        Returns a valid access token, fetching or refreshing it when needed.
+        """
+        now = time.monotonic()
+        token = self._token
+        if token and now < self._refresh_at:
+            return token
+
+        if token and now < self._expires_at:
+            # Proactive refresh: only one caller refreshes, everybody else keeps using the current token
+            if self._lock.acquire(blocking=False):
+                try:
+                    if time.monotonic() >= self._refresh_at:
+                        self._fetch_token()
+                except requests.RequestException as e:
+                    print(f"Token refresh failed, using the current token until it expires: {e}")
+                finally:
+                    self._lock.release()
+            return self._token
+
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._refresh_at:
+                self._fetch_token()
+            return self._token
+
+    def invalidate(self):
+        """
+        Drops the cached token so the next request fetches a new one.
+        """
+        with self._lock:
+            self._token = None
+            self._expires_at = self._refresh_at = 0.0
+
+    def _fetch_token(self):
+        data = {'grant_type': 'client_credentials'}
+        if self.scope:
+            data['scope'] = self.scope
+        if self.audience:
+            data['audience'] = self.audience
+        auth = None
+        if self.client_auth == 'basic':
+            auth = HTTPBasicAuth(self.client_id, self.client_secret)
+        else:
+            data.update(client_id=self.client_id, client_secret=self.client_secret)
+
+        requested_at = time.monotonic()
+        response = self._session.post(self.token_url, data=data, auth=auth, timeout=self.timeout,
+                                      headers={'Accept': 'application/json'})
+        self.stats['fetches'] += 1
+        response.raise_for_status()
+        payload = response.json()
+
+        lifetime = float(payload.get('expires_in') or DEFAULT_TOKEN_LIFETIME)
+        self._token_type = payload.get('token_type', 'Bearer').capitalize()
+        self._expires_at = requested_at + lifetime
+        self._refresh_at = self._expires_at - min(self.refresh_margin, lifetime / 2)
+        self._token = payload['access_token']
+
+    def _invalidate_rejected_token(self, response, **kwargs):
+        # A 401 for the current token means it was revoked early, so the next request fetches a new one
+        if response.status_code == 401 and self._token and \
+                response.request.headers.get('Authorization') == f'{self._token_type} {self._token}':
+            self.stats['rejected'] += 1
+            self.invalidate()
+        return response
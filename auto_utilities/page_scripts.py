@@ -0,0 +1,378 @@
+# JavaScript snippets executed in the page by the UI utilities.
+# Every script starts with an `auto_utilities:<name>` marker comment so that it can be recognised in command logs.
+
+_LOOKUP_HELPERS = """
+function findAll(locator, using) {
+    if (using === 'xpath') {
+        var snapshot = document.evaluate(locator, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var found = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) {
+            found.push(snapshot.snapshotItem(i));
+        }
+        return found;
+    }
+    return Array.prototype.slice.call(document.querySelectorAll(locator));
+}
+
+function isVisible(el) {
+    var style = window.getComputedStyle(el);
+    return style.display !== 'none' && style.visibility !== 'hidden' && el.getClientRects().length > 0;
+}
+"""
+
+# Waits for the element at `index` to satisfy `condition`, optionally scrolls it into view and returns it.
+# Arguments: locator, using ('xpath' | 'css selector'), index, condition ('present' | 'visible' | 'clickable'),
+# timeout in milliseconds, scroll options (null = no scroll, true = default scroll, object = scrollIntoView options),
+# previously resolved element to reuse instead of looking the locator up (or null).
+RESOLVE_ELEMENT = "/* auto_utilities:resolve */" + _LOOKUP_HELPERS + """
+var locator = arguments[0], using = arguments[1], index = arguments[2], condition = arguments[3],
+    timeoutMs = arguments[4], scroll = arguments[5], cached = arguments[6], done = arguments[arguments.length - 1];
+
+function isReady(el) {
+    if (!el) {
+        return false;
+    }
+    if (condition === 'visible') {
+        return isVisible(el);
+    }
+    if (condition === 'clickable') {
+        return isVisible(el) && !el.disabled;
+    }
+    return true;
+}
+
+function finish(el, ready) {
+    if (el && scroll === true) {
+        el.scrollIntoView();
+    } else if (el && scroll) {
+        el.scrollIntoView(scroll);
+    }
+    done({element: el, ready: ready});
+}
+
+var deadline = Date.now() + timeoutMs;
+(function poll() {
+    if (cached && !cached.isConnected) {
+        return done({element: null, ready: false, stale: true});
+    }
+    var el = cached || findAll(locator, using)[index] || null;
+    if (isReady(el)) {
+        return finish(el, true);
+    }
+    if (Date.now() >= deadline) {
+        return finish(el, false);
+    }
+    setTimeout(poll, 50);
+})();
+"""
+
+# Waits until every locator matches a visible element, then reads the requested fields of all matching elements.
+# Arguments: list of [locator, using] pairs, fields ({text, attributes, css, selected_option}), timeout in milliseconds.
+# Resolves to {ready, records}, one record per matched element in locator order.
+READ_ELEMENTS = "/* auto_utilities:read */" + _LOOKUP_HELPERS + """
+var queries = arguments[0], fields = arguments[1], timeoutMs = arguments[2],
+    done = arguments[arguments.length - 1];
+
+function readAttribute(el, name) {
+    var value = el[name];
+    if (typeof value === 'boolean') {
+        return value ? 'true' : null;
+    }
+    if (value === undefined || value === null || typeof value === 'object' || typeof value === 'function') {
+        return el.getAttribute(name);
+    }
+    return String(value);
+}
+
+function readCss(el, name) {
+    var value = window.getComputedStyle(el).getPropertyValue(name);
+    var rgb = /^rgb\\((\\d+), (\\d+), (\\d+)\\)$/.exec(value);
+    return rgb ? 'rgba(' + rgb[1] + ', ' + rgb[2] + ', ' + rgb[3] + ', 1)' : value;
+}
+
+function readRecord(el, locator, index) {
+    var record = {locator: locator, index: index};
+    if (fields.text) {
+        record.text = isVisible(el) ? (el.innerText || '').trim() : '';
+    }
+    if (fields.attributes && fields.attributes.length) {
+        record.attributes = {};
+        fields.attributes.forEach(function (name) { record.attributes[name] = readAttribute(el, name); });
+    }
+    if (fields.css && fields.css.length) {
+        record.css = {};
+        fields.css.forEach(function (name) { record.css[name] = readCss(el, name); });
+    }
+    if (fields.selected_option) {
+        var option = el.options ? el.options[el.selectedIndex] : null;
+        record.selected_option = option ? option.text.trim() : null;
+    }
+    return record;
+}
+
+function allVisible() {
+    return queries.every(function (query) { return findAll(query[0], query[1]).some(isVisible); });
+}
+
+function finish(ready) {
+    var records = [];
+    queries.forEach(function (query) {
+        findAll(query[0], query[1]).forEach(function (el, index) { records.push(readRecord(el, query[0], index)); });
+    });
+    done({ready: ready, records: records});
+}
+
+var deadline = Date.now() + timeoutMs;
+(function poll() {
+    if (allVisible()) {
+        return finish(true);
+    }
+    if (Date.now() >= deadline) {
+        return finish(false);
+    }
+    setTimeout(poll, 50);
+})();
+"""
+
+# Resolves as soon as the conditions are met, re-checking on DOM mutations and input/transition events instead of on a
+# fixed schedule; a backing-off poll catches changes no event reports (e.g. layout-only visibility changes).
+# Arguments: list of [locator, using, index, condition, expected] where condition is one of 'present', 'visible',
+# 'clickable', 'invisible', 'stale', 'text' and 'value'; timeout in milliseconds; poll options
+# ({interval, backoff, max_interval} in milliseconds); mode: 'all' (every condition holds), 'any' (at least one holds)
+# or 'none' (no condition holds).
+# Resolves to {satisfied, results, elapsed}, with one boolean per condition in `results`.
+WAIT_FOR_CONDITIONS = "/* auto_utilities:wait */" + _LOOKUP_HELPERS + """
+var conditions = arguments[0], timeoutMs = arguments[1], poll = arguments[2], mode = arguments[3] || 'all',
+    done = arguments[arguments.length - 1];
+var started = Date.now(), deadline = started + timeoutMs, finished = false, scheduled = false;
+var observer = null, pollTimer = null, deadlineTimer = null, interval = poll.interval;
+var EVENTS = ['input', 'change', 'transitionend', 'animationend'];
+
+var initial = conditions.map(function (condition) {
+    return condition[3] === 'stale' ? findAll(condition[0], condition[1])[condition[2]] || null : null;
+});
+
+function holds(condition, i) {
+    var kind = condition[3], expected = condition[4];
+    if (kind === 'stale') {
+        // Nothing matched when the wait started, so the element is already gone
+        return initial[i] === null || !initial[i].isConnected;
+    }
+    var el = findAll(condition[0], condition[1])[condition[2]] || null;
+    if (kind === 'invisible') {
+        return !el || !isVisible(el);
+    }
+    if (!el) {
+        return false;
+    }
+    if (kind === 'visible') {
+        return isVisible(el);
+    }
+    if (kind === 'clickable') {
+        return isVisible(el) && !el.disabled;
+    }
+    if (kind === 'text') {
+        return isVisible(el) && (el.innerText || '').indexOf(expected) !== -1;
+    }
+    if (kind === 'value') {
+        return (el.value || el.getAttribute('value') || '').indexOf(expected) !== -1;
+    }
+    return true;
+}
+
+function met(results) {
+    if (mode === 'any') {
+        return results.some(Boolean);
+    }
+    if (mode === 'none') {
+        return !results.some(Boolean);
+    }
+    return results.every(Boolean);
+}
+
+function finish(satisfied, results) {
+    finished = true;
+    if (observer) {
+        observer.disconnect();
+    }
+    EVENTS.forEach(function (type) { document.removeEventListener(type, schedule, true); });
+    clearTimeout(pollTimer);
+    clearTimeout(deadlineTimer);
+    done({satisfied: satisfied, results: results, elapsed: Date.now() - started});
+}
+
+function check() {
+    scheduled = false;
+    if (finished) {
+        return;
+    }
+    var results = conditions.map(holds);
+    if (met(results)) {
+        finish(true, results);
+    } else if (Date.now() >= deadline) {
+        finish(false, results);
+    }
+}
+
+function schedule() {
+    if (!scheduled && !finished) {
+        scheduled = true;
+        setTimeout(check, 0);
+    }
+}
+
+function pollAgain() {
+    check();
+    if (!finished) {
+        interval = Math.min(interval * poll.backoff, poll.max_interval);
+        pollTimer = setTimeout(pollAgain, interval);
+    }
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(schedule);
+    observer.observe(document.documentElement, {subtree: true, childList: true, attributes: true,
+                                                characterData: true});
+    EVENTS.forEach(function (type) { document.addEventListener(type, schedule, true); });
+    pollTimer = setTimeout(pollAgain, interval);
+    deadlineTimer = setTimeout(function () {
+        if (!finished) {
+            var results = conditions.map(holds);
+            finish(met(results), results);
+        }
+    }, Math.max(timeoutMs, 0));
+}
+"""
+
+# Waits until every [locator, using, index] query matches an element satisfying `condition` and returns the elements.
+# Arguments: list of queries, condition ('present' | 'visible' | 'clickable'), timeout in milliseconds.
+# Resolves to {ready, elements}, with null for queries that matched nothing.
+RESOLVE_ELEMENTS = "/* auto_utilities:resolve_all */" + _LOOKUP_HELPERS + """
+var queries = arguments[0], condition = arguments[1], timeoutMs = arguments[2],
+    done = arguments[arguments.length - 1];
+
+function lookup() {
+    return queries.map(function (query) { return findAll(query[0], query[1])[query[2]] || null; });
+}
+
+function isReady(el) {
+    if (!el) {
+        return false;
+    }
+    if (condition === 'visible') {
+        return isVisible(el);
+    }
+    if (condition === 'clickable') {
+        return isVisible(el) && !el.disabled;
+    }
+    return true;
+}
+
+var deadline = Date.now() + timeoutMs;
+(function poll() {
+    var elements = lookup();
+    if (elements.every(isReady)) {
+        return done({elements: elements, ready: true});
+    }
+    if (Date.now() >= deadline) {
+        return done({elements: elements, ready: false});
+    }
+    setTimeout(poll, 50);
+})();
+"""
+
+# Waits until every field is clickable, then fills them all: text inputs, textareas and contenteditables through the
+# native value setter followed by input/change events (so framework-bound inputs see the change), selects by option
+# text and checkboxes/radios (boolean values) by clicking when their state differs. Other elements get a field error.
+# Arguments: list of [locator, using, index, value], options ({clear, click}), timeout in milliseconds.
+# Resolves to {ready, missing, errors}: locators without an element and per-field error messages.
+FILL_FORM = "/* auto_utilities:fill */" + _LOOKUP_HELPERS + """
+var fields = arguments[0], options = arguments[1], timeoutMs = arguments[2],
+    done = arguments[arguments.length - 1];
+
+function fire(el, type) {
+    el.dispatchEvent(new Event(type, {bubbles: true}));
+}
+
+function setText(el, value) {
+    // The setter of the element's own class, as the instance property may be patched by a framework
+    var proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+        : el instanceof HTMLInputElement ? HTMLInputElement.prototype : null;
+    if (!proto && !el.isContentEditable) {
+        return 'Element <' + el.tagName.toLowerCase() + '> does not accept text';
+    }
+    var text = options.clear ? value : (proto ? el.value : el.textContent) + value;
+    el.focus();
+    if (proto) {
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, text);
+    } else {
+        el.textContent = text;
+    }
+    fire(el, 'input');
+    fire(el, 'change');
+    el.blur();
+    return null;
+}
+
+function fill(el, value) {
+    if (options.click) {
+        el.click();
+    }
+    if (typeof value === 'boolean') {
+        if (el.checked !== value) {
+            el.click();
+        }
+        return null;
+    }
+    if (el.tagName === 'SELECT') {
+        var option = Array.prototype.find.call(el.options, function (o) { return o.text.trim() === value; });
+        if (!option) {
+            return 'Option with text "' + value + '" not found';
+        }
+        el.value = option.value;
+        fire(el, 'input');
+        fire(el, 'change');
+        return null;
+    }
+    return setText(el, String(value));
+}
+
+function lookup() {
+    return fields.map(function (field) { return findAll(field[0], field[1])[field[2]] || null; });
+}
+
+function isReady(el) {
+    return el && isVisible(el) && !el.disabled;
+}
+
+function finish(elements, ready) {
+    // A form is filled whole or not at all: with a field missing, nothing is written
+    var missing = fields.filter(function (field, i) { return !elements[i]; }).map(function (field) {
+        return field[0];
+    });
+    var errors = [];
+    if (missing.length) {
+        return done({ready: ready, missing: missing, errors: errors});
+    }
+    elements.forEach(function (el, i) {
+        var error = fill(el, fields[i][3]);
+        if (error) {
+            errors.push(fields[i][0] + ': ' + error);
+        }
+    });
+    done({ready: ready, missing: missing, errors: errors});
+}
+
+var deadline = Date.now() + timeoutMs;
+(function poll() {
+    var elements = lookup();
+    if (elements.every(isReady)) {
+        return finish(elements, true);
+    }
+    if (Date.now() >= deadline) {
+        return finish(elements, false);
+    }
+    setTimeout(poll, 50);
+})();
+"""
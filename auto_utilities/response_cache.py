@@ -0,0 +1,352 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_VARY_HEADERS = ('Accept', 'Accept-Language', 'Accept-Encoding')
+CREDENTIAL_HEADERS = ('Authorization', 'Proxy-Authorization', 'Cookie')
+CREDENTIAL_HEADER_MARKERS = ('api-key', 'apikey', 'token', 'secret', 'session')
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    content BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_path ON responses (path);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+class MemoryBackend:
+    """
+    LRU store of cache entries kept in process memory, bounded by entry count and total content size.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: dict):
+        self.delete(key)
+        self._entries[key] = entry
+        self._size += entry['size']
+        evicted = 0
+        while self._entries and (self._size > self.max_bytes or len(self._entries) > self.max_entries):
+            _, oldest = self._entries.popitem(last=False)
+            self._size -= oldest['size']
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry['size']
+
+    def delete_paths(self, paths: set):
+        keys = [key for key, entry in self._entries.items() if entry['path'] in paths]
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+class SqliteBackend:
+    """
+    LRU store of cache entries in a SQLite file, so every xdist worker on the machine shares the same cache.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_entries: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(DISK_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str):
+        with self._connection() as connection:
+            row = connection.execute('SELECT entry, content FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        entry = json.loads(row[0])
+        entry['content'] = bytes(row[1])
+        return entry
+
+    def put(self, key: str, entry: dict):
+        metadata = json.dumps({name: value for name, value in entry.items() if name != 'content'})
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (key, entry['path'], entry['stored_at'], time.time(), entry['size'], metadata,
+                                entry['content']))
+            evicted = 0
+            while True:
+                count, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+                if count == 0 or (size <= self.max_bytes and count <= self.max_entries):
+                    return evicted
+                connection.execute('DELETE FROM responses WHERE key = '
+                                   '(SELECT key FROM responses ORDER BY last_access LIMIT 1)')
+                evicted += 1
+
+    def delete(self, key: str):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def delete_paths(self, paths: set):
+        with self._connection() as connection:
+            return sum(connection.execute('DELETE FROM responses WHERE path = ?', (path,)).rowcount
+                       for path in paths)
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses')
+
+
+class ResponseCache:
+    """
+    Opt-in cache of ApiClient GET responses keyed by URL, auth identity and the request headers responses vary on.
+    Credential-bearing request headers (Authorization, Cookie, API keys and tokens) are part of the key too, so callers
+    passing their own credentials through `headers` never share entries.
+
+    The headers a response varies on are those named by its own Vary header, plus `vary_headers`. They are stored with
+    the URL's entries, so a request only gets a cached response sent for the same values of those headers. Responses
+    with `Vary: *` are not cached.
+
+    Fresh entries (younger than `ttl`) are served without a request. Older entries carrying an ETag or Last-Modified
+    are revalidated with If-None-Match / If-Modified-Since, and a 304 answer refreshes them. POST, PUT, PATCH and
+    DELETE requests drop the entries of the written path and of its parent collection.
+
+    Example:
+        >>> ResponseCache.enable(ttl=300, disk_path='/tmp/api_cache.sqlite')
+        >>> ApiClient.get_resource(f'{base_url}/feature-flags')
+        >>> ResponseCache.get_stats()
+        {'misses': 1, 'stores': 1, 'hits': 41, 'revalidations': 2}
+    """
+
+    enabled = False
+    ttl = DEFAULT_TTL
+    vary_headers = DEFAULT_VARY_HEADERS
+    stats = Counter()
+    _backend = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES,
+               max_entries: int = DEFAULT_MAX_ENTRIES, vary_headers: tuple = DEFAULT_VARY_HEADERS,
+               disk_path: str = None):
+        """
+        Turns the cache on.
+
+        Args:
+            ttl: Seconds an entry is served without revalidation.
+            max_bytes: Memory cap on the cached response bodies; least recently used entries are evicted first.
+            max_entries: Maximum number of cached responses.
+            vary_headers: Request headers always part of the cache key, on top of those named by each response's
+                Vary header.
+            disk_path: SQLite file to keep the entries in instead of process memory, shared across processes.
+        """
+        with cls._lock:
+            cls.ttl = ttl
+            cls.vary_headers = tuple(vary_headers)
+            cls._backend = (SqliteBackend(disk_path, max_bytes, max_entries) if disk_path
+                            else MemoryBackend(max_bytes, max_entries))
+            cls.enabled = True
+
+    @classmethod
+    def disable(cls):
+        with cls._lock:
+            cls.enabled = False
+            cls._backend = None
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            if cls._backend:
+                cls._backend.clear()
+
+    @classmethod
+    def fetch(cls, url: str, auth_identity: str, headers: dict, send, follow_redirects: bool = True):
+        """
+        Returns the response for a GET request from the cache, revalidating or sending it when needed.
+
+        Args:
+            url: Requested URL.
+            auth_identity: Hash of the credentials the request is sent with (see `auth_identity`).
+            headers: Request headers.
+            send: Callable sending the request with extra (conditional) headers and returning the response.
+            follow_redirects: Whether `send` follows redirects; responses of both modes are cached apart.
+        """
+        base_key = cls._key(url, auth_identity, headers, follow_redirects)
+        with cls._lock:
+            variants = cls._backend.get(base_key) if cls._backend else None
+            key = cls._variant_key(base_key, variants['vary'], headers) if variants else None
+            entry = cls._backend.get(key) if key and cls._backend else None
+
+        if entry is not None and time.time() - entry['stored_at'] < cls.ttl:
+            cls._count('hits')
+            return cls._build_response(entry, requests.Request('GET', url, headers=headers).prepare())
+
+        validators = {}
+        if entry is not None:
+            cached_headers = CaseInsensitiveDict(entry['headers'])
+            if cached_headers.get('ETag'):
+                validators['If-None-Match'] = cached_headers['ETag']
+            if cached_headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = cached_headers['Last-Modified']
+
+        response = send(validators)
+        if entry is not None and validators and response.status_code == 304:
+            cls._count('revalidations')
+            refreshed_headers = CaseInsensitiveDict(entry['headers'])
+            refreshed_headers.update({name: value for name, value in response.headers.items()
+                                      if name.lower() in ('etag', 'last-modified', 'cache-control', 'expires', 'date')})
+            entry = dict(entry, stored_at=time.time(), headers=dict(refreshed_headers))
+            cls._store(key, entry)
+            return cls._build_response(entry, response.request)
+
+        cls._count('misses')
+        vary = cls._vary_of(response)
+        if (response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', '')
+                and vary is not None):
+            entry = cls._entry_from_response(url, response)
+            cls._store(cls._variant_key(base_key, vary, headers), entry, variants=(base_key, vary))
+        return response
+
+    @classmethod
+    def invalidate(cls, url: str):
+        """
+        Drops the cached entries of a written resource path and of its parent collection.
+        """
+        parts = urlsplit(url)
+        path = parts.path.rstrip('/')
+        paths = {cls._path_of(parts.scheme, parts.netloc, path),
+                 cls._path_of(parts.scheme, parts.netloc, path.rsplit('/', 1)[0])}
+        with cls._lock:
+            dropped = cls._backend.delete_paths(paths) if cls._backend else 0
+        if dropped:
+            cls._count('invalidations', dropped)
+
+    @staticmethod
+    def auth_identity(auth_type: str, credentials: dict = None):
+        """
+        Hashes the credentials so cache keys separate users without keeping secrets in the cache.
+        """
+        return hashlib.sha256(json.dumps([auth_type, credentials], sort_keys=True, default=str).encode()).hexdigest()
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            return dict(cls.stats)
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls.stats.clear()
+
+    @classmethod
+    def _key(cls, url: str, auth_identity: str, headers: dict, follow_redirects: bool = True):
+        # Key of the URL's variants record, which names the headers its responses vary on (see _variant_key)
+        credentials = sorted((name.lower(), value) for name, value in CaseInsensitiveDict(headers or {}).items()
+                             if cls._is_credential_header(name))
+        return hashlib.sha256(json.dumps([url, auth_identity, credentials, follow_redirects]).encode()).hexdigest()
+
+    @staticmethod
+    def _variant_key(base_key: str, vary: list, headers: dict):
+        request_headers = CaseInsensitiveDict(headers or {})
+        varying = [(name, request_headers.get(name)) for name in vary]
+        return hashlib.sha256(json.dumps([base_key, varying]).encode()).hexdigest()
+
+    @classmethod
+    def _vary_of(cls, response: requests.Response):
+        """
+        Returns the sorted, lower-cased request headers a response varies on, or None for `Vary: *`.
+        """
+        names = {name.strip().lower() for name in response.headers.get('Vary', '').split(',') if name.strip()}
+        if '*' in names:
+            return None
+        return sorted(names | {name.lower() for name in cls.vary_headers})
+
+    @staticmethod
+    def _is_credential_header(name: str):
+        lowered = name.lower()
+        return (lowered in (header.lower() for header in CREDENTIAL_HEADERS)
+                or any(marker in lowered for marker in CREDENTIAL_HEADER_MARKERS))
+
+    @staticmethod
+    def _path_of(scheme: str, netloc: str, path: str):
+        return f"{scheme}://{netloc}{path.rstrip('/') or '/'}"
+
+    @classmethod
+    def _entry_from_response(cls, url: str, response: requests.Response):
+        parts = urlsplit(url)
+        content = response.content
+        return {'url': response.url, 'path': cls._path_of(parts.scheme, parts.netloc, parts.path),
+                'status_code': response.status_code, 'reason': response.reason, 'encoding': response.encoding,
+                'headers': dict(response.headers), 'content': content, 'size': len(content),
+                'stored_at': time.time()}
+
+    @staticmethod
+    def _build_response(entry: dict, request: requests.PreparedRequest = None):
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.reason = entry['reason']
+        response.url = entry['url']
+        response.encoding = entry['encoding']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        response._content_consumed = True
+        response.request = request
+        return response
+
+    @classmethod
+    def _store(cls, key: str, entry: dict, variants: tuple = None):
+        # `variants` is the (key, vary) of the record naming the headers the URL's responses vary on. The record holds
+        # no response, so it has no path and writes to the URL leave it in place
+        with cls._lock:
+            if cls._backend is None:
+                return
+            evicted = 0
+            if variants is not None:
+                variants_key, vary = variants
+                evicted += cls._backend.put(variants_key, {'path': '', 'vary': vary, 'content': b'', 'size': 0,
+                                                           'stored_at': time.time()})
+            evicted += cls._backend.put(key, entry)
+            cls.stats['stores'] += 1
+            if evicted:
+                cls.stats['evictions'] += evicted
+
+    @classmethod
+    def _count(cls, name: str, amount: int = 1):
+        with cls._lock:
+            cls.stats[name] += amount
@@ -0,0 +1,194 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FRAME_BATCH_SIZE = 50000
+RESULT_FORMATS = {None, 'dataframe', 'numpy'}
+REPORTED_FAILURES = 5
+
+
+class ResultFrames:
+    """
+    Builds columnar results straight from an executed DB-API cursor, `batch_size` rows at a time, so a query result is
+    never held as one list of tuples.
+
+    Example:
+        >>> cur.execute('SELECT id, status, total FROM orders')
+        >>> orders = ResultFrames.frame_from_cursor(cur)
+        >>> orders.dtypes
+        id          int64
+        status     object
+        total     float64
+    """
+
+    @classmethod
+    def fetch(cls, cur, result_format: str = None, batch_size: int = DEFAULT_FRAME_BATCH_SIZE):
+        """
+        Fetches the remaining rows of a cursor as a list of tuples (None), a DataFrame ('dataframe') or a NumPy
+        structured array ('numpy').
+        """
+        cls.check_format(result_format)
+        if result_format == 'dataframe':
+            return cls.frame_from_cursor(cur, batch_size)
+        if result_format == 'numpy':
+            return cls.array_from_cursor(cur, batch_size)
+        return cur.fetchall()
+
+    @staticmethod
+    def check_format(result_format: str):
+        """
+        Raises ValueError for a result format `fetch` does not support, so callers can reject it before running a
+        query.
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format: {result_format}. Valid options: {RESULT_FORMATS}")
+
+    @classmethod
+    def frame_from_cursor(cls, cur, batch_size: int = DEFAULT_FRAME_BATCH_SIZE, dtypes: dict = None):
+        """
+        Returns the remaining rows of a cursor as a DataFrame named after the cursor's columns.
+
+        Args:
+            cur: Executed cursor
+            batch_size: Number of rows fetched and converted at a time
+            dtypes: Optional column to dtype mapping, e.g. {'total': 'float64'} for DECIMAL columns
+        """
+        columns = cls.column_names(cur)
+        frames = [pd.DataFrame.from_records(batch, columns=columns, coerce_float=True)
+                  for batch in cls._batches(cur, batch_size)]
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        return frame.astype(dtypes) if dtypes else frame
+
+    @classmethod
+    def array_from_cursor(cls, cur, batch_size: int = DEFAULT_FRAME_BATCH_SIZE, dtype: np.dtype = None):
+        """
+        Returns the remaining rows of a cursor as a NumPy structured array with one field per column.
+
+        Args:
+            cur: Executed cursor
+            batch_size: Number of rows fetched and converted at a time
+            dtype: Optional structured dtype; by default each batch's dtype is inferred and the batches are widened
+                to a common one: text columns are kept as objects so longer values are not truncated, numeric columns
+                with NULLs become float64 with NaN, and columns mixing other types become objects
+        """
+        columns = cls.column_names(cur)
+        arrays = [np.array([tuple(row) for row in batch], dtype=dtype or cls._infer_dtype(batch, columns))
+                  for batch in cls._batches(cur, batch_size)]
+        if not arrays:
+            return np.empty(0, dtype=dtype or [(name, object) for name in columns])
+        if dtype is None:
+            dtype = functools.reduce(cls._widen_dtype, (array.dtype for array in arrays))
+        return np.concatenate([array.astype(dtype, copy=False) for array in arrays])
+
+    @staticmethod
+    def column_names(cur):
+        return [column[0] for column in cur.description]
+
+    @staticmethod
+    def _infer_dtype(batch, columns):
+        inferred = np.rec.fromrecords(batch, names=columns).dtype
+        fields = []
+        for position, name in enumerate(columns):
+            field = inferred[name]
+            if field.kind == 'O':
+                # NULLs turn numeric columns into objects; they are kept numeric as float64 with NaN instead
+                values = [row[position] for row in batch if row[position] is not None]
+                if values and np.array(values).dtype.kind in 'iuf':
+                    field = np.dtype(np.float64)
+            fields.append((name, object if field.kind in 'USO' else field))
+        return np.dtype(fields)
+
+    @staticmethod
+    def _widen_dtype(dtype, other):
+        fields = []
+        for name in dtype.names:
+            field, other_field = dtype[name], other[name]
+            if field != other_field:
+                numeric = field.kind in 'iuf' and other_field.kind in 'iuf'
+                field = np.result_type(field, other_field) if numeric else np.dtype(object)
+            fields.append((name, field))
+        return np.dtype(fields)
+
+    @staticmethod
+    def _batches(cur, batch_size: int):
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
+class FrameAssertions:
+    """
+    Vectorized checks on query results, evaluated on whole columns at once. Each accepts a DataFrame or a NumPy
+    structured array and raises AssertionError naming the number of failing rows and the first few of them.
+
+    Example:
+        >>> orders = DatabaseHelper.run_postgres_query('SELECT * FROM orders', pool, result_format='dataframe')
+        >>> FrameAssertions.assert_not_null(orders, 'id', 'status')
+        >>> FrameAssertions.assert_unique(orders, 'id')
+        >>> FrameAssertions.assert_in_range(orders, 'total', min_value=0)
+        >>> FrameAssertions.assert_column_equals(orders, 'currency', 'EUR')
+    """
+
+    @classmethod
+    def assert_column_equals(cls, result, column: str, expected):
+        """
+        Asserts a column equals a scalar for every row, or a sequence of the same length element-wise. Nulls only
+        equal nulls.
+        """
+        values = cls._frame(result)[column]
+        if np.ndim(expected) == 0:
+            expected_values = pd.Series(expected, index=values.index)
+        else:
+            expected = list(expected)
+            if len(expected) != len(values):
+                raise AssertionError(f"Column '{column}' has {len(values)} rows, expected {len(expected)}")
+            expected_values = pd.Series(expected, index=values.index)
+        failing = ~((values == expected_values) | (values.isna() & expected_values.isna()))
+        cls._check(failing, f"Column '{column}' differs from the expected values", values, expected_values)
+
+    @classmethod
+    def assert_not_null(cls, result, *columns: str):
+        frame = cls._frame(result)
+        for column in columns or frame.columns:
+            cls._check(frame[column].isna(), f"Column '{column}' has nulls", frame[column])
+
+    @classmethod
+    def assert_unique(cls, result, *columns: str):
+        """
+        Asserts no two rows share the same value of a column, or the same combination of several columns.
+        """
+        frame = cls._frame(result)
+        subset = list(columns) or list(frame.columns)
+        failing = frame.duplicated(subset=subset, keep=False)
+        cls._check(failing, f"Columns {subset} have duplicates", frame[subset])
+
+    @classmethod
+    def assert_in_range(cls, result, column: str, min_value=None, max_value=None, inclusive: bool = True):
+        """
+        Asserts every non-null value of a column lies between `min_value` and `max_value` (either may be omitted).
+        """
+        values = cls._frame(result)[column]
+        failing = pd.Series(False, index=values.index)
+        if min_value is not None:
+            failing |= values.lt(min_value) if inclusive else values.le(min_value)
+        if max_value is not None:
+            failing |= values.gt(max_value) if inclusive else values.ge(max_value)
+        bounds = f"{'[' if inclusive else '('}{min_value}, {max_value}{']' if inclusive else ')'}"
+        cls._check(failing, f"Column '{column}' has values outside {bounds}", values)
+
+    @staticmethod
+    def _frame(result):
+        return result if isinstance(result, pd.DataFrame) else pd.DataFrame(result)
+
+    @staticmethod
+    def _check(failing: pd.Series, message: str, values, expected: pd.Series = None):
+        count = int(failing.sum())
+        if not count:
+            return
+        rows = failing[failing].index[:REPORTED_FAILURES]
+        details = [f"row {row}: {values.loc[row].tolist() if values.ndim > 1 else values.loc[row]!r}"
+                   + (f" (expected {expected.loc[row]!r})" if expected is not None else '') for row in rows]
+        raise AssertionError(f"{message}: {count} of {len(failing)} rows, e.g. " + '; '.join(details))
@@ -0,0 +1,565 @@
+import base64
+import copy
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium.webdriver.common.keys import Keys
+
+from auto_utilities.command_metrics import ELEMENT_KEY, SCRIPT_MARKER
+
+# Seconds added to every command, roughly the round trip to a local driver, a grid on the LAN and a grid over the WAN
+LATENCY_PROFILES = {'local': 0.0, 'lan': 0.002, 'wan': 0.03}
+SERVER_POLL_INTERVAL = 0.01
+DEFAULT_PAGE = '*'
+# Private-use range WebDriver encodes special keys in; only BACKSPACE changes the stub value
+KEY_CODES_START, KEY_CODES_END = '\ue000', '\uf8ff'
+# 1x1 transparent PNG returned for screenshots
+BLANK_PNG = base64.b64encode(bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082')).decode()
+
+
+class StubElement:
+    """
+    Element of a scripted stub page.
+
+    Args:
+        tag: Tag name, e.g. 'input' or 'select'.
+        text: Visible text.
+        value: Value of inputs, changed by typing, clearing and form fills.
+        visible / enabled / selected: Element state as reported to WebDriver and to the page scripts.
+        attributes: Other attributes, e.g. {'href': '/home'}.
+        css: Computed CSS values, e.g. {'color': 'rgba(0, 0, 0, 1)'}.
+        options: Option texts of a select; the first one starts selected.
+        appear_after / disappear_after: Seconds after the page load at which the element becomes / stops being visible.
+        on_click: Callable receiving the page ({locator: [StubElement]}) to script the effect of a click.
+        alert: Text of a browser alert opened by clicking the element.
+        rect: Position and size, e.g. {'x': 10, 'y': 20, 'width': 100, 'height': 20}.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, tag: str = 'div', text: str = '', value: str = '', visible: bool = True, enabled: bool = True,
+                 selected: bool = False, attributes: dict = None, css: dict = None, options: list = None,
+                 appear_after: float = 0, disappear_after: float = None, on_click=None, alert: str = None,
+                 rect: dict = None):
+        self.id = f'stub-element-{next(self._ids)}'
+        self.tag = tag
+        self.text = text
+        self.value = value
+        self.visible = visible
+        self.enabled = enabled
+        self.selected = selected
+        self.attributes = attributes or {}
+        self.css = css or {}
+        self.appear_after = appear_after
+        self.disappear_after = disappear_after
+        self.on_click = on_click
+        self.alert = alert
+        self.rect = rect or {'x': 0, 'y': 0, 'width': 100, 'height': 20}
+        self.options = [StubElement('option', text=option, selected=index == 0) for index, option in
+                        enumerate(options or [])]
+
+    def __deepcopy__(self, memo):
+        # Every page load gets fresh elements (and ids), so references from the previous page go stale
+        element = copy.copy(self)
+        element.id = f'stub-element-{next(self._ids)}'
+        element.attributes = dict(self.attributes)
+        element.css = dict(self.css)
+        element.rect = dict(self.rect)
+        element.options = [copy.deepcopy(option, memo) for option in self.options]
+        return element
+
+    def is_visible(self, loaded_at: float):
+        age = time.monotonic() - loaded_at
+        return self.visible and age >= self.appear_after and (self.disappear_after is None or
+                                                              age < self.disappear_after)
+
+    def shown_text(self, loaded_at: float):
+        if self.tag == 'select':
+            return '\n'.join(option.text for option in self.options)
+        return self.text if self.is_visible(loaded_at) else ''
+
+    def attribute(self, name: str):
+        if name == 'value':
+            return self.value
+        if name in ('checked', 'selected'):
+            return 'true' if self.selected else None
+        if name == 'disabled':
+            return None if self.enabled else 'true'
+        if name in ('innerText', 'textContent'):
+            return self.text
+        return self.attributes.get(name)
+
+
+class WebDriverError(Exception):
+
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+
+class StubWebDriverServer:
+    """
+    In-process W3C WebDriver stand-in serving scripted pages with a configurable latency per command.
+
+    Pages map a URL (or '*' for any other URL) to {locator: [StubElement]}; locators match by their exact string, the
+    way UIActions passes them. The page scripts of the UI utilities (see page_scripts) are answered server-side by
+    their marker, and every command is counted so tests can assert on round trips.
+
+    No JavaScript is executed: each page script is emulated in Python, so the stub covers round trips and the Python
+    side of the helpers but not the scripts themselves. Those run under node against a fake DOM in
+    Tests/unit/page_scripts_test.py, which is skipped where node is not installed.
+
+    Example:
+        >>> with StubWebDriverServer({'*': {'#email': [StubElement('input')]}}, latency='lan') as server:
+        ...     CustomWebDriverManager.launch_driver(remote_host=server.host)
+        ...     UIActions.enter_text('#email', 'user')
+        ...     server.command_count
+        3
+    """
+
+    def __init__(self, pages: dict = None, latency=0.0, browser_logs: list = None):
+        """
+        Args:
+            pages: Scripted pages by URL.
+            latency: Seconds added to every command, or the name of a LATENCY_PROFILES entry.
+            browser_logs: Browser log entries ({'level': ..., 'message': ...}) returned to every session.
+        """
+        self.pages = pages or {}
+        self.browser_logs = browser_logs or []
+        self.latency = LATENCY_PROFILES[latency] if isinstance(latency, str) else latency
+        self.sessions = {}
+        self.commands = Counter()
+        self._session_ids = itertools.count()
+        self._window_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def host(self):
+        return f'127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def command_count(self):
+        with self._lock:
+            return sum(self.commands.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self.commands.clear()
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                server._handle(self)
+
+            do_POST = do_DELETE = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub_webdriver', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Request handling
+
+    def _handle(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        path = [part for part in request.path.split('?')[0].split('/') if part]
+        if path[:2] == ['wd', 'hub']:
+            path = path[2:]
+        length = int(request.headers.get('Content-Length') or 0)
+        body = json.loads(request.rfile.read(length) or b'{}') if length else {}
+
+        try:
+            value = self._dispatch(request.command, path, body)
+            status, payload = 200, {'value': value}
+        except WebDriverError as e:
+            status, payload = e.status, {'value': {'error': e.error, 'message': str(e), 'stacktrace': ''}}
+
+        data = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _dispatch(self, method: str, path: list, body: dict):
+        if path == ['session'] and method == 'POST':
+            return self._new_session()
+        if len(path) < 2 or path[0] != 'session' or path[1] not in self.sessions:
+            raise WebDriverError(404, 'invalid session id', f'Unknown session: {"/".join(path)}')
+
+        session = self.sessions[path[1]]
+        command = path[2:]
+        with self._lock:
+            self.commands[(method, re.sub(r'stub-element-\d+', '{id}', '/'.join(command)))] += 1
+
+        if not command and method == 'DELETE':
+            del self.sessions[path[1]]
+            return None
+        if command[0] == 'element' and len(command) > 2 and command[1] != 'active':
+            return self._element_command(session, method, command[1], command[2:], body)
+        if command[0] in ('element', 'elements') and method == 'POST':
+            return self._find(session, body, many=command[0] == 'elements')
+        if command[0] == 'execute':
+            return self._execute(session, body['script'], self._unwrap(session, body.get('args', [])))
+        return self._session_command(session, method, command, body)
+
+    def _new_session(self):
+        session_id = f'stub-session-{next(self._session_ids)}'
+        self.sessions[session_id] = {'url': 'about:blank', 'history': [], 'forward': [], 'page': {}, 'loaded_at': 0,
+                                     'cookies': {}, 'windows': ['stub-window-0'], 'window': 'stub-window-0',
+                                     'active': None, 'alert': None, 'cdp': [], 'actions': []}
+        self._load(self.sessions[session_id], 'about:blank')
+        return {'sessionId': session_id, 'capabilities': {'browserName': 'chrome', 'platformName': 'linux'}}
+
+    def _load(self, session: dict, url: str):
+        page = self.pages.get(url, self.pages.get(DEFAULT_PAGE, {})) if url != 'about:blank' else {}
+        session.update(url=url, page=copy.deepcopy(page), loaded_at=time.monotonic(), active=None)
+
+    def _session_command(self, session: dict, method: str, command: list, body: dict):
+        name = '/'.join(command)
+        if name == 'url':
+            if method == 'GET':
+                return session['url']
+            session['history'].append(session['url'])
+            session['forward'] = []
+            return self._load(session, body['url'])
+        if name in ('back', 'forward'):
+            source, target = ('history', 'forward') if name == 'back' else ('forward', 'history')
+            if session[source]:
+                session[target].append(session['url'])
+                self._load(session, session[source].pop())
+            return None
+        if name == 'refresh':
+            return self._load(session, session['url'])
+        if name == 'title':
+            return 'Stub page'
+        if name == 'window/handles':
+            return list(session['windows'])
+        if name == 'window':
+            if method == 'GET':
+                return session['window']
+            if method == 'POST':
+                if body['handle'] not in session['windows']:
+                    raise WebDriverError(404, 'no such window', f"No window {body['handle']}")
+                session['window'] = body['handle']
+                return None
+            if session['window'] not in session['windows']:
+                raise WebDriverError(404, 'no such window', f"Window {session['window']} is closed")
+            session['windows'].remove(session['window'])
+            return list(session['windows'])
+        if name == 'window/new':
+            handle = f'stub-window-{next(self._window_ids)}'
+            session['windows'].append(handle)
+            return {'handle': handle, 'type': body.get('type', 'tab')}
+        if name == 'element/active':
+            return self._wrap(session['active'])
+        if name == 'cookie':
+            if method == 'GET':
+                return list(session['cookies'].values())
+            if method == 'POST':
+                session['cookies'][body['cookie']['name']] = body['cookie']
+            else:
+                session['cookies'].clear()
+            return None
+        if command[0] == 'cookie':
+            if method == 'DELETE':
+                session['cookies'].pop(command[1], None)
+                return None
+            if command[1] not in session['cookies']:
+                raise WebDriverError(404, 'no such cookie', f'No cookie named {command[1]}')
+            return session['cookies'][command[1]]
+        if command[0] == 'alert':
+            if session['alert'] is None:
+                raise WebDriverError(404, 'no such alert', 'No alert is open')
+            if name == 'alert/text':
+                return session['alert']
+            session['alert'] = None
+            return None
+        if name == 'screenshot':
+            return BLANK_PNG
+        if name in ('window/rect', 'window/maximize'):
+            return {'x': 0, 'y': 0, 'width': 1920, 'height': 1080}
+        if name == 'se/log':
+            return list(self.browser_logs)
+        if name == 'actions':
+            # Action payloads are recorded, with None for releases, and have no effect on the page
+            session['actions'].append(body.get('actions') if method == 'POST' else None)
+            return None
+        if name == 'goog/cdp/execute':
+            # DevTools commands are recorded and answered with an empty result
+            session['cdp'].append(body['cmd'])
+            return {}
+        if name in ('timeouts', 'frame', 'frame/parent'):
+            return None
+        raise WebDriverError(404, 'unknown command', f'Unsupported command: {method} {name}')
+
+    # Elements
+
+    def _elements(self, session: dict, locator: str, parent: StubElement = None):
+        if parent is not None:
+            if 'option' not in locator:
+                return []
+            text = re.search(r'"(.*)"', locator)
+            return [option for option in parent.options if text is None or option.text == text.group(1)]
+        return session['page'].get(locator, [])
+
+    def _find(self, session: dict, body: dict, many: bool, parent: StubElement = None):
+        elements = self._elements(session, body['value'], parent)
+        if many:
+            return [self._wrap(element) for element in elements]
+        if not elements:
+            raise WebDriverError(404, 'no such element', f"Unable to locate element: {body['value']}")
+        return self._wrap(elements[0])
+
+    def _element(self, session: dict, element_id: str):
+        for elements in session['page'].values():
+            for element in elements:
+                if element.id == element_id:
+                    return element
+                for option in element.options:
+                    if option.id == element_id:
+                        return option
+        raise WebDriverError(404, 'stale element reference', f'Element {element_id} is no longer attached')
+
+    def _parent_select(self, session: dict, option: StubElement):
+        for elements in session['page'].values():
+            for element in elements:
+                if option in element.options:
+                    return element
+        return None
+
+    def _element_command(self, session: dict, method: str, element_id: str, command: list, body: dict):
+        element = self._element(session, element_id)
+        name = command[0]
+        loaded_at = session['loaded_at']
+        if name in ('element', 'elements'):
+            return self._find(session, body, many=name == 'elements', parent=element)
+        if name == 'click':
+            self._click(session, element)
+            return None
+        if name == 'clear':
+            element.value = ''
+            return None
+        if name == 'value':
+            self._type(element, body.get('text', ''))
+            session['active'] = element
+            return None
+        if name == 'text':
+            return element.shown_text(loaded_at)
+        if name == 'name':
+            return element.tag
+        if name == 'enabled':
+            return element.enabled
+        if name == 'selected':
+            return element.selected
+        if name == 'displayed':
+            return element.is_visible(loaded_at)
+        if name in ('attribute', 'property'):
+            return element.attribute(command[1])
+        if name == 'css':
+            return element.css.get(command[1], '')
+        if name == 'rect':
+            return dict(element.rect)
+        if name == 'screenshot':
+            return BLANK_PNG
+        raise WebDriverError(404, 'unknown command', f'Unsupported element command: {method} {name}')
+
+    def _click(self, session: dict, element: StubElement):
+        if element.tag == 'option':
+            select = self._parent_select(session, element)
+            for option in select.options if select else []:
+                option.selected = option is element
+        elif element.attributes.get('type') in ('checkbox', 'radio'):
+            element.selected = not element.selected
+        session['active'] = element
+        if element.alert is not None:
+            session['alert'] = element.alert
+        if element.on_click:
+            element.on_click(session['page'])
+
+    @staticmethod
+    def _type(element: StubElement, text: str):
+        for character in text:
+            if character == Keys.BACKSPACE:
+                element.value = element.value[:-1]
+            elif not KEY_CODES_START <= character <= KEY_CODES_END:
+                element.value += character
+
+    def _wrap(self, element: StubElement):
+        return {ELEMENT_KEY: element.id} if element is not None else None
+
+    def _unwrap(self, session: dict, value):
+        if isinstance(value, dict) and ELEMENT_KEY in value:
+            try:
+                return self._element(session, value[ELEMENT_KEY])
+            except WebDriverError:
+                return StaleReference()
+        if isinstance(value, list):
+            return [self._unwrap(session, item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._unwrap(session, item) for key, item in value.items()}
+        return value
+
+    # Page scripts
+
+    def _execute(self, session: dict, script: str, args: list):
+        marker = SCRIPT_MARKER.match(script)
+        handler = getattr(self, f'_script_{marker.group(1)}', None) if marker else None
+        if handler:
+            return handler(session, *args)
+        if script.startswith('/* getAttribute */'):
+            return args[0].attribute(args[1])
+        if script.startswith('/* isDisplayed */'):
+            return args[0].is_visible(session['loaded_at'])
+        if 'history.go(-1)' in script:
+            return self._session_command(session, 'POST', ['back'], {})
+        if 'history.go(1)' in script:
+            return self._session_command(session, 'POST', ['forward'], {})
+        return None
+
+    def _holds(self, session: dict, element, condition: str, expected=None):
+        loaded_at = session['loaded_at']
+        if condition == 'invisible':
+            return element is None or not element.is_visible(loaded_at)
+        if element is None:
+            return False
+        if condition == 'visible':
+            return element.is_visible(loaded_at)
+        if condition == 'clickable':
+            return element.is_visible(loaded_at) and element.enabled
+        if condition == 'text':
+            return expected in element.shown_text(loaded_at)
+        if condition == 'value':
+            return expected in element.value
+        return True
+
+    def _lookup(self, session: dict, locator: str, index: int):
+        elements = self._elements(session, locator)
+        return elements[index] if index < len(elements) else None
+
+    @staticmethod
+    def _poll(check, timeout_ms: int):
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            done, result = check()
+            if done or time.monotonic() >= deadline:
+                return result
+            time.sleep(SERVER_POLL_INTERVAL)
+
+    def _script_resolve(self, session, locator, using, index, condition, timeout_ms, scroll, cached):
+        if isinstance(cached, StaleReference):
+            return {'element': None, 'ready': False, 'stale': True}
+
+        def check():
+            element = cached or self._lookup(session, locator, index)
+            ready = self._holds(session, element, condition)
+            return ready, {'element': self._wrap(element), 'ready': ready}
+
+        return self._poll(check, timeout_ms)
+
+    def _script_resolve_all(self, session, queries, condition, timeout_ms):
+        def check():
+            elements = [self._lookup(session, locator, index) for locator, _, index in queries]
+            ready = all(self._holds(session, element, condition) for element in elements)
+            return ready, {'elements': [self._wrap(element) for element in elements], 'ready': ready}
+
+        return self._poll(check, timeout_ms)
+
+    def _script_read(self, session, queries, fields, timeout_ms):
+        def check():
+            ready = all(any(self._holds(session, element, 'visible') for element in self._elements(session, locator))
+                        for locator, _ in queries)
+            return ready, ready
+
+        ready = self._poll(check, timeout_ms)
+        records = []
+        for locator, _ in queries:
+            for index, element in enumerate(self._elements(session, locator)):
+                record = {'locator': locator, 'index': index}
+                if fields.get('text'):
+                    record['text'] = element.shown_text(session['loaded_at'])
+                if fields.get('attributes'):
+                    record['attributes'] = {name: element.attribute(name) for name in fields['attributes']}
+                if fields.get('css'):
+                    record['css'] = {name: element.css.get(name, '') for name in fields['css']}
+                if fields.get('selected_option'):
+                    selected = [option.text for option in element.options if option.selected]
+                    record['selected_option'] = selected[0] if selected else None
+                records.append(record)
+        return {'ready': ready, 'records': records}
+
+    def _script_wait(self, session, conditions, timeout_ms, poll, mode='all'):
+        initial = [self._lookup(session, locator, index) if condition == 'stale' else None
+                   for locator, _, index, condition, _ in conditions]
+
+        def evaluate():
+            results = []
+            for (locator, _, index, condition, expected), element in zip(conditions, initial):
+                if condition == 'stale':
+                    results.append(element is None or element not in self._elements(session, locator))
+                else:
+                    results.append(self._holds(session, self._lookup(session, locator, index), condition, expected))
+            met = {'all': all, 'any': any, 'none': lambda values: not any(values)}[mode](results)
+            return met, {'satisfied': met, 'results': results}
+
+        started = time.monotonic()
+        result = self._poll(evaluate, timeout_ms)
+        return dict(result, elapsed=int((time.monotonic() - started) * 1000))
+
+    def _script_fill(self, session, fields, options, timeout_ms):
+        def check():
+            elements = [self._lookup(session, locator, index) for locator, _, index, _ in fields]
+            return all(self._holds(session, element, 'clickable') for element in elements), elements
+
+        elements = self._poll(check, timeout_ms)
+        ready = all(self._holds(session, element, 'clickable') for element in elements)
+        missing = [field[0] for field, element in zip(fields, elements) if element is None]
+        errors = []
+        if missing:
+            return {'ready': ready, 'missing': missing, 'errors': errors}
+        for (locator, _, _, value), element in zip(fields, elements):
+            if isinstance(value, bool):
+                element.selected = value
+            elif element.tag == 'select':
+                if value not in [option.text for option in element.options]:
+                    errors.append(f'{locator}: Option with text "{value}" not found')
+                for option in element.options:
+                    option.selected = option.text == value
+            else:
+                element.value = value if options.get('clear') else element.value + value
+        return {'ready': ready, 'missing': missing, 'errors': errors}
+
+
+class StaleReference:
+    # Stands in for an element argument whose page is gone
+    pass
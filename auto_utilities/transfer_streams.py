@@ -0,0 +1,282 @@
+import hashlib
+import io
+import itertools
+import os
+import time
+import uuid
+from typing import NamedTuple
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHECKSUM = 'sha256'
+
+
+class TransferResult(NamedTuple):
+    """
+    Outcome of a streamed upload or download: the response, bytes moved, wall time and checksum of the body.
+    """
+    response: requests.Response
+    bytes: int
+    seconds: float
+    checksum: str = None
+
+    @property
+    def throughput(self):
+        """
+        Bytes per second.
+        """
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class TransferMeter:
+    """
+    Counts the bytes of a transfer, reports progress and times it from the first to the last chunk.
+    """
+
+    def __init__(self, total: int = None, progress=None):
+        self.total = total
+        self.progress = progress
+        self.bytes = 0
+        self._started = None
+        self._finished = None
+
+    @property
+    def seconds(self):
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def _advance(self, chunk: bytes):
+        if self._started is None:
+            self._started = time.perf_counter()
+        self.bytes += len(chunk)
+        if self.progress:
+            self.progress(self.bytes, self.total)
+
+    def _finish(self):
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+
+class DownloadStream(TransferMeter):
+    """
+    Iterates the body of a streamed response in chunks of at most `chunk_size` bytes, hashing it on the fly, so a
+    download of any size only ever holds one chunk in memory.
+
+    Example:
+        >>> with ApiClient.stream_resource(f'{base_url}/exports/orders') as download:
+        ...     for chunk in download:
+        ...         parser.feed(chunk)
+        >>> download.checksum
+        '9f86d081884c7d65...'
+    """
+
+    def __init__(self, response: requests.Response, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 checksum: str = DEFAULT_CHECKSUM, progress=None):
+        length = response.headers.get('Content-Length')
+        super().__init__(int(length) if length and length.isdigit() else None, progress)
+        self.response = response
+        self.chunk_size = chunk_size
+        self._hash = hashlib.new(checksum) if checksum else None
+
+    def __iter__(self):
+        try:
+            for chunk in self.response.iter_content(self.chunk_size):
+                self._advance(chunk)
+                if self._hash:
+                    self._hash.update(chunk)
+                yield chunk
+        finally:
+            self._finish()
+            self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def checksum(self):
+        """
+        Hex digest of the bytes read so far; the checksum of the whole body once iteration finished.
+        """
+        return self._hash.hexdigest() if self._hash else None
+
+    @property
+    def result(self):
+        return TransferResult(self.response, self.bytes, self.seconds, self.checksum)
+
+    def save(self, destination):
+        """
+        Writes the body to a file path or a binary file object.
+
+        Returns:
+            TransferResult of the download.
+        """
+        if isinstance(destination, (str, os.PathLike)):
+            with open(destination, 'wb') as file:
+                return self.save(file)
+        for chunk in self:
+            destination.write(chunk)
+        return self.result
+
+    def close(self):
+        self._finish()
+        self.response.close()
+
+
+class UploadStream(TransferMeter):
+    """
+    Request body read from a file path, a binary file object, bytes or an iterable of bytes chunks.
+
+    Sources of known size are sent with a Content-Length, generators with chunked transfer encoding. Seekable
+    sources are rewound when a request is retried or redirected; consumed generators make such a retry fail with
+    UnrewindableBodyError instead of sending a truncated body.
+
+    Example:
+        >>> ApiClient.upload_resource(f'{base_url}/imports', UploadStream('/data/orders.csv'), method='POST')
+        >>> ApiClient.upload_resource(f'{base_url}/imports', (row.encode() for row in rows), method='POST')
+    """
+
+    def __init__(self, source, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        self.chunk_size = chunk_size
+        self._owned = isinstance(source, (str, os.PathLike))
+        if self._owned:
+            source = open(source, 'rb')
+        elif isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        self._file = source if hasattr(source, 'read') else None
+        self._chunks = None if self._file else iter(source)
+        self._buffer = b''
+        self._start = 0
+        # `len` (the size of the whole source) and `tell` are what requests uses to size the body
+        self.len = None
+        if self._file and getattr(self._file, 'seekable', lambda: False)():
+            self._start = self._file.tell()
+            self.len = self._file.seek(0, io.SEEK_END)
+            self._file.seek(self._start)
+        super().__init__(None if self.len is None else self.len - self._start, progress)
+
+    def read(self, size: int = -1):
+        """
+        Returns up to `size` bytes, or one chunk of at most `chunk_size` bytes when `size` is omitted.
+        """
+        if size is None or size < 0:
+            size = self.chunk_size
+        if self._file:
+            chunk = self._file.read(size)
+        else:
+            while len(self._buffer) < size and self._chunks is not None:
+                try:
+                    self._buffer += next(self._chunks)
+                except StopIteration:
+                    self._chunks = None
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        if chunk:
+            self._advance(chunk)
+        else:
+            self._finish()
+        return chunk
+
+    def __iter__(self):
+        chunk = self.read(self.chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.read(self.chunk_size)
+
+    def tell(self):
+        if self._file and self.len is not None:
+            return self._file.tell()
+        return self.bytes
+
+    def seekable(self):
+        return self.len is not None or self.bytes == 0
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        if self._file and self.len is not None:
+            position = self._file.seek(offset, whence)
+            self.bytes = position - self._start
+            return position
+        if whence == io.SEEK_SET and offset == self.bytes:
+            return offset
+        raise io.UnsupportedOperation('A consumed iterable upload source cannot be rewound')
+
+    def rewind(self):
+        return self.seek(self._start if self.len is not None else 0)
+
+    def close(self):
+        self._finish()
+        if self._owned and not self._file.closed:
+            self._file.close()
+
+
+class MultipartStream(TransferMeter):
+    """
+    Generator-based multipart/form-data encoder: parts are read from their sources chunk by chunk while the request is
+    sent, so files of any size are uploaded without being buffered.
+
+    Args:
+        fields: Dictionary or list of (name, value) pairs. A value is a string or bytes, or a file part given as
+            (filename, source) or (filename, source, content_type), where the source is anything UploadStream
+            accepts.
+        boundary: Multipart boundary (default: a random one).
+        chunk_size: Maximum size of the chunks read from file parts.
+        progress: Callable receiving (bytes_sent, total_bytes or None) after every chunk.
+
+    Example:
+        >>> body = MultipartStream({'description': 'nightly export',
+        ...                         'file': ('orders.csv', '/data/orders.csv', 'text/csv')})
+        >>> ApiClient.upload_resource(f'{base_url}/imports', body, method='POST')
+    """
+
+    def __init__(self, fields, boundary: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self._parts = []
+        for name, value in (fields.items() if isinstance(fields, dict) else fields):
+            if isinstance(value, tuple):
+                filename, source, *content_type = value
+                headers = (f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                           f'Content-Type: {content_type[0] if content_type else "application/octet-stream"}\r\n')
+            else:
+                source = value.encode() if isinstance(value, str) else value
+                headers = f'Content-Disposition: form-data; name="{name}"\r\n'
+            header = f'--{self.boundary}\r\n{headers}\r\n'.encode()
+            self._parts.append((header, UploadStream(source, chunk_size)))
+        self._closing = f'--{self.boundary}--\r\n'.encode()
+
+        sizes = [part.total for _, part in self._parts]
+        self.len = None if None in sizes else (sum(len(header) + 2 for header, _ in self._parts) + sum(sizes)
+                                               + len(self._closing))
+        super().__init__(self.len, progress)
+
+    def __iter__(self):
+        for header, part in self._parts:
+            for chunk in itertools.chain((header,), part, (b'\r\n',)):
+                self._advance(chunk)
+                yield chunk
+        self._advance(self._closing)
+        self._finish()
+        yield self._closing
+
+    def tell(self):
+        return self.bytes
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        if whence == io.SEEK_SET and offset == self.bytes:
+            return offset
+        if whence != io.SEEK_SET or offset != 0 or not all(part.seekable() for _, part in self._parts):
+            raise io.UnsupportedOperation('Multipart bodies can only be rewound to the start when every part is seekable')
+        for _, part in self._parts:
+            part.rewind()
+        self.bytes = 0
+        return 0
+
+    def close(self):
+        self._finish()
+        for _, part in self._parts:
+            part.close()
@@ -1,5 +1,12 @@
 import json
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import NamedTuple
+
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                                        WebDriverException)
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -7,15 +14,39 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.select import Select
 from selenium.webdriver.support.wait import WebDriverWait
 
+from auto_utilities.command_metrics import CommandRecorder
+from auto_utilities.element_cache import ElementCache
+from auto_utilities.locator_utility import AnyLocator, Locator, XPATH_PREFIXES
+from auto_utilities.page_scripts import FILL_FORM, READ_ELEMENTS, RESOLVE_ELEMENT, RESOLVE_ELEMENTS, WAIT_FOR_CONDITIONS
 from auto_utilities.webdriver_utility import CustomWebDriverManager
 
 DEFAULT_TIMEOUT = 10
+DEFAULT_SCRIPT_TIMEOUT = 30
+SCRIPT_TIMEOUT_MARGIN = 5
 IMAGE_FORMATS = {'png', 'jpeg'}
-XPATH_PREFIXES = ('/', '(/')
+
+# Minimum number of WebDriver commands issued by the wait + find + scroll path, keyed by (wait_for, scroll_to)
+LEGACY_ROUND_TRIPS = {
+    (None, False): 1,
+    (None, True): 3,
+    ('visible', False): 4,
+    ('visible', True): 6,
+    ('clickable', False): 4,
+    ('clickable', True): 6,
+}
+WAIT_TIMEOUT_MESSAGES = {
+    'visible': 'Element "{locator}" did not become visible within the timeout period',
+    'clickable': 'Element "{locator}" was not clickable within the timeout period',
+}
 
 
 class UIActions(CustomWebDriverManager):
 
+    script_resolution = True
+    resolution_stats = Counter()
+    _stats_lock = threading.Lock()
+    _script_timeouts = weakref.WeakKeyDictionary()
+
     @classmethod
     def capture_console_browser_errors(cls, level: str, display_err=False):
         driver = cls.get_active_driver()
@@ -28,16 +59,14 @@ class UIActions(CustomWebDriverManager):
         return False
 
     @classmethod
-    def clear_input(cls, locator: str, index: int = 0, timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        element.clear()
+    def clear_input(cls, locator: AnyLocator, index: int = None, timeout: int = None, scroll_options: dict = None):
+        cls._with_element(locator, lambda element: element.clear(), index, scroll_options=scroll_options,
+                          wait_for='clickable', timeout=timeout)
 
     @classmethod
-    def click_element(cls, locator: str, index: int = 0, timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        element.click()
+    def click_element(cls, locator: AnyLocator, index: int = None, timeout: int = None, scroll_options: dict = None):
+        cls._with_element(locator, lambda element: element.click(), index, scroll_options=scroll_options,
+                          wait_for='clickable', timeout=timeout)
 
     @classmethod
     def click_partial_link(cls, partial_text: str):
@@ -45,8 +74,8 @@ class UIActions(CustomWebDriverManager):
         element.click()
 
     @classmethod
-    def perform_mouse_click(cls, click_action: str, locator: str = None, x_offset: float = 0, y_offset: float = 0,
-                            reset_position: bool = True, reset_actions: bool = True):
+    def perform_mouse_click(cls, click_action: str, locator: AnyLocator = None, x_offset: float = 0,
+                            y_offset: float = 0, reset_position: bool = True, reset_actions: bool = True):
         cls.move_mouse(locator, x_offset, y_offset, reset_actions=False)
         actions = ActionChains(cls.active_driver)
 
@@ -68,34 +97,132 @@ class UIActions(CustomWebDriverManager):
             actions.reset_actions()
 
     @classmethod
-    def delete_input(cls, locator: str, index: int = 0, timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        text_content = element.text or element.get_attribute('value')
-        for _ in text_content:
-            element.send_keys(Keys.BACKSPACE)
+    def delete_input(cls, locator: AnyLocator, index: int = None, timeout: int = None, scroll_options: dict = None):
+        def delete(element):
+            text_content = element.text or element.get_attribute('value')
+            if text_content:
+                element.send_keys(Keys.BACKSPACE * len(text_content))
 
-    @classmethod
-    def capture_element_screenshot(cls, locator: str, index: int = 0, scroll_options: dict = None,
-                                   as_base64: bool = True, image_path: str = None):
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        if image_path:
-            return element.screenshot(image_path)
-        elif as_base64:
-            return element.screenshot_as_base64
-        else:
-            return element.screenshot_as_png
+        cls._with_element(locator, delete, index, scroll_options=scroll_options, wait_for='clickable',
+                          timeout=timeout)
 
     @classmethod
-    def enter_text(cls, locator: str, text: str, index: int = 0, click_first: bool = True, clear_first: bool = True,
-                   timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        if click_first:
-            element.click()
-        if clear_first:
-            element.clear()
-        element.send_keys(text)
+    def capture_element_screenshot(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None,
+                                   as_base64: bool = True, image_path: str = None):
+        def capture(element):
+            if image_path:
+                return element.screenshot(image_path)
+            elif as_base64:
+                return element.screenshot_as_base64
+            else:
+                return element.screenshot_as_png
+
+        return cls._with_element(locator, capture, index, scroll_options=scroll_options)
+
+    @classmethod
+    def enter_text(cls, locator: AnyLocator, text: str, index: int = None, click_first: bool = True,
+                   clear_first: bool = True, timeout: int = None, scroll_options: dict = None):
+        def type_text(element):
+            if click_first:
+                element.click()
+            if clear_first:
+                element.clear()
+            element.send_keys(text)
+
+        cls._with_element(locator, type_text, index, scroll_options=scroll_options, wait_for='clickable',
+                          timeout=timeout)
+
+    @classmethod
+    def fill_form(cls, fields: dict, clear_first: bool = True, click_first: bool = False, timeout: int = None,
+                  use_keyboard: bool = False):
+        # Fills every field of {locator: value} in one script call: text values go through the native value setter
+        # followed by input/change events, selects pick the option with the given text and booleans set checkboxes.
+        # The script writes nothing unless every field is found. With use_keyboard the values are typed instead, as
+        # a single W3C Actions payload (see ActionPipeline)
+        if not fields:
+            return
+        if use_keyboard:
+            pipeline = cls.pipeline()
+            for locator, value in fields.items():
+                if isinstance(value, bool):
+                    raise ValueError('Checkbox values are not supported with use_keyboard; use click() steps')
+                pipeline.type(locator, value, clear_first=clear_first)
+            pipeline.perform(timeout)
+            return
+
+        locators = list(map(Locator.of, fields))
+        if timeout is None:
+            # The form waits for all its fields, so it gets the longest timeout any of their locators asks for
+            timeout = max(locator.resolve(default_timeout=DEFAULT_TIMEOUT)[1] for locator in locators)
+        if not cls.script_resolution:
+            cls._fill_fields_individually(fields, clear_first, click_first, timeout)
+            return
+
+        driver = cls.active_driver
+        queries = [[locator.value, locator.by, locator.resolve()[0], value]
+                   for locator, value in zip(locators, fields.values())]
+        try:
+            extra_round_trips = cls._ensure_script_timeout(driver, timeout)
+            result = driver.execute_async_script(FILL_FORM, queries, {'clear': clear_first, 'click': click_first},
+                                                 int(timeout * 1000))
+        except WebDriverException:
+            cls._count_resolution('fallbacks')
+            cls._fill_fields_individually(fields, clear_first, click_first, timeout)
+            return
+
+        cls._count_resolution('script_resolutions')
+        legacy_round_trips = (LEGACY_ROUND_TRIPS[('clickable', True)] + 1 + click_first + clear_first) * len(fields)
+        cls._count_resolution('round_trips_saved', legacy_round_trips - 1 - extra_round_trips)
+        if not result['ready']:
+            print(WAIT_TIMEOUT_MESSAGES['clickable'].format(locator=', '.join(map(str, locators))))
+        if result['missing']:
+            raise NoSuchElementException(f"No element found for locators {result['missing']}")
+        if result['errors']:
+            raise ValueError('; '.join(result['errors']))
+
+    @classmethod
+    def _fill_fields_individually(cls, fields: dict, clear_first: bool, click_first: bool, timeout: int):
+        for locator, value in fields.items():
+            if isinstance(value, bool):
+                if cls.is_element_selected(locator) != value:
+                    cls.click_element(locator, timeout=timeout)
+            elif cls._with_element(locator, lambda element: element.tag_name, wait_for='visible',
+                                   timeout=timeout) == 'select':
+                cls.select_option_by_text(locator, value, timeout=timeout)
+            else:
+                cls.enter_text(locator, value, click_first=click_first, clear_first=clear_first, timeout=timeout)
+
+    @classmethod
+    def pipeline(cls):
+        # Starts an ActionPipeline on the active driver, e.g.
+        # UIActions.pipeline().type(username, 'user').type(password, 'secret').click(submit).perform()
+        return ActionPipeline(cls.active_driver)
+
+    @classmethod
+    def _resolve_elements(cls, targets: list, wait_for: str = 'clickable', timeout: int = None):
+        # Resolves [(Locator, index)] targets with one script call, falling back to one lookup per target
+        driver = cls.active_driver
+        if targets and cls.script_resolution:
+            _, timeout = targets[0][0].resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+            queries = [[locator.value, locator.by, index] for locator, index in targets]
+            try:
+                extra_round_trips = cls._ensure_script_timeout(driver, timeout)
+                result = driver.execute_async_script(RESOLVE_ELEMENTS, queries, wait_for, int(timeout * 1000))
+            except WebDriverException:
+                cls._count_resolution('fallbacks')
+            else:
+                cls._count_resolution('script_resolutions')
+                cls._count_resolution('round_trips_saved',
+                                      (LEGACY_ROUND_TRIPS[(wait_for, False)] * len(targets)) - 1 - extra_round_trips)
+                if not result['ready']:
+                    print(WAIT_TIMEOUT_MESSAGES[wait_for].format(locator=', '.join(str(t[0]) for t in targets)))
+                missing = [str(locator) for (locator, _), element in zip(targets, result['elements'])
+                           if element is None]
+                if missing:
+                    raise NoSuchElementException(f"No element found for locators {missing}")
+                return result['elements']
+        return [cls._find_element(locator, index=index, scroll_to=False, wait_for=wait_for, timeout=timeout)
+                for locator, index in targets]
 
     @classmethod
     def type_at_offset(cls, text: str, x_offset: float = 0, y_offset: float = 0, reset_actions: bool = True):
@@ -107,90 +234,229 @@ class UIActions(CustomWebDriverManager):
             actions.reset_actions()
 
     @classmethod
-    def run_script(cls, script: str, locator: str = None, timeout: int = DEFAULT_TIMEOUT, index: int = 0,
+    def run_script(cls, script: str, locator: AnyLocator = None, timeout: int = None, index: int = None,
                    scroll_options: dict = None):
         if locator:
-            UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
-            element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-            return cls.active_driver.execute_script(script, element)
+            return cls._with_element(locator, lambda element: cls.active_driver.execute_script(script, element), index,
+                                     scroll_options=scroll_options, wait_for='clickable', timeout=timeout)
         else:
             return cls.active_driver.execute_script(script)
 
     @classmethod
-    def get_element_attribute(cls, locator: str, attribute: str, all_elements: bool = False, index: int = 0,
-                              timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
-        elements = cls._find_elements(locator)
+    def get_element_attribute(cls, locator: AnyLocator, attribute: str, all_elements: bool = False, index: int = None,
+                              timeout: int = None, scroll_options: dict = None):
         if all_elements:
-            return [el.get_attribute(attribute) for el in elements]
-        else:
-            element = elements[index]
-            return element.get_attribute(attribute)
+            records = cls.read_elements(locator, attributes=[attribute], timeout=timeout)
+            return [record['attributes'][attribute] for record in records]
+        return cls._with_element(locator, lambda element: element.get_attribute(attribute), index, scroll_to=False,
+                                 wait_for='visible', timeout=timeout)
 
     @classmethod
-    def get_element_location(cls, locator: str, scroll_to: bool = True, scroll_options: dict = None):
-        element = cls._find_element(locator, scroll_to=scroll_to, scroll_options=scroll_options)
-        return element.location
+    def get_element_location(cls, locator: AnyLocator, scroll_to: bool = True, scroll_options: dict = None):
+        return cls._with_element(locator, lambda element: element.location, scroll_to=scroll_to,
+                                 scroll_options=scroll_options)
 
     @classmethod
-    def get_css_property(cls, locator: str, property_name: str, all_elements: bool = False, index: int = 0,
-                         timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
-        elements = cls._find_elements(locator)
+    def get_css_property(cls, locator: AnyLocator, property_name: str, all_elements: bool = False, index: int = None,
+                         timeout: int = None, scroll_options: dict = None):
         if all_elements:
-            return [el.value_of_css_property(property_name) for el in elements]
-        else:
-            element = elements[index]
-            return element.value_of_css_property(property_name)
-
-    @classmethod
-    def _find_elements(cls, locator: str):
-        by = By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
-        elements = cls.active_driver.find_elements(by, locator)
+            records = cls.read_elements(locator, css_properties=[property_name], timeout=timeout)
+            return [record['css'][property_name] for record in records]
+        return cls._with_element(locator, lambda element: element.value_of_css_property(property_name), index,
+                                 scroll_to=False, wait_for='visible', timeout=timeout)
+
+    @classmethod
+    def read_elements(cls, locators, text: bool = False, attributes: list = None, css_properties: list = None,
+                      selected_option: bool = False, timeout: int = None):
+        # Returns one record per matched element, e.g. {'locator': ..., 'index': 0, 'text': ..., 'attributes': {...},
+        # 'css': {...}, 'selected_option': ...}, holding only the requested fields
+        locators = [Locator.of(locators)] if isinstance(locators, (str, Locator)) else list(map(Locator.of, locators))
+        _, timeout = locators[0].resolve(timeout=timeout, default_timeout=DEFAULT_TIMEOUT)
+        fields = {'text': text, 'attributes': attributes or [], 'css': css_properties or [],
+                  'selected_option': selected_option}
+        if cls.script_resolution:
+            try:
+                return cls._read_elements_in_page(locators, fields, timeout)
+            except WebDriverException:
+                cls._count_resolution('fallbacks')
+        return cls._read_elements_individually(locators, fields, timeout)
+
+    @classmethod
+    def _read_elements_in_page(cls, locators: list, fields: dict, timeout: int):
+        driver = cls.active_driver
+        queries = [[locator.value, locator.by] for locator in locators]
+        cls._ensure_script_timeout(driver, timeout)
+        result = driver.execute_async_script(READ_ELEMENTS, queries, fields, int(timeout * 1000))
+        if not result['ready']:
+            print(WAIT_TIMEOUT_MESSAGES['visible'].format(locator=', '.join(map(str, locators))))
+        return result['records']
+
+    @classmethod
+    def _read_elements_individually(cls, locators: list, fields: dict, timeout: int):
+        records = []
+        for locator in locators:
+            UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
+            for index, element in enumerate(cls._find_elements(locator)):
+                record = {'locator': locator.value, 'index': index}
+                if fields['text']:
+                    record['text'] = element.text
+                if fields['attributes']:
+                    record['attributes'] = {name: element.get_attribute(name) for name in fields['attributes']}
+                if fields['css']:
+                    record['css'] = {name: element.value_of_css_property(name) for name in fields['css']}
+                if fields['selected_option']:
+                    record['selected_option'] = Select(element).first_selected_option.text
+                records.append(record)
+        return records
+
+    @classmethod
+    def _find_elements(cls, locator: AnyLocator):
+        elements = cls.active_driver.find_elements(*Locator.of(locator).as_tuple())
         return elements
 
     @classmethod
-    def _find_element(cls, locator: str, index: int = 0, scroll_to: bool = True, scroll_options: dict = None):
-        elements = cls._find_elements(locator)
-        if scroll_to:
-            cls.scroll_to_view(locator, index, scroll_options)
+    def _find_element(cls, locator: AnyLocator, index: int = None, scroll_to: bool = True, scroll_options: dict = None,
+                      wait_for: str = None, timeout: int = None):
+        locator = Locator.of(locator)
+        index, timeout = locator.resolve(index, timeout, DEFAULT_TIMEOUT)
+        driver = cls.active_driver
+        cached = ElementCache.get(driver, locator, index) if ElementCache.enabled else None
+        if cached is not None and not wait_for and not scroll_to:
+            return cached
+
         try:
-            return elements[index]
-        except IndexError:
+            element = cls._locate_element(locator, index, scroll_to, scroll_options, wait_for, timeout, cached)
+        except StaleElementReferenceException:
+            if cached is None:
+                raise
+            ElementCache.discard(driver, locator, index)
+            element = cls._locate_element(locator, index, scroll_to, scroll_options, wait_for, timeout)
+
+        if ElementCache.enabled:
+            ElementCache.put(driver, locator, index, element)
+        return element
+
+    @classmethod
+    def _locate_element(cls, locator: Locator, index: int, scroll_to: bool, scroll_options: dict, wait_for: str,
+                        timeout: int, cached=None):
+        # Wait, lookup and scroll run in the page as a single script call; the separate WebDriver commands are only
+        # issued when the script cannot run
+        if cls.script_resolution:
+            try:
+                return cls._resolve_element(locator, index, scroll_to, scroll_options, wait_for, timeout, cached)
+            except (NoSuchElementException, StaleElementReferenceException):
+                raise
+            except WebDriverException:
+                cls._count_resolution('fallbacks')
+
+        if wait_for == 'clickable':
+            UIWaits.wait_until_clickable(locator, timeout, ignore_timeout=True)
+        elif wait_for == 'visible':
+            UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
+
+        if cached is not None:
+            element = cached
+        else:
+            elements = cls._find_elements(locator)
+            try:
+                element = elements[index]
+            except IndexError:
+                raise NoSuchElementException(f"No element found for locator '{locator}' at index {index}")
+        if scroll_to:
+            cls._scroll_element(element, scroll_options)
+        return element
+
+    @classmethod
+    def _resolve_element(cls, locator: Locator, index: int, scroll_to: bool, scroll_options: dict, wait_for: str,
+                         timeout: int, cached=None):
+        driver = cls.active_driver
+        wait_ms = int(timeout * 1000) if wait_for else 0
+        scroll = (scroll_options or True) if scroll_to else None
+        extra_round_trips = cls._ensure_script_timeout(driver, timeout if wait_for else 0)
+
+        result = driver.execute_async_script(RESOLVE_ELEMENT, locator.value, locator.by, index, wait_for or 'present',
+                                             wait_ms, scroll, cached)
+        cls._count_resolution('script_resolutions')
+        cls._count_resolution('round_trips_saved', LEGACY_ROUND_TRIPS[(wait_for, scroll_to)] - 1 - extra_round_trips)
+
+        if result.get('stale'):
+            raise StaleElementReferenceException(f"Cached element for locator '{locator}' at index {index} is stale")
+        if wait_for and not result['ready']:
+            print(WAIT_TIMEOUT_MESSAGES[wait_for].format(locator=locator))
+        if result['element'] is None:
             raise NoSuchElementException(f"No element found for locator '{locator}' at index {index}")
+        return result['element']
 
     @classmethod
-    def count_elements(cls, locator: str):
+    def _with_element(cls, locator: AnyLocator, action, index: int = None, **find_kwargs):
+        # Runs `action` on the resolved element; with the element cache enabled, an element that went stale between
+        # lookup and action is resolved again once
+        locator = Locator.of(locator)
+        index, _ = locator.resolve(index)
+        element = cls._find_element(locator, index=index, **find_kwargs)
+        if not ElementCache.enabled:
+            return action(element)
+        try:
+            return action(element)
+        except StaleElementReferenceException:
+            ElementCache.discard(cls.active_driver, locator, index)
+            return action(cls._find_element(locator, index=index, **find_kwargs))
+
+    @classmethod
+    def _ensure_script_timeout(cls, driver, timeout: int):
+        # Returns the number of extra WebDriver commands issued
+        required = timeout + SCRIPT_TIMEOUT_MARGIN
+        with cls._stats_lock:
+            if cls._script_timeouts.get(driver, DEFAULT_SCRIPT_TIMEOUT) >= required:
+                return 0
+        driver.set_script_timeout(required)
+        with cls._stats_lock:
+            cls._script_timeouts[driver] = required
+        return 1
+
+    @classmethod
+    def _count_resolution(cls, name: str, amount: int = 1):
+        with cls._stats_lock:
+            cls.resolution_stats[name] += amount
+
+    @classmethod
+    def get_resolution_stats(cls):
+        with cls._stats_lock:
+            return dict(cls.resolution_stats)
+
+    @classmethod
+    def reset_resolution_stats(cls):
+        with cls._stats_lock:
+            cls.resolution_stats.clear()
+
+    @classmethod
+    def count_elements(cls, locator: AnyLocator):
         elements = cls._find_elements(locator)
         return len(elements)
 
     @classmethod
-    def get_selected_option_text(cls, locator: str, all_elements: bool = False, index: int = 0,
-                                 timeout: int = DEFAULT_TIMEOUT, scroll_options: dict = None):
-        UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
-        elements = cls._find_elements(locator)
+    def get_selected_option_text(cls, locator: AnyLocator, all_elements: bool = False, index: int = None,
+                                 timeout: int = None, scroll_options: dict = None):
         if all_elements:
-            return [Select(el).first_selected_option.text for el in elements]
-        else:
-            element = elements[index]
-            return Select(element).first_selected_option.text
+            records = cls.read_elements(locator, selected_option=True, timeout=timeout)
+            return [record['selected_option'] for record in records]
+        return cls._with_element(locator, lambda element: Select(element).first_selected_option.text, index,
+                                 scroll_to=False, wait_for='visible', timeout=timeout)
 
     @classmethod
-    def get_element_text(cls, locator: str, all_elements: bool = False, index: int = 0, timeout: int = DEFAULT_TIMEOUT,
+    def get_element_text(cls, locator: AnyLocator, all_elements: bool = False, index: int = None, timeout: int = None,
                          scroll_options: dict = None):
-        UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
-        elements = cls._find_elements(locator)
         if all_elements:
-            return [el.text for el in elements]
-        else:
-            element = elements[index]
-            return element.text
+            records = cls.read_elements(locator, text=True, timeout=timeout)
+            return [record['text'] for record in records]
+        return cls._with_element(locator, lambda element: element.text, index, scroll_to=False, wait_for='visible',
+                                 timeout=timeout)
 
     @classmethod
-    def is_element_displayed(cls, locator: str, index: int = 0, scroll_options: dict = None):
+    def is_element_displayed(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
         try:
-            element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-            return element.is_displayed()
+            return cls._with_element(locator, lambda element: element.is_displayed(), index,
+                                     scroll_options=scroll_options)
         except NoSuchElementException:
             return False
 
@@ -204,19 +470,18 @@ class UIActions(CustomWebDriverManager):
             return False
 
     @classmethod
-    def is_element_selected(cls, locator: str, index: int = 0, scroll_options: dict = None):
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        return element.is_selected()
+    def is_element_selected(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        return cls._with_element(locator, lambda element: element.is_selected(), index, scroll_options=scroll_options)
 
     @classmethod
-    def move_mouse(cls, locator: str = None, x_offset: float = 0, y_offset: float = 0, reset_actions: bool = True):
+    def move_mouse(cls, locator: AnyLocator = None, x_offset: float = 0, y_offset: float = 0,
+                   reset_actions: bool = True):
         actions = ActionChains(cls.active_driver)
         if locator and x_offset:
-            element = cls._find_element(locator, scroll_to=False)
-            actions.move_to_element_with_offset(element, x_offset, y_offset).perform()
+            cls._with_element(locator, lambda element: actions.move_to_element_with_offset(
+                element, x_offset, y_offset).perform(), scroll_to=False)
         elif locator:
-            element = cls._find_element(locator, scroll_to=False)
-            actions.move_to_element(element).perform()
+            cls._with_element(locator, lambda element: actions.move_to_element(element).perform(), scroll_to=False)
         else:
             actions.move_by_offset(x_offset, y_offset).perform()
 
@@ -235,28 +500,29 @@ class UIActions(CustomWebDriverManager):
         actions.reset_actions()
 
     @classmethod
-    def scroll_to_view(cls, locator: str, index: int = 0, scroll_options: dict = None):
-        element = cls._find_element(locator, index=index, scroll_to=False)
+    def scroll_to_view(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
+        cls._find_element(locator, index=index, scroll_options=scroll_options)
+
+    @classmethod
+    def _scroll_element(cls, element, scroll_options: dict = None):
         script = "arguments[0].scrollIntoView();"
         if scroll_options:
             script = f"arguments[0].scrollIntoView({json.dumps(scroll_options)});"
         cls.active_driver.execute_script(script, element)
 
     @classmethod
-    def select_option_by_text(cls, locator: str, option_text: str, index: int = 0, timeout: int = DEFAULT_TIMEOUT,
+    def select_option_by_text(cls, locator: AnyLocator, option_text: str, index: int = None, timeout: int = None,
                               scroll_options: dict = None):
-        UIWaits.wait_until_visible(locator, timeout, ignore_timeout=True)
-        element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-        Select(element).select_by_visible_text(option_text)
+        cls._with_element(locator, lambda element: Select(element).select_by_visible_text(option_text), index,
+                          scroll_options=scroll_options, wait_for='visible', timeout=timeout)
 
     @classmethod
-    def select_option_matching_text(cls, dropdown_locator: str, options_locator: str, text: str, index: int = 0,
-                                    click_dropdown: bool = True, timeout: int = DEFAULT_TIMEOUT,
+    def select_option_matching_text(cls, dropdown_locator: AnyLocator, options_locator: AnyLocator, text: str,
+                                    index: int = None, click_dropdown: bool = True, timeout: int = None,
                                     scroll_options: dict = None):
         if click_dropdown:
-            UIWaits.wait_until_visible(dropdown_locator, timeout, ignore_timeout=True)
-            dropdown_element = cls._find_element(dropdown_locator, index=index, scroll_options=scroll_options)
-            dropdown_element.click()
+            cls._with_element(dropdown_locator, lambda element: element.click(), index, scroll_options=scroll_options,
+                              wait_for='visible', timeout=timeout)
 
         options = cls._find_elements(f'{dropdown_locator}{options_locator}')
         for option in options:
@@ -266,28 +532,113 @@ class UIActions(CustomWebDriverManager):
         raise ValueError(f'Option with text "{text}" not found')
 
     @classmethod
-    def is_element_enabled(cls, locator: str, index: int = 0, scroll_options: dict = None):
+    def is_element_enabled(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
         try:
-            element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-            return element.is_enabled()
+            return cls._with_element(locator, lambda element: element.is_enabled(), index,
+                                     scroll_options=scroll_options)
         except NoSuchElementException:
             return False
 
     @classmethod
-    def is_element_focused(cls, locator: str, index: int = 0, scroll_options: dict = None):
+    def is_element_focused(cls, locator: AnyLocator, index: int = None, scroll_options: dict = None):
         try:
-            element = cls._find_element(locator, index=index, scroll_options=scroll_options)
-            return element == cls.active_driver.switch_to.active_element
+            return cls._with_element(locator, lambda element: element == cls.active_driver.switch_to.active_element,
+                                     index, scroll_options=scroll_options)
         except NoSuchElementException:
             return False
 
 
+class ActionPipeline:
+    # Queues clicks, typing, selects and key presses and sends them to the browser as one W3C Actions payload:
+    # every target element is resolved with a single script call, then everything runs in one `perform`.
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._steps = []
+
+    def click(self, locator: AnyLocator, index: int = None):
+        return self._queue('click', locator, index)
+
+    def type(self, locator: AnyLocator, text: str, index: int = None, clear_first: bool = False):
+        return self._queue('clear_and_type' if clear_first else 'type', locator, index, text)
+
+    def select(self, locator: AnyLocator, option_text: str, index: int = None):
+        # Picks the option by typing its text into the focused select, as a user navigating by keyboard would
+        return self._queue('select', locator, index, option_text)
+
+    def press(self, key: str, modifier_key: str = None):
+        return self._queue('press', value=(key, modifier_key))
+
+    def pause(self, seconds: float):
+        return self._queue('pause', value=seconds)
+
+    def perform(self, timeout: int = None):
+        targets = list(dict.fromkeys(target for _, target, _ in self._steps if target is not None))
+        # Targets are resolved in the pipeline's browser, which need not be the active driver
+        with UIActions.use_driver(self.driver):
+            elements = dict(zip(targets, UIActions._resolve_elements(targets, timeout=timeout)))
+
+        actions = ActionChains(self.driver)
+        for step, target, value in self._steps:
+            element = elements[target] if target is not None else None
+            if element is not None:
+                actions.scroll_to_element(element).click(element)
+            if step in ('type', 'clear_and_type', 'select'):
+                if step == 'clear_and_type':
+                    actions.key_down(self._select_all_modifier()).send_keys('a').key_up(self._select_all_modifier())
+                    actions.send_keys(Keys.BACKSPACE)
+                actions.send_keys(value)
+                if step == 'select':
+                    actions.send_keys(Keys.ENTER)
+            elif step == 'press':
+                key, modifier_key = value
+                if modifier_key:
+                    modifier = getattr(Keys, modifier_key.upper())
+                    actions.key_down(modifier).send_keys(getattr(Keys, key.upper(), key)).key_up(modifier)
+                else:
+                    actions.send_keys(getattr(Keys, key.upper(), key))
+            elif step == 'pause':
+                actions.pause(value)
+        actions.perform()
+        self._steps.clear()
+
+    def _queue(self, step: str, locator: AnyLocator = None, index: int = None, value=None):
+        target = None
+        if locator is not None:
+            locator = Locator.of(locator)
+            target = (locator, locator.resolve(index)[0])
+        self._steps.append((step, target, value))
+        return self
+
+    def _select_all_modifier(self):
+        platform = (self.driver.capabilities.get('platformName') or '').lower()
+        return Keys.COMMAND if platform.startswith('mac') else Keys.CONTROL
+
+
+class WaitCondition(NamedTuple):
+    # One sub-condition of UIWaits.any_of / all_of / none_of, e.g. UIWaits.visible(locator)
+    locator: Locator
+    kind: str
+    expected: str = None
+
+    def __str__(self):
+        return f'{self.kind} "{self.locator}"' + (f' ("{self.expected}")' if self.expected is not None else '')
+
+
 class UIWaits(CustomWebDriverManager):
 
+    # Waits resolve in the page as soon as the condition holds (see WAIT_FOR_CONDITIONS); the WebDriverWait polling
+    # below is only used when the script cannot run. Intervals are in seconds and apply to both paths.
+    event_driven = True
+    poll_interval = 0.1
+    poll_backoff = 1.5
+    max_poll_interval = 1.0
+
     @classmethod
     def wait_until_alert_present(cls, timeout: int = DEFAULT_TIMEOUT, ignore_timeout: bool = False):
         try:
-            WebDriverWait(cls.active_driver, timeout).until(EC.alert_is_present())
+            with CommandRecorder.phase('wait'):
+                WebDriverWait(cls.active_driver, timeout, poll_frequency=cls.poll_interval).until(EC.alert_is_present())
         except TimeoutException:
             if ignore_timeout:
                 print('Alert did not appear within the timeout period')
@@ -295,11 +646,10 @@ class UIWaits(CustomWebDriverManager):
                 raise
 
     @classmethod
-    def wait_until_visible(cls, locator: str, timeout: int = DEFAULT_TIMEOUT, ignore_timeout: bool = False):
-        by = By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
+    def wait_until_visible(cls, locator: AnyLocator, timeout: int = None, ignore_timeout: bool = False):
+        locator = Locator.of(locator)
         try:
-            WebDriverWait(cls.active_driver, timeout).until(EC.presence_of_element_located((by, locator)))
-            WebDriverWait(cls.active_driver, timeout).until(EC.visibility_of_element_located((by, locator)))
+            cls._wait_for([cls.visible(locator)], 'all', timeout)
         except TimeoutException:
             if ignore_timeout:
                 print(f'Element "{locator}" did not become visible within the timeout period')
@@ -307,10 +657,10 @@ class UIWaits(CustomWebDriverManager):
                 raise
 
     @classmethod
-    def wait_until_clickable(cls, locator: str, timeout: int = DEFAULT_TIMEOUT, ignore_timeout: bool = False):
-        by = By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
+    def wait_until_clickable(cls, locator: AnyLocator, timeout: int = None, ignore_timeout: bool = False):
+        locator = Locator.of(locator)
         try:
-            WebDriverWait(cls.active_driver, timeout).until(EC.element_to_be_clickable((by, locator)))
+            cls._wait_for([cls.clickable(locator)], 'all', timeout)
         except TimeoutException:
             if ignore_timeout:
                 print(f'Element "{locator}" was not clickable within the timeout period')
@@ -318,29 +668,27 @@ class UIWaits(CustomWebDriverManager):
                 raise
 
     @classmethod
-    def wait_until_stale(cls, locator: str, timeout: int = DEFAULT_TIMEOUT):
+    def wait_until_stale(cls, locator: AnyLocator, timeout: int = None):
+        locator = Locator.of(locator)
         try:
-            element = cls.active_driver.find_element(By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR,
-                                              locator)
-            WebDriverWait(cls.active_driver, timeout).until(EC.staleness_of(element))
+            cls._wait_for([cls.stale(locator)], 'all', timeout)
         except (NoSuchElementException, AttributeError, TimeoutException):
             print(f'Element "{locator}" did not become stale within the timeout period')
 
     @classmethod
-    def wait_until_invisible(cls, locator: str, timeout: int = DEFAULT_TIMEOUT):
+    def wait_until_invisible(cls, locator: AnyLocator, timeout: int = None):
+        locator = Locator.of(locator)
         try:
-            element = cls.active_driver.find_element(By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR,
-                                              locator)
-            WebDriverWait(cls.active_driver, timeout).until(EC.invisibility_of_element(element))
+            cls._wait_for([cls.invisible(locator)], 'all', timeout)
         except (NoSuchElementException, AttributeError, TimeoutException):
             print(f'Element "{locator}" did not become invisible within the timeout period')
 
     @classmethod
-    def wait_until_text_present(cls, locator: str, text: str, timeout: int = DEFAULT_TIMEOUT,
+    def wait_until_text_present(cls, locator: AnyLocator, text: str, timeout: int = None,
                                 ignore_timeout: bool = False):
-        by = By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
+        locator = Locator.of(locator)
         try:
-            WebDriverWait(cls.active_driver, timeout).until(EC.text_to_be_present_in_element((by, locator), text))
+            cls._wait_for([cls.text_present(locator, text)], 'all', timeout)
         except TimeoutException:
             if ignore_timeout:
                 print(f'Text "{text}" not present in element "{locator}" within the timeout period')
@@ -348,17 +696,153 @@ class UIWaits(CustomWebDriverManager):
                 raise
 
     @classmethod
-    def wait_until_value_present(cls, locator: str, value: str, timeout: int = DEFAULT_TIMEOUT,
+    def wait_until_value_present(cls, locator: AnyLocator, value: str, timeout: int = None,
                                  ignore_timeout: bool = False):
-        by = By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR
+        locator = Locator.of(locator)
         try:
-            WebDriverWait(cls.active_driver, timeout).until(EC.text_to_be_present_in_element_value((by, locator), value))
+            cls._wait_for([cls.value_present(locator, value)], 'all', timeout)
         except TimeoutException:
             if ignore_timeout:
                 print(f'Value "{value}" not present in element "{locator}" within the timeout period')
             else:
                 raise
 
+    # Sub-conditions for any_of / all_of / none_of
+
+    @classmethod
+    def present(cls, locator: AnyLocator):
+        return WaitCondition(Locator.of(locator), 'present')
+
+    @classmethod
+    def visible(cls, locator: AnyLocator):
+        return WaitCondition(Locator.of(locator), 'visible')
+
+    @classmethod
+    def clickable(cls, locator: AnyLocator):
+        return WaitCondition(Locator.of(locator), 'clickable')
+
+    @classmethod
+    def invisible(cls, locator: AnyLocator):
+        return WaitCondition(Locator.of(locator), 'invisible')
+
+    @classmethod
+    def stale(cls, locator: AnyLocator):
+        return WaitCondition(Locator.of(locator), 'stale')
+
+    @classmethod
+    def text_present(cls, locator: AnyLocator, text: str):
+        return WaitCondition(Locator.of(locator), 'text', text)
+
+    @classmethod
+    def value_present(cls, locator: AnyLocator, value: str):
+        return WaitCondition(Locator.of(locator), 'value', value)
+
+    @classmethod
+    def any_of(cls, *conditions: WaitCondition, timeout: int = None, ignore_timeout: bool = False):
+        # Waits until at least one condition holds and returns the first one that does, e.g.
+        # UIWaits.any_of(UIWaits.visible(error_text), UIWaits.visible(home_feed), timeout=30)
+        try:
+            results = cls._wait_for(conditions, 'any', timeout)
+        except TimeoutException:
+            if ignore_timeout:
+                print(f'None of {", ".join(map(str, conditions))} was met within the timeout period')
+                return None
+            raise
+        return next(condition for condition, result in zip(conditions, results) if result)
+
+    @classmethod
+    def all_of(cls, *conditions: WaitCondition, timeout: int = None, ignore_timeout: bool = False):
+        try:
+            cls._wait_for(conditions, 'all', timeout)
+            return True
+        except TimeoutException:
+            if ignore_timeout:
+                print(f'Not all of {", ".join(map(str, conditions))} were met within the timeout period')
+                return False
+            raise
+
+    @classmethod
+    def none_of(cls, *conditions: WaitCondition, timeout: int = None, ignore_timeout: bool = False):
+        try:
+            cls._wait_for(conditions, 'none', timeout)
+            return True
+        except TimeoutException:
+            if ignore_timeout:
+                print(f'Some of {", ".join(map(str, conditions))} still held after the timeout period')
+                return False
+            raise
+
+    @classmethod
+    def _wait_for(cls, conditions, mode: str, timeout: int = None):
+        # Waits on every condition against one shared deadline and returns one boolean per condition; raises
+        # TimeoutException when the conditions are not met in time
+        with CommandRecorder.phase('wait'):
+            return cls._wait_for_conditions(list(conditions), mode, timeout)
+
+    @classmethod
+    def _wait_for_conditions(cls, conditions: list, mode: str, timeout: int = None):
+        if timeout is None:
+            timeout = max(condition.locator.resolve(default_timeout=DEFAULT_TIMEOUT)[1] for condition in conditions)
+        # The in-page attempt and the WebDriverWait fallback share one deadline, so a fallback only gets the time left
+        deadline = time.monotonic() + timeout
+        if cls.event_driven:
+            queries = [[condition.locator.value, condition.locator.by, condition.locator.resolve()[0], condition.kind,
+                        condition.expected] for condition in conditions]
+            try:
+                result = cls._wait_in_page(queries, mode, timeout)
+            except TimeoutException:
+                raise
+            except WebDriverException:
+                UIActions._count_resolution('fallbacks')
+            else:
+                if not result['satisfied']:
+                    raise TimeoutException(f'Conditions ({mode}) not met after {timeout}s: '
+                                           f'{", ".join(map(str, conditions))}')
+                return result['results']
+
+        checks = [cls._expected_condition(condition) for condition in conditions]
+        met = {'all': all, 'any': any, 'none': lambda results: not any(results)}[mode]
+
+        def holds(check, driver):
+            try:
+                return bool(check(driver))
+            except (NoSuchElementException, StaleElementReferenceException):
+                return False
+
+        def evaluate(driver):
+            results = [holds(check, driver) for check in checks]
+            return results if met(results) else False
+
+        remaining = max(deadline - time.monotonic(), 0)
+        return WebDriverWait(cls.active_driver, remaining, poll_frequency=cls.poll_interval).until(evaluate)
+
+    @classmethod
+    def _expected_condition(cls, condition: WaitCondition):
+        locator = condition.locator.as_tuple()
+        if condition.kind == 'stale':
+            # Like the in-page wait, watches the element at the locator's index; no match means it is already gone
+            index, _ = condition.locator.resolve()
+            elements = cls.active_driver.find_elements(*locator)
+            return EC.staleness_of(elements[index]) if index < len(elements) else lambda driver: True
+        return {
+            'present': lambda: EC.presence_of_element_located(locator),
+            'visible': lambda: EC.visibility_of_element_located(locator),
+            'clickable': lambda: EC.element_to_be_clickable(locator),
+            'invisible': lambda: EC.invisibility_of_element_located(locator),
+            'text': lambda: EC.text_to_be_present_in_element(locator, condition.expected),
+            'value': lambda: EC.text_to_be_present_in_element_value(locator, condition.expected),
+        }[condition.kind]()
+
+    @classmethod
+    def _wait_in_page(cls, conditions: list, mode: str, timeout: int):
+        driver = cls.active_driver
+        UIActions._ensure_script_timeout(driver, timeout)
+        poll = {'interval': cls.poll_interval * 1000, 'backoff': cls.poll_backoff,
+                'max_interval': cls.max_poll_interval * 1000}
+        result = driver.execute_async_script(WAIT_FOR_CONDITIONS, conditions, int(timeout * 1000), poll, mode)
+        UIActions._count_resolution('event_driven_waits')
+        return result
+
 
 class BrowserActions(CustomWebDriverManager):
 
@@ -373,19 +857,23 @@ class BrowserActions(CustomWebDriverManager):
     @classmethod
     def close_window(cls):
         cls.active_driver.close()
+        ElementCache.invalidate(cls.active_driver)
 
     @classmethod
     def dismiss_browser_alert(cls):
         cls.active_driver.switch_to.alert.dismiss()
 
     @classmethod
-    def switch_to_frame(cls, locator: str):
-        element = cls.active_driver.find_element(By.XPATH if locator.startswith(XPATH_PREFIXES) else By.CSS_SELECTOR, locator)
+    def switch_to_frame(cls, locator: AnyLocator):
+        locator = Locator.of(locator)
+        element = cls.active_driver.find_element(*locator.as_tuple())
         cls.active_driver.switch_to.frame(element)
+        ElementCache.invalidate(cls.active_driver, frame=locator)
 
     @classmethod
     def switch_to_default_content(cls):
         cls.active_driver.switch_to.default_content()
+        ElementCache.invalidate(cls.active_driver, reset_frames=True)
 
     @classmethod
     def retrieve_all_cookies(cls):
@@ -410,6 +898,7 @@ class BrowserActions(CustomWebDriverManager):
     @classmethod
     def navigate_to_url(cls, url: str):
         cls.active_driver.get(url)
+        ElementCache.invalidate(cls.active_driver)
 
     @classmethod
     def is_alert_present(cls, timeout: int = DEFAULT_TIMEOUT):
@@ -422,6 +911,7 @@ class BrowserActions(CustomWebDriverManager):
     @classmethod
     def refresh_page(cls):
         cls.active_driver.refresh()
+        ElementCache.invalidate(cls.active_driver)
 
     @classmethod
     def set_window_size(cls, width: int, height: int):
@@ -436,14 +926,18 @@ class BrowserActions(CustomWebDriverManager):
     @classmethod
     def switch_to_window_by_index(cls, index: int):
         try:
-            cls.active_driver.switch_to.window(cls.active_driver.window_handles[index])
+            handle = cls.active_driver.window_handles[index]
         except IndexError:
             raise ValueError(f'No window found at index {index}')
+        cls.active_driver.switch_to.window(handle)
+        ElementCache.invalidate(cls.active_driver, window=handle)
 
     @classmethod
     def navigate_back(cls):
         cls.active_driver.execute_script("window.history.go(-1)")
+        ElementCache.invalidate(cls.active_driver)
 
     @classmethod
     def navigate_forward(cls):
         cls.active_driver.execute_script("window.history.go(1)")
+        ElementCache.invalidate(cls.active_driver)
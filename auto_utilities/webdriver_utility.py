@@ -1,56 +1,370 @@
+import atexit
+import contextvars
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+from auto_utilities.command_metrics import CommandRecorder
+from auto_utilities.network_utility import RequestBlocker
+
+_UNSET = object()
+TMPFS_DIR = '/dev/shm'
+
+# Startup settings of the named performance profiles; pass the profile name to launch_driver / create_driver
+PERFORMANCE_PROFILES = {
+    'fast': {'headless': True, 'page_load_strategy': 'eager', 'disable_gpu': True, 'disable_extensions': True,
+             'disable_background_networking': True, 'tmpfs_downloads': True, 'user_data_seed': None},
+    'ci': {'headless': True, 'page_load_strategy': 'eager', 'disable_gpu': True, 'disable_extensions': True,
+           'disable_background_networking': True, 'tmpfs_downloads': True, 'container': True, 'user_data_seed': None},
+    'debug': {'headless': False, 'page_load_strategy': 'normal', 'disable_gpu': False, 'disable_extensions': False,
+              'disable_background_networking': False, 'tmpfs_downloads': False, 'user_data_seed': None},
+}
+CHROME_PROFILE_ARGUMENTS = {
+    'headless': ['--headless=new', '--window-size=1920,1080'],
+    'disable_gpu': ['--disable-gpu'],
+    'disable_extensions': ['--disable-extensions', '--disable-component-extensions-with-background-pages'],
+    'disable_background_networking': ['--disable-background-networking', '--disable-component-update',
+                                      '--disable-default-apps', '--disable-sync', '--no-first-run',
+                                      '--metrics-recording-only', '--disable-background-timer-throttling'],
+    'container': ['--no-sandbox', '--disable-dev-shm-usage'],
+}
+FIREFOX_PROFILE_PREFERENCES = {
+    'disable_gpu': {'layers.acceleration.disabled': True},
+    'disable_extensions': {'extensions.update.enabled': False, 'extensions.autoDisableScopes': 15},
+    'disable_background_networking': {'app.update.auto': False, 'browser.safebrowsing.malware.enabled': False,
+                                      'browser.safebrowsing.phishing.enabled': False, 'network.prefetch-next': False,
+                                      'datareporting.healthreport.uploadEnabled': False,
+                                      'toolkit.telemetry.enabled': False},
+}
+
+
+class DriverRegistry:
+    """
+    Context-local storage for the current WebDriver, its options and capabilities.
+
+    Each thread (and each asyncio task) sees the values it set itself. Contexts that never set a value fall back to
+    the values set from the main thread, so single-threaded suites behave exactly as before.
+    """
+
+    FIELDS = ('active_driver', 'driver_options', 'capabilities')
+
+    _context_values = {field: contextvars.ContextVar(field) for field in FIELDS}
+    _shared_values = dict.fromkeys(FIELDS)
+
+    @classmethod
+    def get(cls, field: str):
+        value = cls._context_values[field].get(_UNSET)
+        return cls._shared_values[field] if value is _UNSET else value
+
+    @classmethod
+    def set(cls, field: str, value, share: bool = True):
+        """
+        Sets the value for the current context. Unless `share` is disabled, values set from the main thread also
+        become the default of contexts that never set their own.
+        """
+        token = cls._context_values[field].set(value)
+        if share and threading.current_thread() is threading.main_thread():
+            cls._shared_values[field] = value
+        return token
+
+    @classmethod
+    def reset(cls, field: str, token):
+        cls._context_values[field].reset(token)
+
+
+class _DriverRegistryMeta(type):
+    """
+    Routes the class-level `active_driver`, `driver_options` and `capabilities` attributes to the DriverRegistry.
+    """
+
+    @property
+    def active_driver(cls):
+        return DriverRegistry.get('active_driver')
+
+    @active_driver.setter
+    def active_driver(cls, value):
+        DriverRegistry.set('active_driver', value)
+
+    @property
+    def driver_options(cls):
+        return DriverRegistry.get('driver_options')
+
+    @driver_options.setter
+    def driver_options(cls, value):
+        DriverRegistry.set('driver_options', value)
 
+    @property
+    def capabilities(cls):
+        return DriverRegistry.get('capabilities')
 
-class CustomWebDriverManager:
-    """Handles the configuration and initialization of WebDriver for different browsers, starting with Chrome."""
+    @capabilities.setter
+    def capabilities(cls, value):
+        DriverRegistry.set('capabilities', value)
+
+
+class CustomWebDriverManager(metaclass=_DriverRegistryMeta):
+    """
+    Handles the configuration and initialization of WebDriver for different browsers, starting with Chrome.
+
+    The active driver is context-local: every thread or asyncio task can launch and drive its own browser through the
+    same classmethod API.
+    """
 
     available_browsers = {'chrome', 'firefox'}
-    driver_options = None
-    capabilities = None
-    active_driver = None
+    # When enabled, every driver launched afterwards records its WebDriver commands (see CommandRecorder)
+    record_commands = False
+    performance_profiles = {name: dict(settings) for name, settings in PERFORMANCE_PROFILES.items()}
+    _launch_times = {}
+    _launch_times_lock = threading.Lock()
+    _temporary_dirs = []
+    _temporary_dirs_lock = threading.Lock()
+    # Temporary directories created for built options, handed over to the driver started with them and removed when
+    # that driver quits
+    _options_dirs = weakref.WeakKeyDictionary()
+    _driver_dirs = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def configure_driver(cls, browser_type: str = 'chrome', download_path: str = None, profile: str = None,
+                         capture_network: bool = False):
+        """
+        Configures browser options and capabilities based on the browser type and optional performance profile.
+        """
+        cls.driver_options, cls.capabilities = cls._build_options(browser_type, download_path, profile, capture_network)
+
+    @classmethod
+    def register_profile(cls, name: str, **settings):
+        """
+        Adds or overrides a performance profile. Unspecified settings fall back to the 'debug' profile values.
+
+        Example:
+            >>> CustomWebDriverManager.register_profile('seeded', headless=True, user_data_seed='/profiles/seed')
+        """
+        cls.performance_profiles[name] = {**PERFORMANCE_PROFILES['debug'], **settings}
 
     @classmethod
-    def configure_driver(cls, browser_type: str = 'chrome', download_path: str = None):
+    def _build_options(cls, browser_type: str = 'chrome', download_path: str = None, profile: str = None,
+                       capture_network: bool = False):
         """
-        Configures browser options and capabilities based on the browser type.
+        Builds the browser options and capabilities without storing them on the class.
         """
         if browser_type not in cls.available_browsers:
             raise ValueError(f"Unsupported browser: {browser_type}. Available options are: {cls.available_browsers}")
+        if capture_network and browser_type != 'chrome':
+            raise ValueError(f"Request blocking requires the DevTools Protocol, which {browser_type} does not expose")
+        if profile is not None and profile not in cls.performance_profiles:
+            raise ValueError(f"Unknown profile: {profile}. Available options are: {set(cls.performance_profiles)}")
+
+        settings = cls.performance_profiles[profile] if profile else {}
+        temporary_dirs = []
+        if settings.get('tmpfs_downloads') and not download_path:
+            download_path = cls._make_temporary_dir('downloads_', temporary_dirs,
+                                                    TMPFS_DIR if os.path.isdir(TMPFS_DIR) else None)
+        user_data_dir = (cls._copy_user_data_seed(settings['user_data_seed'], temporary_dirs)
+                         if settings.get('user_data_seed') else None)
 
         if browser_type == 'chrome':
-            cls.driver_options = webdriver.ChromeOptions()
-            cls.capabilities = {'browserName': 'chrome'}
-            cls.driver_options.capabilities.update(cls.capabilities)
-            cls.driver_options.add_argument("--disable-popup-blocking")
-            cls.driver_options.add_argument("--disable-infobars")
-            cls.driver_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+            driver_options = webdriver.ChromeOptions()
+            capabilities = {'browserName': 'chrome'}
+            driver_options.capabilities.update(capabilities)
+            driver_options.add_argument("--disable-popup-blocking")
+            driver_options.add_argument("--disable-infobars")
+            driver_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+
+            for setting, arguments in CHROME_PROFILE_ARGUMENTS.items():
+                if settings.get(setting):
+                    for argument in arguments:
+                        driver_options.add_argument(argument)
+            if user_data_dir:
+                driver_options.add_argument(f"--user-data-dir={user_data_dir}")
 
             if download_path:
                 prefs = {"download.default_directory": download_path}
-                cls.driver_options.add_experimental_option('prefs', prefs)
+                driver_options.add_experimental_option('prefs', prefs)
+            if capture_network:
+                driver_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         else:
-            raise ValueError("Configuration for this browser is not yet implemented.")
+            driver_options = webdriver.FirefoxOptions()
+            capabilities = {'browserName': 'firefox'}
+            driver_options.capabilities.update(capabilities)
+            driver_options.set_preference('dom.disable_open_during_load', False)
+
+            for setting, preferences in FIREFOX_PROFILE_PREFERENCES.items():
+                if settings.get(setting):
+                    for name, value in preferences.items():
+                        driver_options.set_preference(name, value)
+            if settings.get('headless'):
+                driver_options.add_argument('-headless')
+            if user_data_dir:
+                driver_options.add_argument('-profile')
+                driver_options.add_argument(user_data_dir)
+
+            if download_path:
+                driver_options.set_preference('browser.download.folderList', 2)
+                driver_options.set_preference('browser.download.dir', download_path)
+
+        if settings.get('page_load_strategy'):
+            driver_options.page_load_strategy = settings['page_load_strategy']
+        if temporary_dirs:
+            with cls._temporary_dirs_lock:
+                cls._options_dirs[driver_options] = temporary_dirs
+        return driver_options, capabilities
 
     @classmethod
-    def launch_driver(cls, browser_type: str = 'chrome', remote_host: str = None, download_path: str = None):
+    def launch_driver(cls, browser_type: str = 'chrome', remote_host: str = None, download_path: str = None,
+                      profile: str = None, request_blocking: dict = None):
         """
         Launches the WebDriver for either a remote or local instance.
+
+        Args:
+            request_blocking: Optional RequestBlocker.apply keyword arguments (url_patterns, resource_types,
+                stub_responses) applied before the first page loads, e.g. {'resource_types': ['image', 'font']}.
         """
-        cls.configure_driver(browser_type, download_path)
+        cls.configure_driver(browser_type, download_path, profile, capture_network=request_blocking is not None)
+        cls.active_driver = cls._start_driver(browser_type, remote_host, cls.driver_options, profile)
+        if request_blocking is not None:
+            RequestBlocker.apply(cls.active_driver, **request_blocking)
 
+    @classmethod
+    def create_driver(cls, browser_type: str = 'chrome', remote_host: str = None, download_path: str = None,
+                      profile: str = None, request_blocking: dict = None):
+        """
+        Launches a new WebDriver instance without making it the active driver, e.g. for driver pools.
+        """
+        driver_options, _ = cls._build_options(browser_type, download_path, profile,
+                                               capture_network=request_blocking is not None)
+        driver = cls._start_driver(browser_type, remote_host, driver_options, profile)
+        if request_blocking is not None:
+            RequestBlocker.apply(driver, **request_blocking)
+        return driver
+
+    @classmethod
+    def block_requests(cls, url_patterns: list = None, resource_types: list = None, stub_responses: dict = None):
+        """
+        Blocks or stubs requests of the active driver from the next page load on.
+
+        Blocked-request statistics need a driver launched with `request_blocking`, which enables performance logging.
+
+        Example:
+            >>> CustomWebDriverManager.block_requests(resource_types=['image', 'media', 'tracker'],
+            ...                                       url_patterns=['*://static.example.com/video/*'])
+        """
+        RequestBlocker.apply(cls.get_active_driver(), url_patterns, resource_types, stub_responses)
+
+    @classmethod
+    def get_request_blocking_stats(cls, measure_bytes: bool = False, measure_third_party: bool = False):
+        """
+        Returns the per-page blocked and stubbed request counts of the active driver (see RequestBlocker).
+        """
+        return RequestBlocker.collect_stats(cls.get_active_driver(), measure_bytes, measure_third_party)
+
+    @classmethod
+    def _start_driver(cls, browser_type: str, remote_host: str, driver_options, profile: str = None):
+        started = time.perf_counter()
         try:
             if remote_host:
-                cls.active_driver = webdriver.Remote(
-                    command_executor=f'http://{remote_host}/wd/hub',
-                    options=cls.driver_options
+                command_executor = f'http://{remote_host}/wd/hub'
+                if browser_type == 'chrome':
+                    # Adds the DevTools endpoint RequestBlocker sends its commands to
+                    command_executor = ChromiumRemoteConnection(command_executor, vendor_prefix='goog',
+                                                                browser_name='chrome')
+                driver = webdriver.Remote(
+                    command_executor=command_executor,
+                    options=driver_options
                 )
+            elif browser_type == 'firefox':
+                driver = webdriver.Firefox(options=driver_options)
             else:
-                cls.active_driver = webdriver.Chrome(service=Service('/Users/dvpx/qa-auto_utilities/chromedriver'),
-                                                     options=cls.driver_options)
+                driver = webdriver.Chrome(service=Service('/Users/dvpx/qa-auto_utilities/chromedriver'),
+                                          options=driver_options)
         except Exception as e:
+            cls._hand_over_temporary_dirs(driver_options, None)
             raise Exception(f"Failed to initialize WebDriver for {browser_type}: {e}")
 
+        cls._hand_over_temporary_dirs(driver_options, driver)
+        with cls._launch_times_lock:
+            cls._launch_times.setdefault((profile or 'default', browser_type), []).append(
+                time.perf_counter() - started)
+        if cls.record_commands:
+            CommandRecorder.instrument(driver)
+        return driver
+
+    @classmethod
+    def get_profile_launch_times(cls):
+        """
+        Summarizes the measured launch-to-ready time of every profile and browser launched so far.
+
+        Returns:
+            Dictionary keyed by (profile, browser_type) with launch count and min/avg/max seconds.
+        """
+        with cls._launch_times_lock:
+            launch_times = {key: list(times) for key, times in cls._launch_times.items()}
+        return {key: {'launches': len(times), 'min_seconds': min(times), 'avg_seconds': sum(times) / len(times),
+                      'max_seconds': max(times)}
+                for key, times in launch_times.items()}
+
+    @classmethod
+    def _copy_user_data_seed(cls, seed_path: str, temporary_dirs: list):
+        """
+        Copies a pre-seeded browser profile so concurrent browsers never share (and lock) the same directory.
+        """
+        user_data_dir = os.path.join(cls._make_temporary_dir('user_data_', temporary_dirs), 'profile')
+        shutil.copytree(seed_path, user_data_dir)
+        return user_data_dir
+
+    @classmethod
+    def _make_temporary_dir(cls, prefix: str, temporary_dirs: list, parent: str = None):
+        path = tempfile.mkdtemp(prefix=prefix, dir=parent)
+        with cls._temporary_dirs_lock:
+            cls._temporary_dirs.append(path)
+        temporary_dirs.append(path)
+        return path
+
+    @classmethod
+    def _hand_over_temporary_dirs(cls, driver_options, driver):
+        # Moves the temporary directories of `driver_options` to the driver started with them, or removes them when
+        # the driver failed to start (driver is None)
+        with cls._temporary_dirs_lock:
+            paths = cls._options_dirs.pop(driver_options, [])
+            if driver is not None and paths:
+                cls._driver_dirs.setdefault(driver, []).extend(paths)
+        if driver is None:
+            cls._remove_dirs(paths)
+
+    @classmethod
+    def remove_temporary_dirs(cls, driver=None):
+        """
+        Removes the download and user-data directories created for the profile of `driver`, or for every profile
+        when no driver is given. Runs for every driver quit through quit_driver, and for all of them at exit.
+        """
+        with cls._temporary_dirs_lock:
+            paths = list(cls._temporary_dirs) if driver is None else cls._driver_dirs.pop(driver, [])
+        cls._remove_dirs(paths)
+
+    @classmethod
+    def _remove_dirs(cls, paths: list):
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+        with cls._temporary_dirs_lock:
+            cls._temporary_dirs[:] = [path for path in cls._temporary_dirs if path not in paths]
+
+    @classmethod
+    def quit_driver(cls, driver):
+        """
+        Quits `driver` and removes the temporary directories created for it, even when the quit fails.
+        """
+        try:
+            driver.quit()
+        finally:
+            cls.remove_temporary_dirs(driver)
+
     @classmethod
     def get_active_driver(cls):
         """
@@ -60,13 +374,29 @@ class CustomWebDriverManager:
             return cls.active_driver
         raise Exception("No active WebDriver instance. Please initialize the driver first.")
 
+    @classmethod
+    @contextmanager
+    def use_driver(cls, driver):
+        """
+        Makes `driver` the active driver of the current thread or task for the duration of the block.
+
+        Example:
+            >>> with CustomWebDriverManager.use_driver(pool.lease()):
+            ...     UIActions.click_element('#submit')
+        """
+        token = DriverRegistry.set('active_driver', driver, share=False)
+        try:
+            yield driver
+        finally:
+            DriverRegistry.reset('active_driver', token)
+
     @classmethod
     def terminate_driver(cls):
         """
         Shuts down the active WebDriver instance and clears the driver reference.
         """
         if cls.active_driver:
-            cls.active_driver.quit()
+            cls.quit_driver(cls.active_driver)
             cls.active_driver = None
 
     @classmethod
@@ -80,6 +410,8 @@ class CustomWebDriverManager:
         else:
             raise Exception("No active driver to update download preferences.")
 
+atexit.register(CustomWebDriverManager.remove_temporary_dirs)
+
 # Example usage:
 # CustomWebDriverManager.launch_driver(browser_type='chrome', download_path='/new/download/path')
 # driver = CustomWebDriverManager.get_active_driver()
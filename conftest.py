@@ -3,23 +3,74 @@ import logging
 
 import pytest
 
+from auto_utilities.browser_pool import BrowserPool
+from auto_utilities.command_metrics import CommandRecorder
+from auto_utilities.ui_utilities import UIActions
 from auto_utilities.webdriver_utility import CustomWebDriverManager
 
 logger = logging.getLogger(__name__)
 
+browser_pool_stats_key = pytest.StashKey[dict]()
+BROWSER_POOL_STATS_OUTPUT = 'browser_pool_stats'
 
-@pytest.fixture(autouse=True)
-def driver_init():
+
+def pytest_addoption(parser):
+    parser.addoption('--browser-pool-size', type=int, default=1,
+                     help='Number of browsers launched in parallel at session start (per xdist worker)')
+    parser.addoption('--browser-max-uses', type=int, default=25,
+                     help='Number of tests a pooled browser runs before it is relaunched')
+    parser.addoption('--browser-profile', default=None,
+                     help='Performance profile the browsers are launched with, e.g. fast, ci or debug')
+    parser.addoption('--block-resources', default=None,
+                     help='Comma-separated resource types the browsers never load, e.g. image,font,media,tracker')
+    parser.addoption('--command-report', default=None,
+                     help='Records every WebDriver command and writes <path>.json and <path>.csv at session end')
+    parser.addoption('--benchmark-report', default=None,
+                     help='Writes the stub WebDriver benchmark results (Tests/benchmarks) to this JSON file')
+
+
+@pytest.fixture(scope='session')
+def browser_pool(request):
     # Run Before Each Session
-    CustomWebDriverManager.launch_driver(browser_type='chrome')
-    web_driver = CustomWebDriverManager.get_active_driver()
-    web_driver.maximize_window()
-    web_driver.get('https://www.facebook.com/')
+    CustomWebDriverManager.record_commands = bool(request.config.getoption('--command-report'))
+    blocked_resources = request.config.getoption('--block-resources')
+    request_blocking = {'resource_types': blocked_resources.split(',')} if blocked_resources else None
+    pool = BrowserPool(size=request.config.getoption('--browser-pool-size'), browser_type='chrome',
+                       max_uses=request.config.getoption('--browser-max-uses'),
+                       profile=request.config.getoption('--browser-profile'),
+                       request_blocking=request_blocking,
+                       prepare=lambda web_driver: web_driver.maximize_window())
+    pool.start()
 
-    yield
+    yield pool
 
     # Run After Each Session
-    web_driver.quit()
+    pool.close()
+    stats = pool.get_stats()
+    request.config.stash[browser_pool_stats_key] = stats
+    if hasattr(request.config, 'workeroutput'):
+        # xdist worker: the controller merges the stats of every worker for the terminal summary
+        request.config.workeroutput[BROWSER_POOL_STATS_OUTPUT] = stats
+    logger.info(f"Browser pool: {stats}")
+    logger.info(f"Browser launch times: {CustomWebDriverManager.get_profile_launch_times()}")
+
+
+@pytest.fixture(autouse=True)
+def driver_init(request, browser_pool):
+    # Run Before Each Test
+    CommandRecorder.start_test(request.node.nodeid)
+    web_driver = browser_pool.lease()
+    try:
+        CustomWebDriverManager.active_driver = web_driver
+        web_driver.get('https://www.facebook.com/')
+        UIActions.reset_resolution_stats()
+
+        yield
+
+    finally:
+        # Run After Each Test, and when the setup above failed
+        CustomWebDriverManager.active_driver = None
+        browser_pool.release(web_driver)
 
 
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
@@ -30,4 +81,47 @@ def pytest_runtest_makereport(item):
     if report.when == "call":
         if report.failed:
             logger.error(f"Test {item.name} failed!")
-            
+        saved_round_trips = UIActions.get_resolution_stats().get('round_trips_saved', 0)
+        logger.info(f"Test {item.name} saved {saved_round_trips} WebDriver round trips")
+        if CustomWebDriverManager.record_commands:
+            commands = CommandRecorder.summarize_test(item.nodeid)
+            phases = ', '.join(f"{phase} {totals['seconds']:.2f}s" for phase, totals in commands['phases'].items())
+            logger.info(f"Test {item.name} sent {commands['commands']} WebDriver commands "
+                        f"in {commands['seconds']:.2f}s ({phases})")
+
+
+def pytest_sessionfinish(session):
+    report_path = session.config.getoption('--command-report')
+    if report_path:
+        CommandRecorder.write_report(json_path=f'{report_path}.json', csv_path=f'{report_path}.csv')
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    worker_stats = getattr(node, 'workeroutput', {}).get(BROWSER_POOL_STATS_OUTPUT)
+    if not worker_stats:
+        return
+    stats = node.config.stash.get(browser_pool_stats_key, None)
+    if stats is None:
+        node.config.stash[browser_pool_stats_key] = dict(worker_stats)
+        return
+    for key, value in worker_stats.items():
+        if key == 'max_lease_wait_seconds':
+            stats[key] = max(stats[key], value)
+        elif not key.startswith('avg_'):
+            stats[key] += value
+    stats['avg_launch_seconds'] = stats['launch_seconds'] / stats['launches'] if stats['launches'] else 0.0
+    stats['avg_lease_wait_seconds'] = stats['lease_wait_seconds'] / stats['leases'] if stats['leases'] else 0.0
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    stats = config.stash.get(browser_pool_stats_key, None)
+    if stats:
+        terminalreporter.write_sep('-', 'browser pool')
+        terminalreporter.write_line(f"launches: {stats['launches']} ({stats['launch_failures']} failed), "
+                                    f"launch time: {stats['launch_seconds']:.2f}s "
+                                    f"(avg {stats['avg_launch_seconds']:.2f}s)")
+        terminalreporter.write_line(f"leases: {stats['leases']}, lease wait: {stats['lease_wait_seconds']:.2f}s "
+                                    f"(avg {stats['avg_lease_wait_seconds']:.3f}s, "
+                                    f"max {stats['max_lease_wait_seconds']:.3f}s)")
+        terminalreporter.write_line(f"recycled: {stats['recycled']}, crashed: {stats['crashed']}")